@@ -0,0 +1,54 @@
+"""
+ベンチマークの結果を baseline の JSON ファイルに保存し、比べるための共通の関数。
+baseline には、ベンチマークの名前ごとの結果のほかに、計測したツリーの commit を "_tree" として記録します。
+"_" で始まる項目は結果ではなく、計測した環境の記録です。
+"""
+import json
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List
+
+
+def current_tree() -> str:
+    """計測しているツリーの commit。変更があれば -dirty が付きます。"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"],
+                              capture_output=True,
+                              text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_baseline(path: Path) -> Dict[str, Dict]:
+    """path がなければ空の dict を返します。"""
+    if not path.exists():
+        return {}
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+def save_baseline(path: Path, results: Dict[str, Dict], **environment):
+    """results を baseline として保存します。environment は "_" を付けて一緒に記録します。"""
+    # ツリーは書き出す前に調べる。書き出した後では baseline の変更で -dirty になる。
+    saved = dict(results, _tree=current_tree())
+    saved.update({f"_{key}": value for key, value in environment.items()})
+    with open(path, 'w') as fp:
+        json.dump(saved, fp, ensure_ascii=False, indent=4)
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict],
+                     is_worse: Callable[[Dict, Dict], bool]) -> List[str]:
+    """baseline にあるベンチマークのうち、is_worse(結果, baseline の結果) が真になるものの名前。"""
+    return [
+        name for name, result in results.items()
+        if name in baseline and is_worse(result, baseline[name])
+    ]
+
+
+def ratio_to_baseline(name: str, result: Dict, baseline: Dict[str, Dict],
+                      key: str) -> str:
+    """表に出す、baseline に対する result[key] の比。baseline になければ空です。"""
+    if name not in baseline:
+        return ""
+    return f"{result[key] / baseline[name][key]:.2f}x"
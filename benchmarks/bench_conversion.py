@@ -0,0 +1,189 @@
+"""
+TSV から JSON への変換の各部分のベンチマーク。
+benchmarks/data の固定のスライスを対象に、Oki2YamatoConverter.convert, Yamato2OkiConverter.convert,
+generate_phonetics, get_pos, load_n_convert の速さを計ります。
+convert と load_n_convert は、辞書のファイルに書き出す JSON の文字列にするまでを計ります(+dumps)。
+convert は活用形や発音をオブジェクトのまま返し、書き出す時に展開するので、変換だけでは高速化の前のツリーと同じ仕事になりません。
+
+    python benchmarks/bench_conversion.py                   # 計測して、baseline.json と比べる
+    python benchmarks/bench_conversion.py --save-baseline   # 計測結果を baseline.json に保存する
+
+baseline より threshold 以上遅くなったものがあれば、終了コード 1 で終わります。
+baseline には、計測したツリーの commit を "_tree" として記録します。
+baseline.json は、高速化の前のツリー(d2ad095)で計測したものです。
+"""
+import argparse
+import json
+import sys
+import time
+from csv import DictReader
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from generate_base_json import (  # noqa: E402
+    Oki2YamatoConverter, Yamato2OkiConverter, load_n_convert)
+from kanahyouki import generate_phonetics  # noqa: E402
+from pos import get_pos  # noqa: E402
+from make_slices import slice_path  # noqa: E402
+from bench_baseline import (find_regressions, load_baseline,  # noqa: E402
+                            ratio_to_baseline, save_baseline)
+
+try:
+    import serialisation  # noqa: E402
+
+    def dumps(entries) -> str:
+        return serialisation.dumps(entries, indent=4)
+except ImportError:
+    # 高速化の前のツリー(d2ad095)には serialisation がなく、json.dump で書き出していた。
+    def dumps(entries) -> str:
+        return json.dumps(entries, ensure_ascii=False, indent=4)
+
+benchmark_dir = Path(__file__).parent
+default_baseline_path = benchmark_dir / "baseline.json"
+
+
+class SliceOki2YamatoConverter(Oki2YamatoConverter):
+    source = str(slice_path("okinawa_01.tsv"))
+
+
+class SliceYamato2OkiConverter(Yamato2OkiConverter):
+    source = str(slice_path("okinawa_02.tsv"))
+
+
+class BenchResult(NamedTuple):
+    calls: int
+    seconds: float
+
+    @property
+    def us_per_call(self) -> float:
+        return self.seconds / self.calls * 1e6
+
+    @property
+    def per_second(self) -> float:
+        return self.calls / self.seconds
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "us_per_call": self.us_per_call,
+            "per_second": self.per_second,
+        }
+
+
+def _read_rows(converter) -> List[Dict[str, str]]:
+    with open(converter.source, 'r') as base_file:
+        return list(DictReader(base_file, delimiter='\t'))
+
+
+def bench(func: Callable[[], int], repeat: int) -> BenchResult:
+    """func は呼び出した回数(または変換した行数)を返します。repeat 回のうち最も速いものを返します。"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calls = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best.seconds:
+            best = BenchResult(calls, elapsed)
+    return best
+
+
+def run_benchmarks(repeat: int = 7) -> Dict[str, BenchResult]:
+    oki_rows = _read_rows(SliceOki2YamatoConverter)
+    yamato_rows = _read_rows(SliceYamato2OkiConverter)
+
+    def convert_all(converter, rows):
+
+        def run():
+            for row in rows:
+                dumps(converter.convert(row))
+            return len(rows)
+
+        return run
+
+    def run_generate_phonetics():
+        for row in oki_rows:
+            generate_phonetics(row["見出し語"])
+        return len(oki_rows)
+
+    def run_get_pos():
+        for row in oki_rows:
+            get_pos(row["品詞"], row["見出し語"])
+        return len(oki_rows)
+
+    def run_load_n_convert(converter):
+
+        def run():
+            entries = load_n_convert(converter)
+            dumps(entries)
+            return len(entries)
+
+        return run
+
+    benchmarks = {
+        "Oki2YamatoConverter.convert+dumps":
+        convert_all(SliceOki2YamatoConverter, oki_rows),
+        "Yamato2OkiConverter.convert+dumps":
+        convert_all(SliceYamato2OkiConverter, yamato_rows),
+        "generate_phonetics": run_generate_phonetics,
+        "get_pos": run_get_pos,
+        "load_n_convert+dumps(o2y)": run_load_n_convert(SliceOki2YamatoConverter),
+        "load_n_convert+dumps(y2o)": run_load_n_convert(SliceYamato2OkiConverter),
+    }
+    return {name: bench(func, repeat) for name, func in benchmarks.items()}
+
+
+def is_slower(result: Dict, base: Dict, threshold: float) -> bool:
+    return result["us_per_call"] > base["us_per_call"] * (1 + threshold)
+
+
+def print_table(results: Dict[str, Dict], baseline: Dict[str, Dict],
+                regressions: List[str]):
+    print(f"{'benchmark':<36}{'calls':>8}{'µs/call':>12}{'per sec':>12}{'vs base':>10}")
+    for name, result in results.items():
+        ratio = ratio_to_baseline(name, result, baseline, "us_per_call")
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<36}{result['calls']:>8}{result['us_per_call']:>12.1f}"
+              f"{result['per_second']:>12.1f}{ratio:>10}{flag}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baseline',
+                        type=Path,
+                        default=default_baseline_path,
+                        help="比較する(保存する) baseline の JSON ファイル")
+    parser.add_argument('--save-baseline',
+                        action='store_true',
+                        help="計測結果を baseline として保存する")
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.25,
+                        help="µs/call がこの割合以上増えたら、遅くなったとみなす")
+    parser.add_argument('--repeat', type=int, default=7)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {
+        name: result.to_dict()
+        for name, result in run_benchmarks(args.repeat).items()
+    }
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    regressions = find_regressions(
+        results, baseline,
+        lambda result, base: is_slower(result, base, args.threshold))
+    if "_tree" in baseline:
+        print(f"baseline: {baseline['_tree']}")
+    print_table(results, baseline, regressions)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+辞書を引く速さのベンチマーク。
+１回の操作は、クエリーの語を normalise_kana で正規化し、get_keys で id を引き、そのすべての get_content を引くことです。
+クエリーは、インデックス表の見出し語から作る次の組み合わせ(mix)か、記録したクエリーのログです。
+
+    hits      見出し語そのもの
+    misses    どの辞書にもない語
+    hiragana  見出し語を平仮名にしたもの
+    katakana  見出し語を片仮名にしたもの
+    long      長い見出し語
+    mixed     上のすべてを混ぜて並べ替えたもの
+
+ログは、１行に「辞書の名前<TAB>語」を書いたファイルです。辞書の名前は oki_dict, yamato_dict, katsuyou_jiten で、
+# で始まる行は無視します。--write-log で、mixed の組み合わせをログとして書き出せます。
+
+    python benchmarks/bench_lookup.py                      # 計測して、lookup_baseline.json と比べる
+    python benchmarks/bench_lookup.py --threads 4          # ４つのスレッドから引く
+    python benchmarks/bench_lookup.py --log queries.tsv    # ログを再生する
+    python benchmarks/bench_lookup.py --save-baseline      # 計測結果を lookup_baseline.json に保存する
+
+各組み合わせについて、スループット、遅延の p50/p95/p99、操作あたりのメモリ確保を報告します。
+CPython には確保の回数の累計を数える API がないので、メモリ確保は tracemalloc で計った操作あたりのピークのバイト数と、
+操作の後に残ったメモリブロックの数(sys.getallocatedblocks の差)で表します。これは時間の計測とは別の１スレッドの実行で計ります。
+どの組み合わせも、一度引いてキャッシュなどを温めてから repeat 回計り、最も速かった回の結果を使います。
+baseline よりスループットか p95 が threshold 以上悪くなったものがあれば、終了コード 1 で終わります。
+baseline には、計測したツリーの commit を "_tree" として、各辞書のインデックス表の形式("csr" は
+stem_index-table.bin、"json" は stem_index-table.json)を "_index_format" として記録します。
+インデックス表の形式が baseline と違う時は、比べても意味がないので比べません。
+baseline は、git clone しただけの状態(.bin がなく、どの辞書も JSON の表を読む)で記録します。
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import math
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from okinawago_dictionary import dictionary  # noqa: E402
+from okinawago_dictionary.index_table import IndexTable  # noqa: E402
+from bench_baseline import (find_regressions, load_baseline,  # noqa: E402
+                            ratio_to_baseline, save_baseline)
+
+benchmark_dir = Path(__file__).parent
+default_baseline_path = benchmark_dir / "lookup_baseline.json"
+dictionary_names = ["oki_dict", "yamato_dict", "katsuyou_jiten"]
+mix_names = ["hits", "misses", "hiragana", "katakana", "long", "mixed"]
+
+
+class Query(NamedTuple):
+    dictionary: str
+    word: str
+
+
+def lookup(target: dictionary.Dictionary, word: str) -> int:
+    """見つかったエントリーの数を返します。"""
+    try:
+        keys = target.get_keys(target.normalise_kana(word))
+    except KeyError:
+        return 0
+    for key in keys:
+        target.get_content(key)
+    return len(keys)
+
+
+def hiragana(word: str) -> str:
+    """片仮名を平仮名にします。wanakana.to_hiragana は "ヮー" などで失敗するので、コードポイントをずらします。"""
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in word)
+
+
+def katakana(word: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in word)
+
+
+def load_dictionaries() -> Dict[str, dictionary.Dictionary]:
+    return {name: getattr(dictionary, name) for name in dictionary_names}
+
+
+def index_formats(dictionaries: Dict[str, dictionary.Dictionary]) -> Dict[str, str]:
+    """各辞書が読み込んだインデックス表の形式。"""
+    return {
+        name: "csr" if isinstance(target._index_to_key_dict, IndexTable) else "json"
+        for name, target in dictionaries.items()
+    }
+
+
+def build_mixes(dictionaries: Dict[str, dictionary.Dictionary],
+                size: int,
+                seed: int = 0) -> Dict[str, List[Query]]:
+    """各辞書から size 個ずつ語を選んで、組み合わせを作ります。seed が同じなら、同じ組み合わせになります。"""
+    rng = random.Random(seed)
+    mixes: Dict[str, List[Query]] = {name: [] for name in mix_names}
+    for name, target in dictionaries.items():
+        index_words = sorted(target.index_words)
+        sample = rng.sample(index_words, min(size, len(index_words)))
+        mixes["hits"].extend(Query(name, word) for word in sample)
+        mixes["hiragana"].extend(Query(name, hiragana(word)) for word in sample)
+        mixes["katakana"].extend(Query(name, katakana(word)) for word in sample)
+        mixes["long"].extend(
+            Query(name, word)
+            for word in sorted(index_words, key=len, reverse=True)[:size])
+        for word in sample:
+            missing = word + "ヴェ"
+            if missing not in target.index_words:
+                mixes["misses"].append(Query(name, missing))
+    for mix_name in mix_names[:-1]:
+        mixes["mixed"].extend(mixes[mix_name])
+    rng.shuffle(mixes["mixed"])
+    return mixes
+
+
+def read_log(path: Path) -> List[Query]:
+    queries = []
+    with open(path, 'r') as fp:
+        for line in fp:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            name, word = line.split("\t", 1)
+            if name not in dictionary_names:
+                raise ValueError(f"{path}: 辞書の名前 {name} が分かりません。")
+            queries.append(Query(name, word))
+    return queries
+
+
+def write_log(queries: List[Query], path: Path):
+    with open(path, 'w') as fp:
+        for query in queries:
+            fp.write(f"{query.dictionary}\t{query.word}\n")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近順位法による百分位数。"""
+    if not sorted_values:
+        return 0.
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _run_chunk(dictionaries, queries: List[Query]) -> List[int]:
+    latencies = []
+    for query in queries:
+        target = dictionaries[query.dictionary]
+        start = time.perf_counter_ns()
+        lookup(target, query.word)
+        latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def time_queries(dictionaries, queries: List[Query],
+                 threads: int = 1) -> Dict:
+    """queries を threads 個のスレッドに分けて引き、クエリーごとの遅延(ns)と全体の時間を返します。"""
+    start = time.perf_counter()
+    if threads <= 1:
+        latencies = _run_chunk(dictionaries, queries)
+    else:
+        chunks = [queries[i::threads] for i in range(threads)]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(
+                executor.map(lambda chunk: _run_chunk(dictionaries, chunk),
+                             chunks))
+        # クエリーの順に戻す。
+        latencies = [0] * len(queries)
+        for i, chunk_latencies in enumerate(results):
+            latencies[i::threads] = chunk_latencies
+    return {"seconds": time.perf_counter() - start, "latencies": latencies}
+
+
+def measure_allocations(dictionaries, queries: List[Query]) -> Dict[str, float]:
+    peak_bytes = 0
+    tracemalloc.start()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        for query in queries:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            lookup(dictionaries[query.dictionary], query.word)
+            peak_bytes += tracemalloc.get_traced_memory()[1] - before
+        retained_blocks = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+    n = max(len(queries), 1)
+    return {
+        "peak_bytes_per_op": peak_bytes / n,
+        "retained_blocks_per_op": retained_blocks / n,
+    }
+
+
+def _latency_summary(latencies: List[int]) -> Dict[str, float]:
+    sorted_us = sorted(latency / 1000 for latency in latencies)
+    return {
+        f"p{q}_us": percentile(sorted_us, q)
+        for q in [50, 95, 99]
+    }
+
+
+def run_mix(dictionaries,
+            queries: List[Query],
+            threads: int = 1,
+            repeat: int = 5) -> Dict:
+    """組み合わせ全体の結果と、辞書ごとの結果を返します。repeat 回のうち最も速いものを使います。"""
+    _run_chunk(dictionaries, queries)
+    timed = min((time_queries(dictionaries, queries, threads)
+                 for _ in range(repeat)),
+                key=lambda timed: timed["seconds"])
+    hits = [
+        lookup(dictionaries[query.dictionary], query.word) > 0
+        for query in queries
+    ]
+    result = {
+        "queries": len(queries),
+        "threads": threads,
+        "seconds": timed["seconds"],
+        "per_second": len(queries) / timed["seconds"],
+        "hit_rate": sum(hits) / max(len(queries), 1),
+    }
+    result.update(_latency_summary(timed["latencies"]))
+    result.update(measure_allocations(dictionaries, queries))
+    by_dictionary = {}
+    for name in dictionary_names:
+        positions = [
+            i for i, query in enumerate(queries) if query.dictionary == name
+        ]
+        if positions:
+            by_dictionary[name] = dict(
+                {"queries": len(positions)},
+                **_latency_summary(
+                    [timed["latencies"][i] for i in positions]))
+    result["dictionaries"] = by_dictionary
+    return result
+
+
+def is_worse(result: Dict, base: Dict, threshold: float) -> bool:
+    return (result["per_second"] < base["per_second"] / (1 + threshold)
+            or result["p95_us"] > base["p95_us"] * (1 + threshold))
+
+
+def print_table(results: Dict[str, Dict], baseline: Dict[str, Dict],
+                regressions: List[str]):
+    print(f"{'mix':<12}{'queries':>8}{'hit %':>7}{'ops/sec':>11}{'p50 µs':>9}"
+          f"{'p95 µs':>9}{'p99 µs':>9}{'peak B':>9}{'blocks':>8}{'vs base':>9}")
+    for name, result in results.items():
+        ratio = ratio_to_baseline(name, result, baseline, "per_second")
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<12}{result['queries']:>8}{result['hit_rate'] * 100:>7.1f}"
+              f"{result['per_second']:>11.0f}{result['p50_us']:>9.1f}"
+              f"{result['p95_us']:>9.1f}{result['p99_us']:>9.1f}"
+              f"{result['peak_bytes_per_op']:>9.0f}"
+              f"{result['retained_blocks_per_op']:>8.2f}{ratio:>9}{flag}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--log',
+                        type=Path,
+                        help="組み合わせの代わりに再生するクエリーのログ")
+    parser.add_argument('--write-log',
+                        type=Path,
+                        help="mixed の組み合わせをログとして書き出す")
+    parser.add_argument('--mix',
+                        action='append',
+                        choices=mix_names,
+                        help="計る組み合わせ。省くとすべて")
+    parser.add_argument('--size',
+                        type=int,
+                        default=500,
+                        help="組み合わせごとに、各辞書から選ぶ語の数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline',
+                        type=Path,
+                        default=default_baseline_path,
+                        help="比較する(保存する) baseline の JSON ファイル")
+    parser.add_argument('--save-baseline',
+                        action='store_true',
+                        help="計測結果を baseline として保存する")
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.25,
+                        help="スループットか p95 がこの割合以上悪くなったら、遅くなったとみなす")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    dictionaries = load_dictionaries()
+    if args.log:
+        query_sets = {"log": read_log(args.log)}
+    else:
+        mixes = build_mixes(dictionaries, args.size, args.seed)
+        if args.write_log:
+            write_log(mixes["mixed"], args.write_log)
+        query_sets = {name: mixes[name] for name in args.mix or mix_names}
+    results = {
+        name: run_mix(dictionaries, queries, args.threads, args.repeat)
+        for name, queries in query_sets.items()
+    }
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    formats = index_formats(dictionaries)
+    if "_tree" in baseline:
+        print(f"baseline: {baseline['_tree']}, index: {baseline['_index_format']}")
+        if baseline["_index_format"] != formats:
+            print(f"インデックス表の形式が baseline と違う({formats})ので、比べません。")
+            baseline = {}
+    regressions = find_regressions(
+        results, baseline,
+        lambda result, base: is_worse(result, base, args.threshold))
+    print_table(results, baseline, regressions)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, index_format=formats)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
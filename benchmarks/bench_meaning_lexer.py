@@ -0,0 +1,139 @@
+"""
+意味の文字列のパースを、MeaningLexer による実装と、以前の regex を何度も走査する実装とで比べます。
+okinawa_01.tsv の「意味 1.」～「意味 5.」のすべてを対象にし、両者の出力が一致することも確かめます。
+パース全体の時間は沖縄語の発音の生成が大半を占めるので、トークンへの分解だけの時間も別に計ります。
+
+    python benchmarks/bench_meaning_lexer.py
+"""
+import re
+import sys
+import time
+from csv import DictReader
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from generate_base_json import Oki2YamatoConverter  # noqa: E402
+from kanahyouki import PhoneticsBuilder, generate_phonetics  # noqa: E402
+import serialisation  # noqa: E402
+
+meaning_keys = ['意味 1.', '意味 2.', '意味 3.', '意味 4.', '意味 5.']
+
+
+def legacy_split_sentence(ex, sentence):
+    split_sentence = []
+    for oki in ex.findall(sentence):
+        p = re.compile(re.escape(oki))
+        pre, post = p.split(sentence, maxsplit=1)
+        pre_parity = pre.count("（") - pre.count("）")
+        post_parity = post.count("（") - post.count("）")
+        if pre_parity + post_parity != 0:
+            raise Exception
+        if pre_parity == 0:
+            split_sentence.extend([pre, oki])
+            sentence = post
+    split_sentence.append(sentence)
+    return split_sentence
+
+
+def legacy_oki_sentence2kana(sentence):
+    oki_word_in_sentence_pattern = re.compile(r"([a-zA-Z?']+)")
+    builder = PhoneticsBuilder()
+    for word in oki_word_in_sentence_pattern.split(sentence):
+        if word and oki_word_in_sentence_pattern.match(word):
+            word = generate_phonetics(word)
+        builder.append(word)
+    return builder.build()
+
+
+def legacy_kanafy_okinawan_in_yamato(sentence):
+    cls = Oki2YamatoConverter
+    found_okis = cls.okinawan_in_sentence_pattern.findall(sentence)
+    okinawan_list = [
+        legacy_oki_sentence2kana(phoneme) for phoneme in found_okis
+        if not re.fullmatch(
+            r"(\]?[a-zA-Z?\s～\]]\.?|-self|apocopated\s?form)", phoneme)
+    ]
+    for ipa in cls.ipa_in_sentence_pattern.findall(sentence):
+        okinawan_list.append(cls._ipa2phonetics(ipa))
+    return okinawan_list
+
+
+def legacy_parse_meaning_string(sentence):
+    paragraphs = []
+    split_s = legacy_split_sentence(
+        Oki2YamatoConverter.example_sentences_pattern, sentence)
+    first_paragraph = {"yamato": split_s[0]}
+    if okinawago := legacy_kanafy_okinawan_in_yamato(split_s[0]):
+        first_paragraph["okinawago"] = okinawago
+    paragraphs.append(first_paragraph)
+    remains = split_s[1:]
+    for i in range(0, len(remains), 2):
+        paragraphs.append({"okinawago": legacy_oki_sentence2kana(remains[i])})
+        yamato_para = {"yamato": remains[i + 1]}
+        if okinawago := legacy_kanafy_okinawan_in_yamato(remains[i + 1]):
+            yamato_para["okinawago"] = okinawago
+        paragraphs.append(yamato_para)
+    return paragraphs
+
+
+def legacy_tokenize(sentence):
+    """legacy_parse_meaning_string の、発音を生成しない部分(文字列の走査)だけ。"""
+    cls = Oki2YamatoConverter
+    split_s = legacy_split_sentence(cls.example_sentences_pattern, sentence)
+    for yamato in split_s[::2]:
+        [
+            phoneme
+            for phoneme in cls.okinawan_in_sentence_pattern.findall(yamato)
+            if not re.fullmatch(
+                r"(\]?[a-zA-Z?\s～\]]\.?|-self|apocopated\s?form)", phoneme)
+        ]
+        cls.ipa_in_sentence_pattern.findall(yamato)
+
+
+def lexer_tokenize(sentence):
+    list(Oki2YamatoConverter.meaning_lexer.tokenize(sentence))
+
+
+def load_meaning_strings():
+    cls = Oki2YamatoConverter
+    meanings = []
+    with open(cls.source, 'r') as base_file:
+        for row in DictReader(base_file, delimiter='\t'):
+            headword = cls._refine_oki_phoneme(row["見出し語"]) + " "
+            meanings.extend(row[key].replace("～", headword)
+                            for key in meaning_keys if row[key])
+    return meanings
+
+
+def time_parser(parser, meanings, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [parser(meaning) for meaning in meanings]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    meanings = load_meaning_strings()
+    legacy_time, legacy_results = time_parser(legacy_parse_meaning_string,
+                                              meanings)
+    lexer_time, lexer_results = time_parser(
+        Oki2YamatoConverter._parse_meaning_string, meanings)
+    if serialisation.dumps(legacy_results) != serialisation.dumps(lexer_results):
+        raise AssertionError("MeaningLexer の出力が以前の実装と一致しません。")
+    legacy_tokenize_time, _ = time_parser(legacy_tokenize, meanings)
+    lexer_tokenize_time, _ = time_parser(lexer_tokenize, meanings)
+    print(f"meaning strings: {len(meanings)}")
+    for name, elapsed in [("legacy", legacy_time), ("lexer", lexer_time),
+                          ("legacy tokenize", legacy_tokenize_time),
+                          ("lexer tokenize", lexer_tokenize_time)]:
+        print(f"{name:>16}: {elapsed:.3f} s "
+              f"({elapsed / len(meanings) * 1e6:.1f} µs/string)")
+    print(f"speedup: {legacy_time / lexer_time:.2f}x (parse), "
+          f"{legacy_tokenize_time / lexer_tokenize_time:.2f}x (tokenize)")
+
+
+if __name__ == "__main__":
+    main()
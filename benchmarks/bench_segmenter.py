@@ -0,0 +1,107 @@
+"""
+分かち書きのベンチマーク。
+沖日辞典(okinawa_01)の用例の文(meaning の中の、沖縄語の文)の平民の仮名から空白を除いてつなげた文章を、
+segmenter.Segmenter で分け、速さ(１ミリ秒あたりの文字数)と、元の空白の位置に対する語の境目の適合率と再現率を報告します。
+用例の文は活用した形を多く含むので、活用形を入れない辞書と入れた辞書の両方で計ります。
+
+    python benchmarks/bench_segmenter.py
+    python benchmarks/bench_segmenter.py --repeat 3 --chunk-size 1024
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "src"))
+
+from okinawago_dictionary import dictionary  # noqa: E402
+from okinawago_dictionary.segmenter import Segmenter, is_kana, modes  # noqa: E402
+
+
+def iter_example_sentences(oki_dict) -> Iterator[str]:
+    """用例の文の、平民の最初の仮名。"""
+    for entry_id in sorted(
+            {i
+             for word in oki_dict.index_words
+             for i in oki_dict.get_keys(word)}):
+        for meaning in oki_dict.get_content(entry_id)["meaning"]:
+            for item in meaning:
+                okinawago = item.get("okinawago")
+                if isinstance(okinawago, dict):
+                    yield okinawago["pronunciation"]["HEIMIN"]["kana"][0]
+
+
+def build_corpus(sentences: List[str]) -> Tuple[str, Set[int]]:
+    """空白を除いてつなげた文章と、元の空白(と仮名でない文字の前後)にあたる語の境目の位置。"""
+    chars: List[str] = []
+    boundaries: Set[int] = set()
+    for sentence in sentences:
+        for c in sentence:
+            if c.isspace():
+                boundaries.add(len(chars))
+                continue
+            if not is_kana(c):
+                boundaries.add(len(chars))
+                boundaries.add(len(chars) + 1)
+            chars.append(c)
+        chars.append("\n")
+        boundaries.add(len(chars) - 1)
+        boundaries.add(len(chars))
+    return "".join(chars), boundaries
+
+
+def iter_chunks(text: str, chunk_size: int) -> Iterator[str]:
+    for i in range(0, len(text), chunk_size):
+        yield text[i:i + chunk_size]
+
+
+def evaluate(segmenter: Segmenter, text: str, boundaries: Set[int],
+             chunk_size: int, repeat: int) -> Dict[str, float]:
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = list(segmenter.iter_tokens(iter_chunks(text, chunk_size)))
+        seconds = min(seconds, time.perf_counter() - start)
+    predicted = {token.start for token in tokens} | {len(text)}
+    correct = len(predicted & boundaries)
+    return {
+        "chars_per_ms": len(text) / seconds / 1000,
+        "precision": correct / len(predicted),
+        "recall": correct / len(boundaries),
+        "unknown_chars": sum(
+            token.end - token.start for token in tokens
+            if not token.known and is_kana(token.surface[0])) / len(text),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--chunk-size',
+                        type=int,
+                        default=4096,
+                        help="iter_tokens に渡すかたまりの文字数")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    oki_dict = dictionary.oki_dict
+    text, boundaries = build_corpus(list(iter_example_sentences(oki_dict)))
+    print(f"{len(text)} chars, {len(boundaries)} boundaries")
+    print(f"{'mode':<10}{'inflections':>12}{'chars/ms':>10}{'precision':>11}"
+          f"{'recall':>8}{'unknown':>9}")
+    for inflections in (False, True):
+        for mode in modes:
+            segmenter = Segmenter.from_dictionary(oki_dict, inflections, mode)
+            result = evaluate(segmenter, text, boundaries, args.chunk_size,
+                              args.repeat)
+            print(f"{mode:<10}{str(inflections):>12}"
+                  f"{result['chars_per_ms']:>10.0f}"
+                  f"{result['precision']:>11.3f}{result['recall']:>8.3f}"
+                  f"{result['unknown_chars']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+ベンチマーク用に、resources/base_lists の TSV から一定間隔で行を抜き出した、固定のスライスを作ります。
+スライスはレポジトリに含めてあるので、TSV が修正されてもベンチマークの対象は変わりません。
+
+    python benchmarks/make_slices.py
+"""
+from csv import reader, writer
+from pathlib import Path
+
+base_dir = Path(__file__).parents[1] / "resources" / "base_lists"
+data_dir = Path(__file__).parent / "data"
+
+# (元の TSV, 抜き出す間隔)
+slice_specs = {
+    "okinawa_01.tsv": 29,
+    "okinawa_02.tsv": 20,
+}
+
+
+def slice_path(tsv_name: str) -> Path:
+    return data_dir / tsv_name.replace(".tsv", "_slice.tsv")
+
+
+def main():
+    data_dir.mkdir(exist_ok=True)
+    for tsv_name, step in slice_specs.items():
+        with open(base_dir / tsv_name, 'r', newline='') as base_file:
+            rows = list(reader(base_file, delimiter='\t'))
+        header, body = rows[0], rows[1:]
+        with open(slice_path(tsv_name), 'w', newline='') as slice_file:
+            tsv_writer = writer(slice_file, delimiter='\t')
+            tsv_writer.writerow(header)
+            tsv_writer.writerows(body[::step])
+
+
+if __name__ == "__main__":
+    main()
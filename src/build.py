@@ -0,0 +1,321 @@
+"""
+辞書のすべての生成物をまとめて作ります。
+
+    xlsx -> TSV -> 辞書の JSON + インデックス表   (o2y, y2o)
+    dict_items.jsonl -> 活用辞典の JSON + インデックス表   (katsuyou)
+    沖日辞典の JSON + 活用辞典の JSON -> 例文のコンコーダンス   (concordance)
+    日沖辞典の JSON -> 沖縄語の訳からの逆引き索引   (okinawan-index)
+    ３つの辞書の JSON -> 辞書の間のエントリーの対応表   (links)
+    各辞書の JSON + インデックス表 -> 五十音の行ごとのシャードと manifest   (shards)
+
+入力ファイルと生成に使うコードのハッシュを .build_cache/build-stamps.json に記録し、
+前回から変わっていなくて出力も揃っているものは作り直しません。
+互いに依存しない辞書は別々のプロセスで並列に作り、どの出力も一時ファイルに書いてから置き換えます。
+TSV は手で修正してあるので、ないときだけ xlsx から作ります。
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import click
+
+from conversion_cache import default_cache_dir, dependency_paths, hash_files
+from generate_base_json import (converter_dict, output_paths,
+                                write_dictionary, xlsx_path_dict)
+from entry_diff import load_entries
+from utils import atomic_write
+from okinawago_dictionary import (concordance, index_table, kana_key, links,
+                                  okinawan_index, packed, shards)
+from okinawago_dictionary.links import (LinkTable, build_links,
+                                        default_links_path, format_stats)
+from okinawago_dictionary.okinawan_index import (OkinawanIndex,
+                                                 default_okinawan_index_path)
+from okinawago_dictionary.index_table import index_table_file_name
+from okinawago_dictionary.packed import entries_file_name
+from okinawago_dictionary.shards import default_shard_dir, manifest_name
+from sharding import write_manifest, write_shards
+from okinawago_dictionary.concordance import (Concordance,
+                                              default_concordance_path,
+                                              iter_katsuyou_sentences,
+                                              iter_oki_dict_sentences)
+import uchinaaguchi_katsuyou_jiten.generate_dictionary as katsuyou
+
+src_dir = Path(__file__).parent
+stamps_path = default_cache_dir / "build-stamps.json"
+
+
+class Target(NamedTuple):
+    name: str
+    inputs: List[Path]
+    outputs: List[Path]
+    build: Callable[[], None]
+    # 先に作っておく必要のある生成物の名前。その出力はこの生成物の inputs にも含める。
+    deps: Tuple[str, ...] = ()
+
+    def stamp(self, options: Dict) -> str:
+        """入力とコードのハッシュに、出力の形式などのオプションを加えたもの。"""
+        digest = hashlib.sha256(hash_files(self.inputs).encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def is_up_to_date(self, stamps: Dict[str, str], options: Dict) -> bool:
+        return (stamps.get(self.name) == self.stamp(options)
+                and all(path.exists() for path in self.outputs))
+
+
+def _build_dictionary(dict_type: str, file_format: str, compact: bool,
+                      paradigms: bool):
+    tsv_path = Path(converter_dict[dict_type].source)
+    if not tsv_path.exists():
+        from xlsx2tsv import xlsx2tsv
+        xlsx2tsv(xlsx_path_dict[dict_type], tsv_path)
+    write_dictionary(dict_type,
+                     file_format=file_format,
+                     compact=compact,
+                     paradigms=paradigms)
+
+
+def _build_katsuyou(file_format: str, compact: bool):
+    katsuyou.build(file_format, compact)
+
+
+def _build_shards(shard_sources: Dict[str, List[Path]]):
+    dictionaries = {}
+    for stem, (entries_path, index_table_path) in shard_sources.items():
+        with open(index_table_path, 'r') as fp:
+            index_table = json.load(fp)
+        dictionaries[stem] = write_shards(stem, load_entries(entries_path),
+                                          index_table, default_shard_dir)
+    write_manifest(dictionaries, default_shard_dir)
+
+
+def _build_concordance(oki_dict_path: Path, katsuyou_path: Path):
+    sentences = list(iter_oki_dict_sentences(load_entries(oki_dict_path)))
+    sentences.extend(iter_katsuyou_sentences(load_entries(katsuyou_path)))
+    with atomic_write(default_concordance_path) as fp:
+        Concordance.build(sentences).save(fp)
+
+
+def _build_okinawan_index(yamato_dict_path: Path):
+    with atomic_write(default_okinawan_index_path) as fp:
+        OkinawanIndex.build(load_entries(yamato_dict_path)).save(fp)
+
+
+def _build_links(oki_dict_path: Path, yamato_dict_path: Path,
+                 katsuyou_path: Path):
+    link_table = build_links(load_entries(oki_dict_path),
+                             load_entries(yamato_dict_path),
+                             load_entries(katsuyou_path))
+    for line in format_stats(link_table["stats"]):
+        click.echo(f"links: {line}")
+    with atomic_write(default_links_path) as fp:
+        LinkTable(link_table["links"], link_table["stats"]).save(fp)
+
+
+def get_targets(file_format: str = "json",
+                compact: bool = False,
+                paradigms: bool = False) -> Dict[str, Target]:
+    targets = {}
+    # 書き出しの形式のコード。変換のキャッシュには関係しない。
+    writer_paths = [Path(packed.__file__), Path(index_table.__file__)]
+    for dict_type in converter_dict:
+        targets[dict_type] = Target(
+            dict_type,
+            [Path(converter_dict[dict_type].source)] + dependency_paths +
+            writer_paths,
+            list(output_paths(dict_type, file_format)),
+            partial(_build_dictionary, dict_type, file_format, compact,
+                    paradigms),
+        )
+    katsuyou_outputs = [
+        katsuyou.target_dir / entries_file_name("katsuyou_jiten", file_format),
+        katsuyou.target_dir / "katsuyou_jiten_index-table.json",
+        katsuyou.target_dir / index_table_file_name("katsuyou_jiten"),
+    ]
+    targets["katsuyou"] = Target(
+        "katsuyou",
+        [
+            katsuyou.source_path,
+            Path(katsuyou.__file__),
+            src_dir / "utils.py",
+        ] + writer_paths,
+        katsuyou_outputs,
+        partial(_build_katsuyou, file_format, compact),
+    )
+    oki_dict_path = targets["o2y"].outputs[0]
+    targets["concordance"] = Target(
+        "concordance",
+        [oki_dict_path, katsuyou_outputs[0], Path(concordance.__file__)],
+        [default_concordance_path],
+        partial(_build_concordance, oki_dict_path, katsuyou_outputs[0]),
+        ("o2y", "katsuyou"),
+    )
+    yamato_dict_path = targets["y2o"].outputs[0]
+    targets["okinawan-index"] = Target(
+        "okinawan-index",
+        [yamato_dict_path, Path(okinawan_index.__file__)],
+        [default_okinawan_index_path],
+        partial(_build_okinawan_index, yamato_dict_path),
+        ("y2o", ),
+    )
+    targets["links"] = Target(
+        "links",
+        [
+            oki_dict_path, yamato_dict_path, katsuyou_outputs[0],
+            Path(links.__file__),
+            Path(kana_key.__file__),
+            Path(okinawan_index.__file__)
+        ],
+        [default_links_path],
+        partial(_build_links, oki_dict_path, yamato_dict_path,
+                katsuyou_outputs[0]),
+        ("o2y", "y2o", "katsuyou"),
+    )
+    # (エントリー, JSON のインデックス表)
+    shard_sources = {
+        Path(converter_dict["o2y"].source).stem: targets["o2y"].outputs[:2],
+        Path(converter_dict["y2o"].source).stem: targets["y2o"].outputs[:2],
+        "katsuyou_jiten": katsuyou_outputs[:2],
+    }
+    targets["shards"] = Target(
+        "shards",
+        [path for paths in shard_sources.values() for path in paths] +
+        [src_dir / "sharding.py", Path(shards.__file__)],
+        [default_shard_dir / manifest_name],
+        partial(_build_shards, shard_sources),
+        ("o2y", "y2o", "katsuyou"),
+    )
+    return targets
+
+
+def load_stamps(path: Path = stamps_path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+def save_stamps(stamps: Dict[str, str], path: Path = stamps_path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path) as fp:
+        json.dump(stamps, fp, ensure_ascii=False, indent=4)
+
+
+def _run(target: Target) -> str:
+    target.build()
+    return target.name
+
+
+def build_waves(names: List[str],
+                targets: Dict[str, Target]) -> List[List[str]]:
+    """names とその依存先を、依存先が前に来るように、並列に作れるものごとの組に分けます。"""
+    levels: Dict[str, int] = {}
+
+    def level(name: str) -> int:
+        if name not in levels:
+            levels[name] = 1 + max(
+                (level(dep) for dep in targets[name].deps), default=-1)
+        return levels[name]
+
+    for name in names:
+        level(name)
+    waves: List[List[str]] = [[] for _ in range(max(levels.values()) + 1)]
+    for name in targets:
+        if name in levels:
+            waves[levels[name]].append(name)
+    return waves
+
+
+def build_targets(names: List[str],
+                  file_format: str = "json",
+                  compact: bool = False,
+                  jobs: int = 1,
+                  force: bool = False,
+                  paradigms: bool = False) -> List[str]:
+    """names の生成物とその依存先のうち、古いものだけを作り直し、作り直したものの名前を返します。
+    依存先を作り終えてから、その出力を入力とする生成物が古いかどうかを調べます。
+    """
+    targets = get_targets(file_format, compact, paradigms)
+    options = {
+        "format": file_format,
+        "compact": compact,
+        "paradigms": paradigms
+    }
+    built: List[str] = []
+    for wave in build_waves(names, targets):
+        built.extend(
+            _build_wave([targets[name] for name in wave], options, jobs,
+                        force))
+    return built
+
+
+def _build_wave(wave: List[Target], options: Dict, jobs: int,
+                force: bool) -> List[str]:
+    stamps = load_stamps()
+    stale = [
+        target for target in wave
+        if force or not target.is_up_to_date(stamps, options)
+    ]
+    for target in wave:
+        if target not in stale:
+            click.echo(f"{target.name}: up to date")
+    if not stale:
+        return []
+    # ビルド中に入力が変わっても、次回作り直されるように、ハッシュは作り始める前に求める。
+    new_stamps = {target.name: target.stamp(options) for target in stale}
+    built = []
+    try:
+        if jobs > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(min(jobs, len(stale))) as executor:
+                futures = [executor.submit(_run, target) for target in stale]
+                for future in as_completed(futures):
+                    built.append(future.result())
+                    click.echo(f"{built[-1]}: built")
+        else:
+            for target in stale:
+                built.append(_run(target))
+                click.echo(f"{target.name}: built")
+    finally:
+        # 成功したものだけを記録する。
+        stamps.update({name: new_stamps[name] for name in built})
+        save_stamps(stamps)
+    return built
+
+
+@click.command()
+@click.argument('targets',
+                nargs=-1,
+                type=click.Choice(['o2y', 'y2o', 'katsuyou', 'concordance',
+                                  'okinawan-index', 'links', 'shards']))
+@click.option('-j',
+              '--jobs',
+              type=int,
+              default=3,
+              show_default=True,
+              help="並列に作る辞書の数。")
+@click.option('--format',
+              'file_format',
+              type=click.Choice(['json', 'jsonl', 'packed']),
+              default='json',
+              show_default=True)
+@click.option('--compact',
+              is_flag=True,
+              help="インデントせずに書き出す(json のみ)。")
+@click.option('--paradigms',
+              is_flag=True,
+              help="沖日辞典の活用形を展開せず、語幹と活用の種類だけを書き出す。")
+@click.option('-f',
+              '--force',
+              is_flag=True,
+              help="変更がなくても、すべて作り直す。")
+def main(targets, jobs, file_format, compact, paradigms, force):
+    """辞書の生成物を作る。TARGETS を省くと、すべて作る。依存先も必要なら作り直す。"""
+    names = list(targets) or list(get_targets())
+    build_targets(names, file_format, compact, jobs, force, paradigms)
+
+
+if __name__ == "__main__":
+    main()
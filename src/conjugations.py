@@ -1,4 +1,5 @@
-from typing import Dict, NamedTuple, List
+from functools import lru_cache
+from typing import Dict, NamedTuple, List, Optional, Tuple
 
 from kanahyouki import generate_phonetics, WordPhonetics
 
@@ -12,28 +13,115 @@ class Stems(NamedTuple):
     def to_dict(self):
         return {"語幹": self.語根, "基本": self.基本, "連用": self.連用, "音便": self.音便}
 
+    def json_items(self):
+        yield "語幹", self.語根
+        yield "基本", self.基本
+        yield "連用", self.連用
+        yield "音便", self.音便
 
-def _add_kana(conj_dict: Dict[str, str]) -> Dict[str, List[WordPhonetics]]:
+
+def _add_phonetics(
+        conj_dict: Dict[str, str]) -> Dict[str, List[WordPhonetics]]:
     return {
-        conj_type:
-        [generate_phonetics(p).to_dict() for p in pronunc.split("|")]
+        conj_type: [generate_phonetics(p) for p in pronunc.split("|")]
         for conj_type, pronunc in conj_dict.items()
     }
 
 
+def _add_kana(
+    phonetics_dict: Dict[str, List[WordPhonetics]]
+) -> Dict[str, List[Dict]]:
+    return {
+        conj_type: [phonetics.to_dict() for phonetics in phonetics_list]
+        for conj_type, phonetics_list in phonetics_dict.items()
+    }
+
+
 class Conjugation(NamedTuple):
     stems: Stems
     基本派生形: Dict[str, str]
     連用派生形: Dict[str, str]
     音便派生形: Dict[str, str]
+    # 不規則動詞なら、irregular_verb_conjs のキー。
+    verb: Optional[str] = None
 
     def to_dict(self):
-        return {
-            "stems": self.stems.to_dict(),
-            "基本派生形": _add_kana(self.基本派生形),
-            "連用派生形": _add_kana(self.連用派生形),
-            "音便派生形": _add_kana(self.音便派生形)
-        }
+        res = {"stems": self.stems.to_dict()}
+        for key, phonetics_dict in zip(derivative_keys,
+                                       self.derivative_phonetics()):
+            res[key] = _add_kana(phonetics_dict)
+        return res
+
+    def json_items(self):
+        yield "stems", self.stems
+        yield from zip(derivative_keys, self.derivative_phonetics())
+
+    def derivative_phonetics(
+            self) -> Tuple[Dict[str, List[WordPhonetics]], ...]:
+        """基本派生形、連用派生形、音便派生形の発音。不規則動詞の発音は使い回します。"""
+        if self.verb is not None:
+            return _irregular_phonetics(self.verb)
+        return (_add_phonetics(self.基本派生形), _add_phonetics(self.連用派生形),
+                _add_phonetics(self.音便派生形))
+
+    def paradigm(self) -> "Paradigm":
+        """派生形を除いた、語幹と活用の種類だけの形にします。"""
+        if self.verb is not None:
+            return Paradigm("irregular", verb=self.verb)
+        if not (self.基本派生形 or self.連用派生形 or self.音便派生形):
+            return Paradigm("stem_only", self.stems)
+        return Paradigm("regular", self.stems)
+
+
+derivative_keys = ("基本派生形", "連用派生形", "音便派生形")
+
+
+class Paradigm(NamedTuple):
+    """活用の種類と語幹。派生形とその発音は、必要な時に conjugation() や expand_paradigm で作ります。
+    regular: 語幹に決まった語尾を付けて派生形を作る。
+    irregular: irregular_verb_conjs[verb] の派生形を使う。語幹も表から取る。
+    stem_only: 語幹だけで、派生形はない。
+    """
+    conj_class: str
+    stems: Optional[Stems] = None
+    verb: Optional[str] = None
+
+    def to_dict(self):
+        return dict(self.json_items())
+
+    def json_items(self):
+        yield "class", self.conj_class
+        if self.verb is not None:
+            yield "verb", self.verb
+        else:
+            yield "stems", self.stems.to_dict()
+
+    @classmethod
+    def from_dict(cls, paradigm_dict: Dict) -> "Paradigm":
+        stems = paradigm_dict.get("stems")
+        if stems is not None:
+            stems = Stems(stems["語幹"], stems["基本"], stems["連用"], stems["音便"])
+        return cls(paradigm_dict["class"], stems, paradigm_dict.get("verb"))
+
+    def conjugation(self) -> Conjugation:
+        if self.conj_class == "irregular":
+            return irregular_verb_conjs[self.verb]
+        if self.conj_class == "stem_only":
+            return Conjugation(self.stems, {}, {}, {})
+        return _conjugate_from(self.stems)
+
+
+@lru_cache(maxsize=None)
+def _irregular_phonetics(verb: str):
+    """不規則動詞の派生形の発音。同じ動詞が何度出てきても、発音は一度だけ作ります。"""
+    return irregular_verb_conjs[verb]._replace(verb=None).derivative_phonetics()
+
+
+def expand_paradigm(paradigm_dict: Dict) -> Dict:
+    """compact な活用 {"class", "stems" か "verb"} を、派生形とその発音を展開した辞書にします。
+    展開した結果は、活用を展開して書き出した JSON の "conjugation" と同じです。
+    """
+    return Paradigm.from_dict(paradigm_dict).conjugation().to_dict()
 
 
 kihonkei_suffixes = {"否定形": "aN"}
@@ -277,3 +365,7 @@ irregular_verb_conjs.update(sonkei_verbs)
 no_conj_verbs = ["?acizaraN", "dijoori", "SiiraraN", "SiziraraN", "teewa"]
 null_conjugation = Conjugation(Stems("", "", "", ""), {}, {}, {})
 irregular_verb_conjs.update({v: null_conjugation for v in no_conj_verbs})
+irregular_verb_conjs = {
+    verb: conjugation._replace(verb=verb)
+    for verb, conjugation in irregular_verb_conjs.items()
+}
@@ -0,0 +1,95 @@
+"""
+TSV の行ごとの変換結果を保存しておき、変更のない行の変換を省くためのキャッシュ。
+キャッシュは行の内容のハッシュをキーとし、変換器のコードと発音表のハッシュが変わると全体が無効になります。
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import serialisation
+from utils import atomic_write
+
+src_dir = Path(__file__).parent
+
+# 変換結果に影響するファイル。これらのどれかが変わると、キャッシュはすべて無効になる。
+dependency_paths = [
+    src_dir / "generate_base_json.py",
+    src_dir / "kanahyouki.py",
+    src_dir / "conjugations.py",
+    src_dir / "pos.py",
+    src_dir / "serialisation.py",
+    src_dir / "transliteration.py",
+    src_dir / "utils.py",
+    src_dir / "okinawago_dictionary" / "kana_key.py",
+    Path("resources/kana-table.json"),
+    Path("resources/phonetics-table.json"),
+]
+
+default_cache_dir = Path(".build_cache")
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(Path(path).name).encode())
+        with open(path, 'rb') as fp:
+            digest.update(hashlib.sha256(fp.read()).digest())
+    return digest.hexdigest()
+
+
+def hash_row(row: Dict[str, str]) -> str:
+    return hashlib.sha256(
+        json.dumps(list(row.items()), ensure_ascii=False).encode()).hexdigest()
+
+
+class ConversionCache():
+    """行のハッシュから、id を除いた変換結果の compact な JSON 文字列への対応表。"""
+
+    def __init__(self, path: Path, code_hash: str):
+        self.path = Path(path)
+        self.code_hash = code_hash
+        self._old: Dict[str, str] = {}
+        self._new: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls,
+             path: Path,
+             code_hash: Optional[str] = None) -> "ConversionCache":
+        if code_hash is None:
+            code_hash = hash_files(dependency_paths)
+        cache = cls(path, code_hash)
+        if not cache.path.exists():
+            return cache
+        with open(cache.path, 'r') as fp:
+            header = json.loads(fp.readline() or "{}")
+            if header.get("code_hash") != code_hash:
+                return cache
+            for line in fp:
+                row_hash, fragment = line.rstrip("\n").split("\t", 1)
+                cache._old[row_hash] = fragment
+        return cache
+
+    def __contains__(self, row_hash: str) -> bool:
+        return row_hash in self._old
+
+    def get(self, row_hash: str) -> Optional[Dict]:
+        """キャッシュにあれば、id を除いた変換結果を返します。"""
+        fragment = self._old.get(row_hash)
+        if fragment is None:
+            return None
+        self._new[row_hash] = fragment
+        return json.loads(fragment)
+
+    def put(self, row_hash: str, entry: Dict):
+        self._new[row_hash] = serialisation.dumps(
+            {k: v
+             for k, v in entry.items() if k != "id"}, indent=None)
+
+    def save(self):
+        """今回使った行だけをキャッシュに書き出します。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as fp:
+            fp.write(json.dumps({"code_hash": self.code_hash}) + "\n")
+            for row_hash, fragment in self._new.items():
+                fp.write(f"{row_hash}\t{fragment}\n")
@@ -0,0 +1,298 @@
+"""
+辞書の２つのビルドの差分パッチ。
+エントリーは id と内容のハッシュで、インデックス表は見出し語で比べ、変わったものだけをパッチに入れます。
+並び順の違いは、id や見出し語の列に対する編集(difflib の opcode)として記録するので、
+パッチの大きさは変わったエントリーの数に比例します。
+パッチを当てた結果は、元のファイルと同じ形式で書き出し、そのハッシュが新しいビルドと一致することを確かめます。
+インデックス表の CSR 形式(stem_index-table.bin)は json から作れるので、パッチには入れず、パッチを当てた json から作り直します。
+packed 形式(stem.packed.json)のエントリーは、dict に戻したエントリーのリストとして比べ、書き出す時に packed 形式に戻します。
+
+    python src/delta.py make OLD_DIR NEW_DIR patch.json
+    python src/delta.py apply OLD_DIR patch.json OUT_DIR
+"""
+from difflib import SequenceMatcher
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import click
+
+from entry_diff import hash_loaded_entry
+from okinawago_dictionary import index_table
+from okinawago_dictionary.index_table import index_table_file_name
+from okinawago_dictionary.packed import PackedEntries, entries_file_name, is_packed, pack
+from okinawago_dictionary.packed import file_formats as entries_formats
+from utils import atomic_write
+
+dictionary_stems = ["okinawa_01", "okinawa_02", "katsuyou_jiten"]
+patch_version = 1
+
+# 書き出しの形式の候補。(jsonl かどうか, indent, separators)
+file_formats: List[Tuple[bool, Optional[int], Tuple[str, str]]] = [
+    (False, 4, (",", ": ")),
+    (False, None, (", ", ": ")),
+    (False, None, (",", ":")),
+    (True, None, (",", ":")),
+    (True, None, (", ", ": ")),
+]
+
+
+class PatchError(Exception):
+    pass
+
+
+def sha256(encoded: bytes) -> str:
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def encode(obj: Any, file_format: Dict, packed: bool = False) -> bytes:
+    """obj を file_format で書き出したバイト列。packed なら、エントリーのリストの obj を packed 形式にしてから書き出します。"""
+    if packed:
+        obj = pack(obj)
+    separators = tuple(file_format["separators"])
+    if file_format["jsonl"]:
+        return "".join(
+            json.dumps(item, ensure_ascii=False, separators=separators) + "\n"
+            for item in obj).encode()
+    return json.dumps(obj,
+                      ensure_ascii=False,
+                      indent=file_format["indent"],
+                      separators=separators).encode()
+
+
+def decode(encoded: bytes, jsonl: bool, packed: bool = False) -> Any:
+    text = encoded.decode()
+    if packed:
+        return list(PackedEntries(json.loads(text)))
+    if jsonl:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text)
+
+
+def detect_format(obj: Any,
+                  encoded: bytes,
+                  jsonl: bool,
+                  packed: bool = False) -> Dict:
+    """obj をどの形式で書き出すと encoded と一致するかを調べます。"""
+    digest = sha256(encoded)
+    for is_jsonl, indent, separators in file_formats:
+        if is_jsonl != jsonl:
+            continue
+        file_format = {
+            "jsonl": is_jsonl,
+            "indent": indent,
+            "separators": list(separators)
+        }
+        if sha256(encode(obj, file_format, packed)) == digest:
+            return file_format
+    raise PatchError("ファイルの書式が分からないので、同じファイルを作り直せません。")
+
+
+def diff_sequence(old: Sequence, new: Sequence) -> List[List]:
+    """old を new にする編集 [開始, 終了, 置き換える要素のリスト] のリスト。"""
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, list(new[j1:j2])]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def apply_sequence(old: Sequence, edits: List[List]) -> List:
+    new = list(old)
+    for i1, i2, items in reversed(edits):
+        new[i1:i2] = items
+    return new
+
+
+def diff_entries(old: List[Dict], new: List[Dict]) -> Dict:
+    old_hashes = {entry["id"]: hash_loaded_entry(entry) for entry in old}
+    new_ids = [entry["id"] for entry in new]
+    added = [entry for entry in new if entry["id"] not in old_hashes]
+    changed = [
+        entry for entry in new if entry["id"] in old_hashes
+        and hash_loaded_entry(entry) != old_hashes[entry["id"]]
+    ]
+    new_id_set = set(new_ids)
+    return {
+        "order": diff_sequence([entry["id"] for entry in old], new_ids),
+        "removed": [i for i in old_hashes if i not in new_id_set],
+        "added": added,
+        "changed": changed,
+    }
+
+
+def apply_entries(old: List[Dict], delta: Dict) -> List[Dict]:
+    by_id = {entry["id"]: entry for entry in old}
+    for i in delta["removed"]:
+        del by_id[i]
+    for entry in delta["added"] + delta["changed"]:
+        by_id[entry["id"]] = entry
+    order = apply_sequence([entry["id"] for entry in old], delta["order"])
+    return [by_id[i] for i in order]
+
+
+def diff_index_table(old: Dict[str, List[int]],
+                     new: Dict[str, List[int]]) -> Dict:
+    return {
+        "order": diff_sequence(list(old), list(new)),
+        "removed": [key for key in old if key not in new],
+        "set": {
+            key: ids
+            for key, ids in new.items() if old.get(key) != ids
+        },
+    }
+
+
+def apply_index_table(old: Dict[str, List[int]],
+                      delta: Dict) -> Dict[str, List[int]]:
+    table = {key: ids for key, ids in old.items()}
+    for key in delta["removed"]:
+        del table[key]
+    table.update(delta["set"])
+    return {key: table[key] for key in apply_sequence(list(old), delta["order"])}
+
+
+def _empty_like(jsonl: bool, kind: str) -> Any:
+    return [] if jsonl or kind == "entries" else {}
+
+
+def dictionary_files(directory: Path) -> Dict[str, str]:
+    """directory にある辞書のファイル名と、その種類("entries" か "index")。"""
+    files = {}
+    for stem in dictionary_stems:
+        for file_format in entries_formats:
+            name = entries_file_name(stem, file_format)
+            if (directory / name).exists():
+                files[name] = "entries"
+        if (directory / f"{stem}_index-table.json").exists():
+            files[f"{stem}_index-table.json"] = "index"
+    return files
+
+
+def make_patch(old_dir: Path, new_dir: Path) -> Dict:
+    old_files = dictionary_files(old_dir)
+    new_files = dictionary_files(new_dir)
+    patch: Dict[str, Any] = {
+        "version": patch_version,
+        "files": {},
+        "deleted": [name for name in old_files if name not in new_files],
+    }
+    for name, kind in new_files.items():
+        jsonl, packed = name.endswith(".jsonl"), is_packed(name)
+        new_encoded = (new_dir / name).read_bytes()
+        old_encoded = None
+        if name in old_files:
+            old_encoded = (old_dir / name).read_bytes()
+            if old_encoded == new_encoded:
+                continue
+        new = decode(new_encoded, jsonl, packed)
+        old = (decode(old_encoded, jsonl, packed)
+               if old_encoded is not None else _empty_like(jsonl, kind))
+        diff = diff_entries if kind == "entries" else diff_index_table
+        patch["files"][name] = {
+            "kind": kind,
+            "format": detect_format(new, new_encoded, jsonl, packed),
+            "old_sha256": sha256(old_encoded) if old_encoded is not None else None,
+            "new_sha256": sha256(new_encoded),
+            "delta": diff(old, new),
+        }
+    return patch
+
+
+def apply_patch(old_dir: Path, patch: Dict, out_dir: Path) -> List[str]:
+    """old_dir に patch を当てたファイルを out_dir に書き出し、書き出したファイル名を返します。
+    元のファイルか、書き出す内容のハッシュがパッチと合わなければ PatchError を送出します。
+    out_dir が old_dir と同じでもかまいません。パッチを当てないファイルはコピーしません。
+    """
+    if patch.get("version") != patch_version:
+        raise PatchError(f"パッチの版 {patch.get('version')} には対応していません。")
+    results = {}
+    for name, file_patch in patch["files"].items():
+        jsonl, packed = name.endswith(".jsonl"), is_packed(name)
+        old_path = old_dir / name
+        if file_patch["old_sha256"] is None:
+            old = _empty_like(jsonl, file_patch["kind"])
+        else:
+            if not old_path.exists():
+                raise PatchError(f"{old_path} がありません。")
+            old_encoded = old_path.read_bytes()
+            if sha256(old_encoded) != file_patch["old_sha256"]:
+                raise PatchError(f"{old_path} はパッチを作った時のファイルと違います。")
+            old = decode(old_encoded, jsonl, packed)
+        apply = (apply_entries
+                 if file_patch["kind"] == "entries" else apply_index_table)
+        new_encoded = encode(apply(old, file_patch["delta"]),
+                             file_patch["format"], packed)
+        if sha256(new_encoded) != file_patch["new_sha256"]:
+            raise PatchError(f"{name} にパッチを当てた結果のハッシュが合いません。")
+        results[name] = new_encoded
+    # すべて確かめてから書き出す。
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, new_encoded in results.items():
+        with atomic_write(out_dir / name, 'wb') as fp:
+            fp.write(new_encoded)
+        csr_name = _csr_file_name(name)
+        # 元のビルドに CSR 形式の表があれば作り直す。古いままだと、json と違う表が読まれてしまう。
+        if csr_name and ((old_dir / csr_name).exists() or
+                         (out_dir / csr_name).exists()):
+            with atomic_write(out_dir / csr_name, 'wb') as fp:
+                index_table.dump(decode(new_encoded, False), fp,
+                                 hashlib.sha256(new_encoded).digest())
+    if out_dir == old_dir:
+        for name in patch["deleted"]:
+            csr_name = _csr_file_name(name)
+            for path_name in [name, csr_name] if csr_name else [name]:
+                if (out_dir / path_name).exists():
+                    (out_dir / path_name).unlink()
+    return list(results)
+
+
+def _csr_file_name(name: str) -> Optional[str]:
+    """インデックス表 name の CSR 形式のファイル名。name がインデックス表でなければ None。"""
+    suffix = "_index-table.json"
+    if not name.endswith(suffix):
+        return None
+    return index_table_file_name(name[:-len(suffix)])
+
+
+@click.group()
+def cli():
+    pass
+
+
+@click.command()
+@click.argument('old_dir', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument('new_dir', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument('patch_path', type=click.Path(dir_okay=False, path_type=Path))
+def make(old_dir, new_dir, patch_path):
+    """OLD_DIR のビルドを NEW_DIR のビルドにするパッチを作る。"""
+    patch = make_patch(old_dir, new_dir)
+    with atomic_write(patch_path) as fp:
+        json.dump(patch, fp, ensure_ascii=False, separators=(",", ":"))
+    for name, file_patch in patch["files"].items():
+        delta = file_patch["delta"]
+        if file_patch["kind"] == "entries":
+            click.echo(f"{name}: added: {len(delta['added'])}, "
+                       f"removed: {len(delta['removed'])}, "
+                       f"changed: {len(delta['changed'])}")
+        else:
+            click.echo(f"{name}: set: {len(delta['set'])}, "
+                       f"removed: {len(delta['removed'])}")
+
+
+@click.command()
+@click.argument('old_dir', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument('patch_path', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument('out_dir', type=click.Path(file_okay=False, path_type=Path))
+def apply(old_dir, patch_path, out_dir):
+    """OLD_DIR にパッチを当てて、OUT_DIR に書き出す。"""
+    with open(patch_path, 'r') as fp:
+        patch = json.load(fp)
+    for name in apply_patch(old_dir, patch, out_dir):
+        click.echo(f"{name}: patched")
+
+
+cli.add_command(make)
+cli.add_command(apply)
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,150 @@
+"""
+辞書エントリーのリストの構造的な差分。
+エントリーを id で対応づけ、内容のハッシュが同じものは飛ばし、違うものだけをフィールドごとに比較します。
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+import serialisation
+from okinawago_dictionary.packed import PackedEntries, is_packed
+
+
+def load_entries(path: Path) -> List[Dict]:
+    """json か jsonl、packed 形式のエントリーのリストを読み込みます。"""
+    if is_packed(path):
+        return list(PackedEntries.load(path))
+    with open(path, 'r') as fp:
+        if Path(path).suffix == ".jsonl":
+            return [json.loads(line) for line in fp if line.strip()]
+        return json.load(fp)
+
+
+def hash_entry(entry: Any) -> str:
+    encoded = serialisation.dumps(entry, indent=None)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def hash_loaded_entry(entry: Dict) -> str:
+    """json.load したエントリーのハッシュ。hash_entry と同じ値を C 実装の json で求めます。"""
+    encoded = json.dumps(entry,
+                         ensure_ascii=False,
+                         separators=serialisation.compact_separators)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def _format_path(path: Tuple) -> str:
+    return "/".join(str(p) for p in path)
+
+
+# 片方にしかない値を表す。None の値と区別するために使う。
+_absent = object()
+
+
+def _change(path: Tuple, old: Any = _absent, new: Any = _absent) -> Dict:
+    change = {"path": _format_path(path)}
+    if old is not _absent:
+        change["old"] = old
+    if new is not _absent:
+        change["new"] = new
+    return change
+
+
+def diff_values(old: Any, new: Any, path: Tuple = ()) -> Iterator[Dict]:
+    """old と new の違う所を {"path", "old", "new"} の形で返します。
+    片方にしかない値は、もう片方のキー("old" か "new")を含めません。値が None の時と区別するためです。
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in list(old) + [k for k in new if k not in old]:
+            if key not in new:
+                yield _change(path + (key, ), old=old[key])
+            elif key not in old:
+                yield _change(path + (key, ), new=new[key])
+            else:
+                yield from diff_values(old[key], new[key], path + (key, ))
+    elif isinstance(old, list) and isinstance(new, list):
+        for i in range(max(len(old), len(new))):
+            if i >= len(new):
+                yield _change(path + (i, ), old=old[i])
+            elif i >= len(old):
+                yield _change(path + (i, ), new=new[i])
+            else:
+                yield from diff_values(old[i], new[i], path + (i, ))
+    elif old != new or type(old) is not type(new):
+        yield _change(path, old, new)
+
+
+def entry_label(entry: Dict) -> str:
+    """差分の表示に使う、エントリーの見出し語。"""
+    phonetics = entry.get("phonetics")
+    if isinstance(phonetics, dict):
+        return phonetics["phonemes"]["simplified"]
+    if entry.get("index"):
+        return entry["index"][0]
+    return ""
+
+
+def diff_entries(old_entries: Iterable[Dict],
+                 new_entries: Iterable[Dict]) -> Dict:
+    """id で対応づけたエントリーの差分のレポートを返します。
+    old_entries は json.load したもの、new_entries は json_items() を持つオブジェクトを含んでいてもかまいません。
+    """
+    old_by_id = {entry["id"]: entry for entry in old_entries}
+    new_by_id = {entry["id"]: entry for entry in new_entries}
+    added = [i for i in new_by_id if i not in old_by_id]
+    removed = [i for i in old_by_id if i not in new_by_id]
+    changed = []
+    n_unchanged = 0
+    for entry_id, old_entry in old_by_id.items():
+        new_entry = new_by_id.get(entry_id)
+        if new_entry is None:
+            continue
+        if hash_loaded_entry(old_entry) == hash_entry(new_entry):
+            n_unchanged += 1
+            continue
+        new_entry = serialisation.to_builtin(new_entry)
+        changed.append({
+            "id": entry_id,
+            "label": entry_label(new_entry),
+            "changes": list(diff_values(old_entry, new_entry)),
+        })
+    return {
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "unchanged": n_unchanged,
+        },
+        "added": [{
+            "id": i,
+            "label": entry_label(serialisation.to_builtin(new_by_id[i]))
+        } for i in added],
+        "removed": [{
+            "id": i,
+            "label": entry_label(old_by_id[i])
+        } for i in removed],
+        "changed": changed,
+    }
+
+
+def _short(value: Any, width: int = 80) -> str:
+    if value is _absent:
+        return "(なし)"
+    s = json.dumps(value, ensure_ascii=False)
+    return s if len(s) <= width else s[:width - 1] + "…"
+
+
+def print_report(report: Dict, fp: TextIO):
+    """人が読むための差分を書き出します。"""
+    for item in report["removed"]:
+        fp.write(f"- {item['id']} {item['label']}\n")
+    for item in report["added"]:
+        fp.write(f"+ {item['id']} {item['label']}\n")
+    for item in report["changed"]:
+        fp.write(f"~ {item['id']} {item['label']}\n")
+        for change in item["changes"]:
+            fp.write(f"    {change['path']}: {_short(change.get('old', _absent))} -> {_short(change.get('new', _absent))}\n")
+    summary = report["summary"]
+    fp.write(f"added: {summary['added']}, removed: {summary['removed']}, "
+             f"changed: {summary['changed']}, unchanged: {summary['unchanged']}\n")
@@ -1,17 +1,27 @@
 import json
-from typing import List
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from csv import DictReader
 from pathlib import Path
 import re
 from pprint import pprint
 from difflib import unified_diff
 import sys
+from contextlib import nullcontext
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 from wanakana import is_romaji, to_hiragana
 
-from utils import create_index2id_table
-from kanahyouki import generate_phonetics, WordPhonetics, PhonemeSymols, Pronunciation, SocialClass
+from utils import add_to_index2id_table, atomic_write
+from kanahyouki import generate_phonetics, join_phonetics, SocialClass, WordPhonetics
+import serialisation
+import transliteration
+from entry_diff import diff_entries, load_entries, print_report
+from conversion_cache import ConversionCache, default_cache_dir, hash_row
 from pos import get_pos
+from okinawago_dictionary import index_table, kana_key, packed
+import conjugations
+from profiling import StageProfiler, StageStats, print_summary, write_report
 import click
 
 unicode_ranges = {
@@ -39,8 +49,10 @@ def check_paren_parity(n_opening: int, n_closing: int):
 def split_sentence(ex, sentence):
     split_sentence = []
     for oki in ex.findall(sentence):
-        p = re.compile(re.escape(oki))
-        pre, post = p.split(sentence, maxsplit=1)
+        split_at = sentence.find(oki)
+        if split_at < 0:
+            raise ValueError(f"{oki} is not in {sentence}")
+        pre, post = sentence[:split_at], sentence[split_at + len(oki):]
         pre_parity = check_paren_parity(*count_parenthesis(pre))
         post_parity = check_paren_parity(*count_parenthesis(post))
         if pre_parity + post_parity != 0:
@@ -52,6 +64,82 @@ def split_sentence(ex, sentence):
     return split_sentence
 
 
+class MeaningToken(NamedTuple):
+    """kind は "yamato", "example", "okinawan", "ipa" のどれか。"""
+    kind: str
+    text: str
+
+
+class MeaningLexer():
+    """意味の文字列を、大和口の文、例文、大和口の文中の沖縄語、〔〕で囲まれた IPA のトークンに分解します。
+    例文、IPA、沖縄語をまとめた regex で、文字列を一度だけ走査します。
+    括弧（）の中の例文は区切らずに大和口の文の一部とし(split_sentence と同じ)、その中の沖縄語と IPA だけを拾います。
+    大和口の文のトークンの後に、その中の沖縄語と IPA のトークンが出現順に続きます。
+    """
+
+    def __init__(self, example_pattern, okinawan_pattern, ipa_pattern,
+                 exclusion_pattern):
+        self.example_pattern = example_pattern
+        self.exclusion_pattern = exclusion_pattern
+        self.yamato_token_pattern = re.compile(
+            f"(?P<ipa>{ipa_pattern.pattern})|(?P<okinawan>{okinawan_pattern.pattern})")
+        self.token_pattern = re.compile(
+            f"(?P<example>{example_pattern.pattern})|{self.yamato_token_pattern.pattern}")
+
+    def _yamato_token(self, m: re.Match) -> Optional[MeaningToken]:
+        # 元の regex の１番目のグループは、それぞれの名前付きグループのすぐ次のグループになる。
+        if m.lastgroup == "ipa":
+            return MeaningToken("ipa", m.group(m.re.groupindex["ipa"] + 1))
+        phrase = m.group(m.re.groupindex["okinawan"] + 1)
+        if self.exclusion_pattern.fullmatch(phrase):
+            return None
+        return MeaningToken("okinawan", phrase)
+
+    def tokenize(self, sentence: str) -> Iterator[MeaningToken]:
+        total_parity = check_paren_parity(*count_parenthesis(sentence))
+        # 走査した所までの（）の数の差と、今の大和口の文の始まりでのその値。
+        parity = base_parity = 0
+        yamato_start = scanned = 0
+        inner: List[MeaningToken] = []
+        for m in self.token_pattern.finditer(sentence):
+            parity += check_paren_parity(
+                *count_parenthesis(sentence[scanned:m.start()]))
+            scanned = m.end()
+            if m.lastgroup != "example":
+                token = self._yamato_token(m)
+                if token is not None:
+                    inner.append(token)
+                parity += check_paren_parity(*count_parenthesis(m.group()))
+                continue
+            example = m.group()
+            example_parity = check_paren_parity(*count_parenthesis(example))
+            pre_parity = parity - base_parity
+            post_parity = total_parity - parity - example_parity
+            if pre_parity + post_parity != 0:
+                raise ValueError(f"（）の数が合いません: {sentence}")
+            parity += example_parity
+            if pre_parity != 0:
+                # （）の中の例文は区切らない。
+                inner.extend(self.tokenize_yamato(example))
+                continue
+            yield MeaningToken("yamato", sentence[yamato_start:m.start()])
+            yield from inner
+            inner.clear()
+            yield MeaningToken("example", example)
+            yamato_start = m.end()
+            # 区切った後は、例文の後から（）を数え直す(split_sentence と同じ)。
+            base_parity = parity
+        yield MeaningToken("yamato", sentence[yamato_start:])
+        yield from inner
+
+    def tokenize_yamato(self, sentence: str) -> Iterator[MeaningToken]:
+        """大和口の文の中の、沖縄語と IPA のトークン。"""
+        for m in self.yamato_token_pattern.finditer(sentence):
+            token = self._yamato_token(m)
+            if token is not None:
+                yield token
+
+
 class Oki2YamatoConverter():
     source = "./resources/base_lists/okinawa_01.tsv"
     # meaning string のパース用regex.
@@ -67,6 +155,15 @@ class Oki2YamatoConverter():
     }
     example_sentences_pattern = re.compile(
         r"((?![（）,])[-～a-zCSZNQ?\s',=\]（）]{2,}\.)")
+    # okinawan_in_sentence_pattern にかかるもののうち、沖縄語ではないもの
+    okinawan_exclusion_pattern = re.compile(
+        r"(\]?[a-zA-Z?\s～\]]\.?|-self|apocopated\s?form)")
+    oki_word_in_sentence_pattern = transliteration.okinawan_word_pattern
+    nasal_long_vowel_pattern = re.compile(r"([ĩõ])\1")
+    meaning_lexer = MeaningLexer(example_sentences_pattern,
+                                 okinawan_in_sentence_pattern,
+                                 ipa_in_sentence_pattern,
+                                 okinawan_exclusion_pattern)
 
     # example_sentences_pattern = re.compile(
     #     r"(?!）)(?<!（)([-～a-zCSZNQ?\s',=\]（）]{2,}\.(?=!.*）))")
@@ -80,16 +177,15 @@ class Oki2YamatoConverter():
         res = {}
         res["page-in-dict"] = tsv_row["辞書\nページ"]
         pronunciation = tsv_row["見出し語"]
-        pos = get_pos(tsv_row["品詞"], pronunciation)
-        res["pos"] = pos.to_dict()
+        res["pos"] = get_pos(tsv_row["品詞"], pronunciation)
         phonetics = generate_phonetics(pronunciation)
-        phonetics = phonetics.to_dict()
         res["phonetics"] = phonetics
-        pronunciation = phonetics["pronunciation"]
-        indices = pronunciation["HEIMIN"]["kana"].copy()
-        if indices_ := pronunciation.get("SHIZOKU"):
-            indices += indices_["kana"]
-        res["index"] = indices
+        pronunciation = phonetics.pronunciations
+        indices = pronunciation[SocialClass.HEIMIN].kana.copy()
+        if indices_ := pronunciation.get(SocialClass.SHIZOKU):
+            indices += indices_.kana
+        # 表記の揺れは、正準形の１つのキーにまとめる。
+        res["index"] = kana_key.canonical_keys(indices)
         res["accent"] = tsv_row["アクセント型"]
         res["bungo-type"] = tsv_row["文語などの\n種別"]
         res["amendment"] = tsv_row["補足"]
@@ -98,7 +194,7 @@ class Oki2YamatoConverter():
         res["meaning"] = [
             cls._parse_meaning_string(tsv_row[key].replace(
                 "～",
-                cls._refine_oki_phoneme(phonetics["phonemes"]["simplified"]) +
+                cls._refine_oki_phoneme(phonetics.phonemes.simplified) +
                 " ")) for key in keys if tsv_row[key]
         ]
         res["remarks"] = tsv_row["備考"]
@@ -107,91 +203,63 @@ class Oki2YamatoConverter():
 
     @classmethod
     def _join_phonetics_sentence(cls, phonetics_list):
-        joined = WordPhonetics(PhonemeSymols("", ""),
-                               {SocialClass.HEIMIN: Pronunciation("", [""])})
-        for maybe_phonetics in phonetics_list:
-            if not isinstance(maybe_phonetics, WordPhonetics):
-                new_phonetics = WordPhonetics(
-                    PhonemeSymols(maybe_phonetics, maybe_phonetics), {
-                        SocialClass.HEIMIN:
-                        Pronunciation(maybe_phonetics, [maybe_phonetics])
-                    })
-            else:
-                new_phonetics = maybe_phonetics
-            joined += new_phonetics
-        return joined.to_dict()
+        return join_phonetics(phonetics_list)
 
     @classmethod
-    def _oki_sentence2kana(cls, sentence: str) -> str:
-        oki_word_in_sentence_pattern = re.compile(r"([a-zA-Z?']+)")
-        split_sen = oki_word_in_sentence_pattern.split(sentence)
-        # print("oki_sentence: ", split_sen)
-        kana_sentence = []
-        for word in split_sen:
-            if word and oki_word_in_sentence_pattern.match(word):
-                word = generate_phonetics(word)
-            kana_sentence.append(word)
-        # print(kana_sentence)
-        return cls._join_phonetics_sentence(kana_sentence)
+    def _oki_sentence2kana(cls, sentence: str) -> WordPhonetics:
+        return transliteration.sentence_phonetics(sentence)
+
+    @classmethod
+    def _ipa2phonetics(cls, ipa: str) -> WordPhonetics:
+        """〔〕内の IPA 表記から、その IPA を平民の発音とする WordPhonetics を作ります。"""
+        roman = ipa.replace("~", "").replace("C", "h")
+        phonetics = generate_phonetics(roman)
+        for k, v in cls.roman_ipa_dict.items():
+            ipa = ipa.replace(k, v)
+        ipa = cls.nasal_long_vowel_pattern.sub(r"\1ː", ipa)
+        pronunciations = phonetics.pronunciations.copy()
+        pronunciations[SocialClass.HEIMIN] = pronunciations[
+            SocialClass.HEIMIN]._replace(ipa=ipa)
+        return phonetics._replace(pronunciations=pronunciations)
 
     @classmethod
     def _kanafy_okinawan_in_yamato(cls, sentence: str):
-        found_okis = cls.okinawan_in_sentence_pattern.findall(sentence)
-        # print(found_okis)
-        okinawan_list = [
-            cls._oki_sentence2kana(phoneme) for phoneme in found_okis
-            if not re.fullmatch(
-                r"(\]?[a-zA-Z?\s～\]]\.?|-self|apocopated\s?form)", phoneme)
-        ]
-        # print(okinawan_list)
-        ipa_in_sentence = cls.ipa_in_sentence_pattern.findall(sentence)
-        if ipa_in_sentence:
-            # print("IPA:", ipa_in_sentence)
-            new_ipas = []
-            for ipa in ipa_in_sentence:
-                roman = ipa.replace("~", "").replace("C", "h")
-                phonetics = generate_phonetics(roman)
-                for k, v in cls.roman_ipa_dict.items():
-                    ipa = ipa.replace(k, v)
-                ipa = re.sub(r"([ĩõ])\1", r"\1ː", ipa)
-                new_ipas.append(ipa)
-                phonetics_dict = phonetics.to_dict()
-                phonetics_dict["pronunciation"]["HEIMIN"]["IPA"] = ipa
-                okinawan_list.append(phonetics_dict)
-            # print(new_ipas)
-        # print(okinawan_list)
-        return okinawan_list
+        okinawan_list = []
+        ipa_list = []
+        for token in cls.meaning_lexer.tokenize_yamato(sentence):
+            if token.kind == "okinawan":
+                okinawan_list.append(cls._oki_sentence2kana(token.text))
+            else:
+                ipa_list.append(cls._ipa2phonetics(token.text))
+        return okinawan_list + ipa_list
 
     @classmethod
     def _parse_meaning_string(cls, sentence: str):
+        """意味の文字列を、大和口の段落と沖縄語の例文の段落に分けます。
+        大和口の段落の "okinawago" には、文中の沖縄語、〔〕内の IPA の順に、その発音が入ります。
+        """
         paragraphs = []
-        # print("Original: ", sentence)
-        # split_s = cls.example_sentences_pattern.split(sentence)
-        split_s = split_sentence(cls.example_sentences_pattern, sentence)
-        # print("Split_s: ", split_s)
-        sentence = split_s[0]
-        okinawago = cls._kanafy_okinawan_in_yamato(sentence)
-        # pprint("SPLIT_S: ")
-        # pprint(split_s)
-        # pprint("OKINAWAGO:")
-        # pprint(okinawago)
-        first_paragraph = {"yamato": sentence}
-        if okinawago:
-            first_paragraph.update({"okinawago": okinawago})
-        paragraphs.append(first_paragraph)
-        remains = split_s[1:]
-        if remains:
-            for i in range(0, len(remains), 2):
-                # print(remains[i])
+        okinawan_list: List[WordPhonetics] = []
+        ipa_list: List[WordPhonetics] = []
+
+        def close_yamato_paragraph():
+            if okinawan_list or ipa_list:
+                paragraphs[-1]["okinawago"] = okinawan_list + ipa_list
+                okinawan_list.clear()
+                ipa_list.clear()
+
+        for token in cls.meaning_lexer.tokenize(sentence):
+            if token.kind == "yamato":
+                paragraphs.append({"yamato": token.text})
+            elif token.kind == "okinawan":
+                okinawan_list.append(cls._oki_sentence2kana(token.text))
+            elif token.kind == "ipa":
+                ipa_list.append(cls._ipa2phonetics(token.text))
+            else:
+                close_yamato_paragraph()
                 paragraphs.append(
-                    {"okinawago": cls._oki_sentence2kana(remains[i])})
-                yamato_para = {"yamato": remains[i + 1]}
-                okinawago = cls._kanafy_okinawan_in_yamato(remains[i + 1])
-                if okinawago:
-                    yamato_para.update({"okinawago": okinawago})
-                paragraphs.append(yamato_para)
-        # print("PARAGRAPHS:")
-        # pprint(paragraphs)
+                    {"okinawago": cls._oki_sentence2kana(token.text)})
+        close_yamato_paragraph()
         return paragraphs
 
     @classmethod
@@ -199,6 +267,21 @@ class Oki2YamatoConverter():
         pass
 
 
+class ParadigmOki2YamatoConverter(Oki2YamatoConverter):
+    """活用形とその発音を展開せず、語幹と活用の種類(conjugations.Paradigm)だけをエントリーに入れます。
+    活用形は conjugations.expand_paradigm で必要な時に作ります。
+    """
+
+    @classmethod
+    def convert(cls, tsv_row):
+        res = super().convert(tsv_row)
+        conjugation = res["pos"].conjugation
+        if conjugation is not None:
+            res["pos"] = res["pos"]._replace(
+                conjugation=conjugation.paradigm())
+        return res
+
+
 class Yamato2OkiConverter():
     source = "./resources/base_lists/okinawa_02.tsv"
     okinawan_in_related_words = re.compile(
@@ -247,7 +330,7 @@ class Yamato2OkiConverter():
             vocabulary["reference"] = True
         if is_romaji(item_symbols):
             vocabulary.update(
-                {"phonetics": generate_phonetics(item_symbols).to_dict()})
+                {"phonetics": generate_phonetics(item_symbols)})
         # 関連フレーズ: "(敬語|小児語|卑語|時刻|植物名)\w+" の形のもの
         elif m := re.match(r"\((\w+)\)([\w→'?-]+)", item_symbols):
             connotation, item_symbols = m.groups()
@@ -257,7 +340,7 @@ class Yamato2OkiConverter():
             if is_romaji(item_symbols):
                 vocabulary.update({
                     "phonetics":
-                    generate_phonetics(item_symbols).to_dict(),
+                    generate_phonetics(item_symbols),
                     "connotation":
                     connotation
                 })
@@ -268,7 +351,7 @@ class Yamato2OkiConverter():
                            item_symbols):
             m_groups = m.groups()
             vocabulary.update(
-                {"phonetics": generate_phonetics(m_groups[0]).to_dict()})
+                {"phonetics": generate_phonetics(m_groups[0])})
             rest = m_groups[1:]
             related_okinawans_list = []
             for related in rest:
@@ -278,7 +361,7 @@ class Yamato2OkiConverter():
                             "lang":
                             "Okinawa",
                             "phonetics":
-                            generate_phonetics(m_.groups()[1]).to_dict(),
+                            generate_phonetics(m_.groups()[1]),
                             "connotation":
                             "敬語"
                         })
@@ -305,19 +388,230 @@ class Yamato2OkiConverter():
         return [e for sublist in nested_list for e in sublist]
 
 
-def load_n_convert(converter):
-    entry_list = []
-    with open(converter.source, 'r') as base_file:
+class ConversionError(Exception):
+    """TSV の行の変換に失敗した時に、その行の位置を添えて送出します。"""
+
+    def __init__(self, row_id: int, line_num: int, message: str):
+        super().__init__(row_id, line_num, message)
+        self.row_id = row_id
+        self.line_num = line_num
+        self.message = message
+
+    def __str__(self):
+        return f"row {self.row_id} (line {self.line_num}): {self.message}"
+
+
+def _convert_row(converter, row_id: int, line_num: int, row):
+    try:
+        new_entry = {"id": row_id}
+        new_entry.update(converter.convert(row))
+        return new_entry
+    except Exception as e:
+        headword = row.get("見出し語", row.get("見出し"))
+        raise ConversionError(row_id, line_num,
+                              f"{headword}: {e!r}") from e
+
+
+def _convert_chunk(converter, chunk):
+    return [_convert_row(converter, *numbered_row) for numbered_row in chunk]
+
+
+def _read_rows(source):
+    """TSV の各行を (id, 行番号, 行) の組にして返します。行番号は、その行の最終行です。
+    source が xlsx なら、TSV を介さずに最初のシートを直接読みます。行番号はシートの行番号です。
+    """
+    if Path(source).suffix == ".xlsx":
+        from xlsx2tsv import iter_dict_rows
+        return [(i, line_num, row)
+                for i, (line_num, row) in enumerate(iter_dict_rows(source))]
+    with open(source, 'r') as base_file:
         base_tsv = DictReader(base_file, delimiter='\t')
+        return [(i, base_tsv.line_num, row) for i, row in enumerate(base_tsv)]
+
+
+def _iter_converted(converter,
+                    numbered_rows,
+                    jobs: int = 1,
+                    chunk_size: int = 500) -> Iterator[Dict]:
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(numbered_rows) <= chunk_size:
+        for numbered_row in numbered_rows:
+            yield _convert_row(converter, *numbered_row)
+        return
+    chunks = [
+        numbered_rows[i:i + chunk_size]
+        for i in range(0, len(numbered_rows), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for converted in executor.map(_convert_chunk,
+                                      [converter] * len(chunks), chunks):
+            yield from converted
+
+
+def iter_convert(converter,
+                 jobs: int = 1,
+                 chunk_size: int = 500,
+                 source: Optional[str] = None) -> Iterator[Dict]:
+    """変換したエントリーを id の順に１つずつ返します。source を省くと converter.source を読みます。"""
+    return _iter_converted(converter, _read_rows(source or converter.source),
+                           jobs, chunk_size)
+
+
+def load_n_convert(converter, jobs: int = 1, chunk_size: int = 500):
+    """jobs が 2 以上の時は、行を chunk_size ずつに区切ってプロセスプールで変換します。
+    jobs が 0 の時は、CPU の数だけプロセスを使います。
+    結果は直列に変換した時と同じ順序、同じ id になります。
+    """
+    return list(iter_convert(converter, jobs, chunk_size))
 
-        for i, entry in enumerate(base_tsv):
-            new_entry = {"id": i}
-            new_entry.update(converter.convert(entry))
-            entry_list.append(new_entry)
-    return entry_list
+
+def load_n_convert_incremental(
+        converter,
+        cache: ConversionCache,
+        jobs: int = 1,
+        source: Optional[str] = None) -> Tuple[Iterator[Dict], int, int]:
+    """キャッシュにない行だけを変換し、キャッシュにある行の変換結果とつなぎ合わせます。
+    (エントリーのイテレーター, 再利用した行数, 変換した行数) を返します。
+    """
+    numbered_rows = _read_rows(source or converter.source)
+    row_hashes = [hash_row(row) for _, _, row in numbered_rows]
+    stale = [
+        numbered_row
+        for numbered_row, row_hash in zip(numbered_rows, row_hashes)
+        if row_hash not in cache
+    ]
+
+    def splice():
+        converted = _iter_converted(converter, stale, jobs)
+        for (row_id, _, _), row_hash in zip(numbered_rows, row_hashes):
+            cached = cache.get(row_hash)
+            if cached is None:
+                entry = next(converted)
+                cache.put(row_hash, entry)
+            else:
+                entry = {"id": row_id}
+                entry.update(cached)
+            yield entry
+
+    return splice(), len(numbered_rows) - len(stale), len(stale)
+
+
+def _add_to_index(entries: Iterable[Dict], index2id_table) -> Iterator[Dict]:
+    for entry in entries:
+        add_to_index2id_table(index2id_table, entry)
+        yield entry
+
+
+def _instrument(profiler: StageProfiler, converter):
+    """変換の各段階を profiler で計るように置き換えます。"""
+    this_module = sys.modules[__name__]
+    profiler.patch_converter(converter, ["見出し語", "見出し"])
+    profiler.patch(this_module, "get_pos", "get_pos")
+    profiler.patch(this_module, "generate_phonetics", "generate_phonetics")
+    # 活用形の発音は、書き出す時に生成される。
+    profiler.patch(conjugations, "generate_phonetics", "generate_phonetics")
+    # 文の中の語の発音。
+    profiler.patch(transliteration, "generate_phonetics", "generate_phonetics")
+    profiler.patch(Oki2YamatoConverter, "_parse_meaning_string",
+                   "_parse_meaning_string")
+    profiler.patch(Yamato2OkiConverter, "_parse_contents", "_parse_contents")
 
 
 converter_dict = {"o2y": Oki2YamatoConverter, "y2o": Yamato2OkiConverter}
+xlsx_path_dict = {
+    "o2y": "./resources/okinawa_01.xlsx",
+    "y2o": "./resources/okinawa_02.xlsx",
+}
+target_dir = Path(__file__).parent / "okinawago_dictionary"
+
+
+def output_paths(dict_type: str, file_format: str = "json") -> Tuple[Path, Path, Path]:
+    """(辞書の JSON, インデックス表, CSR 形式のインデックス表) のパスを返します。"""
+    stem = Path(converter_dict[dict_type].source).stem
+    return (target_dir / packed.entries_file_name(stem, file_format),
+            target_dir / f"{stem}_index-table.json",
+            target_dir / index_table.index_table_file_name(stem))
+
+
+def existing_entries_path(dict_type: str) -> Path:
+    """書き出してある辞書のファイル。OkinawagoDictionary の load_entries と同じく、json, jsonl, packed の順に探します。"""
+    for file_format in packed.file_formats:
+        path = output_paths(dict_type, file_format)[0]
+        if path.exists():
+            return path
+    raise click.ClickException(f"{dict_type} の辞書のファイルがありません。先に write してください。")
+
+
+def write_dictionary(dict_type: str,
+                     jobs: int = 1,
+                     file_format: str = "json",
+                     compact: bool = False,
+                     cache: bool = True,
+                     profiler: Optional[StageProfiler] = None,
+                     source: Optional[str] = None,
+                     paradigms: bool = False):
+    """変換したエントリーは、でき次第ファイルに書き出し、インデックス表も同時に作ります。
+    ファイルは一時ファイルに書き出してから置き換えるので、途中で失敗しても元のファイルは壊れません。
+    profiler を渡すと、キャッシュを使わず１プロセスで変換して、各段階の時間を計ります。
+    source に xlsx を渡すと、TSV の代わりにそれを読みます。
+    paradigms なら、沖日辞典の活用は展開せず、語幹と活用の種類だけを書き出します。
+    """
+    converter = converter_dict[dict_type]
+    cache_stem = Path(converter.source).stem
+    if paradigms and dict_type == "o2y":
+        converter = ParadigmOki2YamatoConverter
+        cache_stem += "_paradigms"
+    new_path, index_table_path, csr_path = output_paths(dict_type, file_format)
+
+    if profiler:
+        _instrument(profiler, converter)
+        jobs, cache = 1, False
+
+    def stage(name):
+        return profiler.stage(name) if profiler else nullcontext()
+
+    indent = None if compact else 4
+    if cache:
+        conversion_cache = ConversionCache.load(default_cache_dir /
+                                                f"{cache_stem}.jsonl")
+        entries, n_reused, n_rebuilt = load_n_convert_incremental(
+            converter, conversion_cache, jobs, source)
+        click.echo(f"{dict_type}: reused: {n_reused} rows, rebuilt: {n_rebuilt} rows")
+    else:
+        entries = iter_convert(converter, jobs, source=source)
+    try:
+        if profiler:
+            # 変換と書き出しの時間を分けて計るために、先にすべて変換しておく。
+            with stage("convert_rows"):
+                entries = list(entries)
+        index2id_table: Dict[str, List[int]] = {}
+        entries = _add_to_index(entries, index2id_table)
+        with stage("write_json"), atomic_write(new_path) as base_json:
+            if file_format == "jsonl":
+                serialisation.dump_lines(entries, base_json)
+            elif file_format == "packed":
+                # 文字列表と発音表は全エントリーを見ないと決まらないので、ここだけは先にすべて変換する。
+                packed.dump(map(serialisation.to_builtin, entries), base_json)
+            else:
+                serialisation.dump(entries, base_json, indent=indent)
+        packed.remove_other_formats(new_path.parent,
+                                    Path(converter_dict[dict_type].source).stem,
+                                    file_format)
+
+        with stage("write_index"):
+            with atomic_write(index_table_path) as table_json_path:
+                serialisation.dump(index2id_table,
+                                   table_json_path,
+                                   indent=indent)
+            with atomic_write(csr_path, 'wb') as csr_file:
+                index_table.dump(index2id_table, csr_file,
+                                 index_table.source_digest(index_table_path))
+    finally:
+        if profiler:
+            profiler.restore()
+    if cache:
+        conversion_cache.save()
 
 
 @click.group()
@@ -335,31 +629,49 @@ def cli():
     'dict_type',
     type=click.Choice(['o2y', 'y2o'], case_sensitive=False),
 )
-def diff(dict_type):
+@click.option('-j',
+              '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              show_default=True,
+              help="変換に使うプロセス数。0 なら CPU の数。")
+@click.option('--report',
+              type=click.Path(dir_okay=False, writable=True),
+              help="差分のレポートを JSON で書き出すファイル。")
+@click.option('--unified',
+              is_flag=True,
+              help="エントリーごとではなく、JSON 全体の行の差分 (unified diff) を表示する。")
+@click.option('--paradigms',
+              is_flag=True,
+              help="既存の辞書を write --paradigms で書き出した時に付ける。o2y を同じく語幹と活用の種類だけに変換して比べる。")
+def diff(dict_type, jobs, report, unified, paradigms):
+    """既存の辞書(json, jsonl, packed のどれか)と、TSV から新たに変換した結果を、エントリーの id ごとに比較する。"""
     converter = converter_dict[dict_type]
+    if paradigms and dict_type == "o2y":
+        converter = ParadigmOki2YamatoConverter
 
-    target_dir = Path(__file__).parent / "okinawago_dictionary"
-    json_path = target_dir / Path(converter.source).name.replace(
-        ".tsv", ".json")
+    json_path = existing_entries_path(dict_type)
 
-    entry_list = load_n_convert(converter)
-    with open(json_path, 'r') as old_file:
-        old_json = json.load(old_file)
+    entry_list = load_n_convert(converter, jobs)
+    old_json = load_entries(json_path)
+    if unified:
         old_json_s = json.dumps(
             old_json,
             ensure_ascii=False,
             indent=4,
         )
-        new_json_s = json.dumps(
-            entry_list,
-            ensure_ascii=False,
-            indent=4,
-        )
+        new_json_s = serialisation.dumps(entry_list, indent=4)
         sys.stdout.writelines(
             unified_diff(
                 old_json_s.splitlines(keepends=True),
                 new_json_s.splitlines(keepends=True),
             ))
+        return
+    diff_report = diff_entries(old_json, entry_list)
+    print_report(diff_report, sys.stdout)
+    if report:
+        with open(report, 'w') as report_file:
+            json.dump(diff_report, report_file, ensure_ascii=False, indent=4)
 
 
 cli.add_command(diff)
@@ -370,31 +682,59 @@ cli.add_command(diff)
     'dict_type',
     type=click.Choice(['o2y', 'y2o'], case_sensitive=False),
 )
+@click.option('-j',
+              '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              show_default=True,
+              help="変換に使うプロセス数。0 なら CPU の数。")
+@click.option('--format',
+              'file_format',
+              type=click.Choice(['json', 'jsonl', 'packed']),
+              default='json',
+              show_default=True,
+              help="jsonl なら、１行に１エントリーずつ書き出す。"
+              "packed なら、発音と文字列の重複を除いた形式(okinawago_dictionary/packed.py)で書き出す。")
+@click.option('--compact',
+              is_flag=True,
+              help="インデントや空白を入れずに書き出す。")
+@click.option('--cache/--no-cache',
+              default=True,
+              show_default=True,
+              help="変更のない行は、前回の変換結果を再利用する。")
+@click.option('--profile',
+              'profile_path',
+              type=click.Path(dir_okay=False, writable=True),
+              help="各段階の時間と呼び出し回数を計り、そのレポートを JSON で書き出すファイル。"
+              "計測中はキャッシュを使わず、１プロセスで変換する。")
+@click.option('--slowest',
+              type=click.IntRange(min=0),
+              default=20,
+              show_default=True,
+              help="--profile で記録する、変換の遅い行の数。")
+@click.option('--paradigms',
+              is_flag=True,
+              help="o2y の活用形を展開せず、語幹と活用の種類だけを書き出す。"
+              "活用形は conjugations.expand_paradigm で作る。")
+@click.option('--from-xlsx',
+              is_flag=True,
+              help="手で修正した TSV ではなく、resources の元の xlsx を直接変換する。")
 @click.confirmation_option(
     prompt='Are you sure you want to write out the diffs?')
-def write(dict_type):
-    converter = converter_dict[dict_type]
-
-    target_dir = Path(__file__).parent / "okinawago_dictionary"
-    new_path = target_dir / Path(converter.source).name.replace(
-        ".tsv", ".json")
-    index_table_path = target_dir / Path(converter.source).name.replace(
-        ".tsv", "_index-table.json")
-
-    entry_list = load_n_convert(converter)
-    with open(new_path, 'w') as base_json:
-        json.dump(
-            entry_list,
-            base_json,
-            ensure_ascii=False,
-            indent=4,
-        )
-
-    with open(index_table_path, 'w') as table_json_path:
-        json.dump(create_index2id_table(entry_list),
-                  table_json_path,
-                  ensure_ascii=False,
-                  indent=4)
+def write(dict_type, jobs, file_format, compact, cache, profile_path, slowest,
+          paradigms, from_xlsx):
+    """TSV を変換して、辞書の JSON とインデックス表を書き出す。"""
+    profiler = StageProfiler(slowest) if profile_path else None
+    source = xlsx_path_dict[dict_type] if from_xlsx else None
+    write_dictionary(dict_type, jobs, file_format, compact, cache, profiler,
+                     source, paradigms)
+    if profiler:
+        report = profiler.report(dict_type=dict_type,
+                                 rows=profiler.stages.get(
+                                     "convert", StageStats(0, 0.)).calls)
+        print_summary(report, sys.stderr)
+        with open(profile_path, 'w') as profile_file:
+            write_report(report, profile_file)
 
 
 cli.add_command(write)
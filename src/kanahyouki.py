@@ -8,7 +8,7 @@ word::=mora+...
 - v:semi-vowel
 - V:vowel
 """
-from typing import Any, Dict, List, NamedTuple, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from enum import Enum
 import json
 from itertools import product, zip_longest
@@ -27,6 +27,8 @@ glottal_stops = {"'", '?'}
 others = {' ', '(', ')', ',', '-', '=', ']'}
 
 exceptions = ["hNN"]  # 発音記号の例外
+# kana2phonemes の候補数の既定の上限。沖日辞典の見出し語の音素記号は、どれも 64 番目までに出てくる。
+default_phoneme_limit = 256
 
 with open("resources/kana-table.json", 'r') as kana_list_file:
     pronunc_kana_dict = json.load(kana_list_file)
@@ -93,6 +95,10 @@ def _delete_others(pronunciation: str) -> str:
     return pronunciation
 
 
+class PhonemeError(ValueError):
+    """発音記号の文字列がモーラに分けられないか、仮名にできないモーラを含む時に送出します。"""
+
+
 def _check_glottal_stop(ch_list: List[str]) -> Tuple[str, List[str]]:
     char = ch_list[0]
     if char in glottal_stops:
@@ -101,7 +107,7 @@ def _check_glottal_stop(ch_list: List[str]) -> Tuple[str, List[str]]:
 
 
 def _check_consonant(mora: str, ch_list: List[str]) -> Tuple[str, List[str]]:
-    char = ch_list[0]
+    char = ch_list[0] if ch_list else ""
     if char in sokuon.union(hatsuon):
         return char, ch_list[1:]
     if char in consonants:
@@ -110,17 +116,17 @@ def _check_consonant(mora: str, ch_list: List[str]) -> Tuple[str, List[str]]:
 
 
 def _check_semi_vowels(mora: str, ch_list: List[str]) -> Tuple[str, List[str]]:
-    char = ch_list[0]
+    char = ch_list[0] if ch_list else ""
     if char in semi_vowels:
         return _check_vowel(mora + char, ch_list[1:])
     return _check_vowel(mora, ch_list)
 
 
 def _check_vowel(mora: str, ch_list: List[str]) -> Tuple[str, List[str]]:
-    char = ch_list[0]
+    char = ch_list[0] if ch_list else ""
     if char in vowels:
         return _check_ending(mora + char, ch_list[1:])
-    raise Exception(f"{mora}の次は、母音{{aeiou}}が続きます。")
+    raise PhonemeError(f"{mora}の次は、母音{{aeiou}}が続きます。")
 
 
 def _check_ending(mora: str, ch_list: List[str]) -> Tuple[str, List[str]]:
@@ -154,6 +160,10 @@ class PhonemeSymols(NamedTuple):
     def to_dict(self):
         return {"simplified": self.simplified, "original": self.original}
 
+    def json_items(self):
+        yield "simplified", self.simplified
+        yield "original", self.original
+
     def __add__(self, other):
         return PhonemeSymols(self.simplified + other.simplified,
                              self.original + other.original)
@@ -168,6 +178,10 @@ class Pronunciation(NamedTuple):
     def to_dict(self):
         return {"IPA": self.ipa, "kana": self.kana}
 
+    def json_items(self):
+        yield "IPA", self.ipa
+        yield "kana", self.kana
+
     def __add__(self, other):
         return Pronunciation(self.ipa + other.ipa,
                              [self.kana[0] + other.kana[0]])
@@ -195,6 +209,14 @@ class WordPhonetics(NamedTuple):
             }
         }
 
+    def json_items(self):
+        """to_dict と同じ構造を、dict を作らずに (キー, 値) の組で返します。"""
+        yield "phonemes", self.phonemes
+        yield "pronunciation", {
+            s_class.value: pronunc
+            for s_class, pronunc in self.pronunciations.items()
+        }
+
     def __add__(self, other):
         new_pronunciations_list = [
             list(self.pronunciations.copy().items()),
@@ -229,6 +251,70 @@ class WordPhonetics(NamedTuple):
                              new_pronunciations_dict)
 
 
+class PhoneticsBuilder():
+    """WordPhonetics を左から順に連結します。
+    WordPhonetics.__add__ を繰り返すのと同じ結果を返しますが、各部分は最後に一度だけ join するので、
+    文の長さに対して線形時間で済みます。
+    カナはそれぞれの語の最初のバリエーションのみを連結します。
+    氏族発音を持つ語が一度でも現れたら、それ以降の結果は "SHIZOKU" を持ち、
+    氏族発音のない語は平民の発音で補われます。
+    """
+
+    def __init__(self):
+        self._simplified: List[str] = []
+        self._original: List[str] = []
+        self._heimin: Tuple[List[str], List[str]] = ([], [])
+        self._shizoku: Optional[Tuple[List[str], List[str]]] = None
+
+    def append(self, item: Union[WordPhonetics, str]) -> "PhoneticsBuilder":
+        """item が文字列の時は、音素・IPA・カナのすべてにそのまま追加します。"""
+        if isinstance(item, WordPhonetics):
+            simplified, original = item.phonemes
+            heimin = item.pronunciations[SocialClass.HEIMIN]
+            heimin_ipa, heimin_kana = heimin.ipa, heimin.kana[0]
+            shizoku = item.pronunciations.get(SocialClass.SHIZOKU)
+        else:
+            simplified = original = heimin_ipa = heimin_kana = item
+            shizoku = None
+        self._simplified.append(simplified)
+        self._original.append(original)
+        if shizoku is not None and self._shizoku is None:
+            self._shizoku = (self._heimin[0].copy(), self._heimin[1].copy())
+        self._heimin[0].append(heimin_ipa)
+        self._heimin[1].append(heimin_kana)
+        if self._shizoku is not None:
+            if shizoku is None:
+                self._shizoku[0].append(heimin_ipa)
+                self._shizoku[1].append(heimin_kana)
+            else:
+                self._shizoku[0].append(shizoku.ipa)
+                self._shizoku[1].append(shizoku.kana[0])
+        return self
+
+    def extend(self, items: Iterable[Union[WordPhonetics, str]]) -> "PhoneticsBuilder":
+        for item in items:
+            self.append(item)
+        return self
+
+    def build(self) -> WordPhonetics:
+        pronunciations = {
+            SocialClass.HEIMIN:
+            Pronunciation("".join(self._heimin[0]),
+                          ["".join(self._heimin[1])])
+        }
+        if self._shizoku is not None:
+            pronunciations[SocialClass.SHIZOKU] = Pronunciation(
+                "".join(self._shizoku[0]), ["".join(self._shizoku[1])])
+        return WordPhonetics(
+            PhonemeSymols("".join(self._simplified),
+                          "".join(self._original)), pronunciations)
+
+
+def join_phonetics(items: Iterable[Union[WordPhonetics, str]]) -> WordPhonetics:
+    """WordPhonetics と文字列のリストを連結して、１つの WordPhonetics にします。"""
+    return PhoneticsBuilder().extend(items).build()
+
+
 excel2Original_dict = {
     "?": "ʔ",
     "C": "ç",
@@ -303,6 +389,8 @@ def mora2kana_n_IPA(mora: str) -> Tuple[List[List[str]], List[str]]:
     if _contain_long_vowel(mora):
         mora = mora[:-1]
         long_vowel_sym = ["ー", "ː"]
+    if mora not in roman_to_kana_n_ipa:
+        raise PhonemeError(f"{mora}は仮名にできません。")
     kana_n_ipa = roman_to_kana_n_ipa[mora]
     # print("HOGE", kana_n_ipa)
     return (
@@ -314,17 +402,24 @@ def mora2kana_n_IPA(mora: str) -> Tuple[List[List[str]], List[str]]:
     )
 
 
+def _decompose_kana_variants(sylls: List[str]) -> List[List[str]]:
+    """１つのモーラのカナのバリエーションを、文字ごとの選択肢のリストに分解します。
+    声門閉鎖を含むものは分解せず、バリエーションのリストをそのまま１つの選択肢とします。
+    """
+    if set("'’ァィゥェォ").intersection(set(sylls[0])):
+        return [sylls]
+    decomposed = []
+    for chrs in zip_longest(*sylls):
+        chrs = filter(lambda c: c is not None, chrs)
+        decomposed.append(sorted(set(chrs)))
+    return decomposed
+
+
 def _kana_combinations(kana_list: List[List[str]]) -> List[str]:
     # print(kana_list)
     decomposed_kana_list = []
     for sylls in kana_list:
-        if set("'’ァィゥェォ").intersection(set(sylls[0])):
-            # print("HOGE::", sylls)
-            decomposed_kana_list.append(sylls)
-        else:
-            for chrs in zip_longest(*sylls):
-                chrs = filter(lambda c: c is not None, chrs)
-                decomposed_kana_list.append(sorted(set(chrs)))
+        decomposed_kana_list.extend(_decompose_kana_variants(sylls))
     c2pos_dict: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
     for i, c in enumerate(decomposed_kana_list):
         c2pos_dict[tuple(c)] += [i]
@@ -398,3 +493,123 @@ def convert2kana(pronunciation: str) -> List[str]:
     for kana in product(*kana_list):
         converted.append("".join(kana))
     return converted
+
+
+def _to_katakana(kana_str: str) -> str:
+    return "".join(
+        chr(ord(c) + 0x60) if "\u3041" <= c <= "\u3096" else c
+        for c in kana_str)
+
+
+def _is_single_mora(mora: str) -> bool:
+    try:
+        return split_into_moras(mora) == [mora]
+    except Exception:
+        return False
+
+
+class KanaTransducer():
+    """カナ表記から音素記号への逆変換器。
+    roman_to_kana_n_ipa の平民・士族の両方のカナ表記から、カナ→モーラの trie を作ります。
+    ひとつのカナ表記に複数の音素記号が対応しうるので、候補はすべて返します。
+    候補は、先頭から最長一致で区切ったものから順に並びます。
+    """
+
+    def __init__(self, mora_to_kana: Dict[str, Iterable[str]]):
+        self._trie: Dict[str, Any] = {}
+        for mora, kana_set in mora_to_kana.items():
+            for kana in kana_set:
+                node = self._trie
+                for char in kana:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(mora)
+        self.max_kana_length = max(
+            len(kana) for kana_set in mora_to_kana.values()
+            for kana in kana_set)
+
+    @classmethod
+    def from_tables(cls) -> "KanaTransducer":
+        mora_to_kana: Dict[str, set] = defaultdict(set)
+        for mora, kana_n_ipa in roman_to_kana_n_ipa.items():
+            # 発音記号のパーサーで出てこないもの("’a" など)は除く。
+            if not _is_single_mora(mora):
+                continue
+            for sylls in kana_n_ipa["kana"].values():
+                variants = [
+                    "".join(chars)
+                    for chars in product(*_decompose_kana_variants(sylls))
+                ]
+                mora_to_kana[mora].update(variants)
+                if mora[-1] in vowels:
+                    mora_to_kana[mora + mora[-1]].update(
+                        v + "ー" for v in variants)
+        for exception in exceptions:
+            for kana in get_ipa_n_kana(exception)[SocialClass.HEIMIN].kana:
+                mora_to_kana[exception].add(kana)
+        return cls(mora_to_kana)
+
+    def _matches(self, kana_str: str, start: int) -> List[Tuple[int, str]]:
+        """start から始まる、カナ表記と一致するモーラを長いものから順に返します。"""
+        matches = []
+        node = self._trie
+        for end in range(start, len(kana_str)):
+            node = node.get(kana_str[end])
+            if node is None:
+                break
+            for mora in node.get(None, []):
+                matches.append((end + 1, mora))
+        matches.reverse()
+        return matches
+
+    def segmentations(self, kana_str: str) -> Iterator[List[str]]:
+        """カナ表記をモーラに区切る方法を、最長一致を優先した順に返します。"""
+        kana_str = _to_katakana(kana_str)
+        length = len(kana_str)
+        # 末尾まで区切ることのできる位置だけを辿るように、後ろから到達可能性を求めておく。
+        reachable = [False] * (length + 1)
+        reachable[length] = True
+        edges: List[List[Tuple[int, str]]] = [[] for _ in range(length)]
+        for start in range(length - 1, -1, -1):
+            edges[start] = [(end, mora)
+                            for end, mora in self._matches(kana_str, start)
+                            if reachable[end]]
+            reachable[start] = bool(edges[start])
+        if length == 0 or not reachable[0]:
+            return
+
+        def walk(start: int, path: List[str]) -> Iterator[List[str]]:
+            if start == length:
+                yield path.copy()
+                return
+            for end, mora in edges[start]:
+                path.append(mora)
+                yield from walk(end, path)
+                path.pop()
+
+        yield from walk(0, [])
+
+    def to_phonemes(self,
+                    kana_str: str,
+                    limit: Optional[int] = default_phoneme_limit) -> List[str]:
+        """カナ表記に対応しうる音素記号の候補を返します。limit で候補数の上限を指定できます。
+        候補の数は長さに対して指数的に増えるので(ア が 20 個なら 2^20 個)、既定では default_phoneme_limit 個までにします。
+        すべての候補が必要な時は limit=None を渡します。
+        """
+        candidates: Dict[str, None] = {}
+        for moras in self.segmentations(kana_str):
+            candidates.setdefault("".join(moras))
+            if limit is not None and len(candidates) >= limit:
+                break
+        return list(candidates)
+
+
+_kana_transducer: Optional[KanaTransducer] = None
+
+
+def kana2phonemes(kana_str: str,
+                  limit: Optional[int] = default_phoneme_limit) -> List[str]:
+    """カナ表記を音素記号(excel の簡略表記)の候補のリストに変換します。"""
+    global _kana_transducer
+    if _kana_transducer is None:
+        _kana_transducer = KanaTransducer.from_tables()
+    return _kana_transducer.to_phonemes(kana_str, limit)
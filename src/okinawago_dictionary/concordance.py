@@ -0,0 +1,180 @@
+"""
+例文のコンコーダンス(KWIC)索引。
+沖日辞典(okinawa_01)の意味の中の例文と、活用辞典の sample_sentences を、沖縄語と大和口の組として集め、
+両方の側の文字の bigram から文の番号への転置索引を作ります。
+検索では、クエリーの bigram の転置リストの共通部分だけを str.find で確かめるので、全文を走査しません。
+沖日辞典の沖縄語の側は、辞典の音素表記(phonemes の simplified)です。
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+current_dir = Path(__file__).parent
+default_concordance_path = current_dir / "concordance.json"
+
+sides = ("okinawa", "yamato")
+# 見出し語の代わりに使われる記号。クエリーの端にあれば無視する。
+wildcard_chars = "～〜"
+
+
+class SentencePair(NamedTuple):
+    source: str
+    entry_id: int
+    okinawa: str
+    yamato: str
+
+
+class ConcordanceHit(NamedTuple):
+    """side の文の start から end までがクエリーに一致した。"""
+    sentence: SentencePair
+    side: str
+    start: int
+    end: int
+
+    def kwic(self, width: int = 15) -> Tuple[str, str, str]:
+        """(左の文脈, 一致した部分, 右の文脈) を返します。"""
+        text = getattr(self.sentence, self.side)
+        return (text[max(0, self.start - width):self.start],
+                text[self.start:self.end], text[self.end:self.end + width])
+
+    def to_dict(self):
+        return {
+            "source": self.sentence.source,
+            "id": self.sentence.entry_id,
+            "okinawa": self.sentence.okinawa,
+            "yamato": self.sentence.yamato,
+            "side": self.side,
+            "start": self.start,
+            "end": self.end,
+        }
+
+
+def iter_oki_dict_sentences(entries: Iterable[Dict]) -> Iterator[SentencePair]:
+    """沖縄語の例文の段落と、その直後の大和口の訳の段落を組にします。訳がなければ空文字列にします。"""
+    for entry in entries:
+        for paragraphs in entry["meaning"]:
+            for i, paragraph in enumerate(paragraphs):
+                okinawago = paragraph.get("okinawago")
+                if "yamato" in paragraph or not isinstance(okinawago, dict):
+                    continue
+                yamato = ""
+                if i + 1 < len(paragraphs) and "yamato" in paragraphs[i + 1]:
+                    yamato = paragraphs[i + 1]["yamato"]
+                yield SentencePair("okinawa_01", entry["id"],
+                                   okinawago["phonemes"]["simplified"],
+                                   yamato)
+
+
+def iter_katsuyou_sentences(entries: Iterable[Dict]) -> Iterator[SentencePair]:
+    """活用辞典の例文の語の区切りは全角空白(U+2003)なので、半角空白に直して、沖日辞典と同じように探せるようにします。"""
+    for entry in entries:
+        for sentence in entry.get("sample_sentences", []):
+            yield SentencePair("katsuyou_jiten", entry["id"],
+                               sentence["okinawa"].replace("\u2003", " "),
+                               sentence["yamato"].replace("\u2003", " "))
+
+
+def _bigrams(text: str) -> Iterator[str]:
+    return (text[i:i + 2] for i in range(len(text) - 1))
+
+
+class Concordance():
+
+    def __init__(self, sentences: List[SentencePair],
+                 bigram_index: Dict[str, Dict[str, List[int]]]):
+        self.sentences = sentences
+        self._bigram_index = bigram_index
+
+    @classmethod
+    def build(cls, sentences: Iterable[SentencePair]) -> "Concordance":
+        sentences = list(sentences)
+        bigram_index: Dict[str, Dict[str, List[int]]] = {
+            side: {}
+            for side in sides
+        }
+        for sentence_id, sentence in enumerate(sentences):
+            for side in sides:
+                postings = bigram_index[side]
+                for bigram in set(_bigrams(getattr(sentence, side))):
+                    postings.setdefault(bigram, []).append(sentence_id)
+        return cls(sentences, bigram_index)
+
+    @classmethod
+    def load(cls, path: Path = default_concordance_path) -> "Concordance":
+        with open(path, 'r') as fp:
+            raw = json.load(fp)
+        return cls([SentencePair(*sentence) for sentence in raw["sentences"]],
+                   raw["bigrams"])
+
+    def save(self, fp):
+        json.dump({
+            "sentences": self.sentences,
+            "bigrams": self._bigram_index
+        },
+                  fp,
+                  ensure_ascii=False,
+                  separators=(",", ":"))
+
+    def _candidates(self, query: str, side: str) -> Iterable[int]:
+        if len(query) < 2:
+            return range(len(self.sentences))
+        postings = self._bigram_index[side]
+        lists = sorted((postings.get(bigram, []) for bigram in set(_bigrams(query))),
+                       key=len)
+        candidates = set(lists[0])
+        for sentence_ids in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(sentence_ids)
+        return sorted(candidates)
+
+    def search(self,
+               query: str,
+               side: Optional[str] = None,
+               limit: Optional[int] = None) -> List[ConcordanceHit]:
+        """query を含む文を、一致した位置ごとに返します。side を省くと、沖縄語と大和口の両方を探します。"""
+        query = query.strip(wildcard_chars)
+        if not query:
+            return []
+        hits = []
+        for target_side in ([side] if side else sides):
+            for sentence_id in self._candidates(query, target_side):
+                sentence = self.sentences[sentence_id]
+                text = getattr(sentence, target_side)
+                start = text.find(query)
+                while start >= 0:
+                    hits.append(
+                        ConcordanceHit(sentence, target_side, start,
+                                       start + len(query)))
+                    if limit is not None and len(hits) >= limit:
+                        return hits
+                    start = text.find(query, start + 1)
+        return hits
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('query', help="例: ～nu hujuN")
+    parser.add_argument('--side', choices=sides)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--width', type=int, default=15, help="前後の文脈の文字数")
+    parser.add_argument('--concordance',
+                        type=Path,
+                        default=default_concordance_path)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    concordance = Concordance.load(args.concordance)
+    for hit in concordance.search(args.query, args.side, args.limit):
+        left, match, right = hit.kwic(args.width)
+        other_side = "yamato" if hit.side == "okinawa" else "okinawa"
+        print(f"{hit.sentence.source}:{hit.sentence.entry_id}\t"
+              f"{left:>{args.width}}【{match}】{right}\t"
+              f"{getattr(hit.sentence, other_side)}")
+
+
+if __name__ == "__main__":
+    main()
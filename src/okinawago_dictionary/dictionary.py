@@ -1,37 +1,78 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import hashlib
 import json
-from typing import List
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set
 from pathlib import Path
+import warnings
 
 from wanakana import to_hiragana, to_katakana
 
-current_dir = Path(__file__).parent
-
-with open(current_dir / "okinawa_01.json", 'r') as raw_file:
-    raw_oki_dict = json.load(raw_file)
-
-with open(current_dir / "okinawa_01_index-table.json", 'r') as raw_file:
-    raw_oki_ind_dict = json.load(raw_file)
+from .concordance import Concordance, default_concordance_path
+from .index_table import IndexTable, index_table_file_name, read_source_digest, source_digest
+from .kana_key import canonical_kana
+from .links import LinkTable, default_links_path
+from .okinawan_index import OkinawanIndex, default_okinawan_index_path
+from .packed import PackedEntries, entries_file_name, file_formats
+from .shards import default_shard_dir, load_manifest, row_of
 
-with open(current_dir / "okinawa_02.json", 'r') as raw_file:
-    raw_yamato_dict = json.load(raw_file)
-
-with open(current_dir / "okinawa_02_index-table.json", 'r') as raw_file:
-    raw_yamato_ind_dict = json.load(raw_file)
+current_dir = Path(__file__).parent
 
-with open(current_dir / "katsuyou_jiten.json", 'r') as raw_file:
-    raw_katsuyou_jiten = json.load(raw_file)
 
-with open(current_dir / "katsuyou_jiten_index-table.json", 'r') as raw_file:
-    raw_katsuyou_ind_jiten = json.load(raw_file)
+def load_entries(stem: str) -> Sequence:
+    """stem.json を読み込みます。なければ stem.jsonl を１行ずつ、それもなければ packed 形式の stem.packed.json を読み込みます。
+    packed 形式のエントリーは、使う時に dict に戻します。
+    複数の形式のファイルがある時は、古いものが残っているかもしれないので警告します。
+    """
+    existing = [
+        entries_file_name(stem, file_format) for file_format in file_formats
+        if (current_dir / entries_file_name(stem, file_format)).exists()
+    ]
+    if len(existing) > 1:
+        warnings.warn(f"{', '.join(existing)} があります。{existing[0]} を読みます。")
+    json_path = current_dir / f"{stem}.json"
+    if json_path.exists():
+        with open(json_path, 'r') as raw_file:
+            return json.load(raw_file)
+    jsonl_path = current_dir / f"{stem}.jsonl"
+    if jsonl_path.exists():
+        with open(jsonl_path, 'r') as raw_file:
+            return [json.loads(line) for line in raw_file if line.strip()]
+    return PackedEntries.load(current_dir / entries_file_name(stem, "packed"))
+
+
+def load_index_table(stem: str) -> Mapping[str, List[int]]:
+    """CSR 形式の stem_index-table.bin があれば mmap し、なければ stem_index-table.json を読み込みます。
+    .bin のヘッダーにある JSON のハッシュが今の JSON と違う(JSON だけが作り直されたか、パッチを当てられた)か、
+    .bin の版が違う時は、警告して JSON を読みます。
+    """
+    csr_path = current_dir / index_table_file_name(stem)
+    json_path = current_dir / f"{stem}_index-table.json"
+    if csr_path.exists():
+        if not json_path.exists():
+            return IndexTable.load(csr_path)
+        try:
+            if read_source_digest(csr_path) == source_digest(json_path):
+                return IndexTable.load(csr_path)
+        except ValueError:
+            pass
+        warnings.warn(f"{csr_path.name} は {json_path.name} と合わないので、{json_path.name} を読みます。")
+    with open(json_path, 'r') as raw_file:
+        return json.load(raw_file)
 
 
 class Dictionary(ABC):
+    # 生成物のファイル名の元。links などの辞書をまたぐ表で、この辞書を表す。
+    stem: str
 
     def __init__(self, raw_word_dict, index_to_key_dict):
-        content_dict = {}
-        for entry in raw_word_dict:
-            content_dict[entry["id"]] = entry
+        if hasattr(raw_word_dict, "content_dict"):
+            # packed 形式のエントリーは、引いた時に dict に戻す。
+            content_dict = raw_word_dict.content_dict()
+        else:
+            content_dict = {}
+            for entry in raw_word_dict:
+                content_dict[entry["id"]] = entry
         self._index_to_key_dict = index_to_key_dict
         self._content_dict = content_dict
 
@@ -45,6 +86,12 @@ class Dictionary(ABC):
     def get_content(self, key: int):
         return self._content_dict[key]
 
+    def linked(self, key: int) -> Dict[str, List[int]]:
+        """エントリー key に対応する他の辞書のエントリーの id を、{辞書の stem: [id, ...]} で返します。
+        対応はビルドの時に links.json に求めてあるので、辞書を引き直しません。
+        """
+        return get_link_table().linked(self.stem, key)
+
     @abstractmethod
     def normalise_kana(self, kana_str: str) -> str:
         raise NotImplementedError
@@ -54,19 +101,22 @@ class OkinawagoDictionary(Dictionary):
     """Documentation for OkinawagoDictionary
 
     """
+    stem = "okinawa_01"
 
     def __init__(self, raw_oki_dict, index_to_key_dict):
         super(OkinawagoDictionary, self).__init__(raw_oki_dict,
                                                   index_to_key_dict)
 
     def normalise_kana(self, kana_str: str) -> str:
-        return "".join([c if c == "’" else to_katakana(c, ignore_romaji=True) for c in kana_str])
+        """インデックス表のキーと同じく、表記の揺れをまとめた正準形にします。"""
+        return canonical_kana(kana_str)
 
 
 class YamatogoDictionary(Dictionary):
     """Documentation for YamatoDictionary
 
     """
+    stem = "okinawa_02"
 
     def __init__(self, raw_yamato_dict, index_to_key_dict):
         super(YamatogoDictionary, self).__init__(raw_yamato_dict,
@@ -75,13 +125,25 @@ class YamatogoDictionary(Dictionary):
     def normalise_kana(self, kana_str: str) -> str:
         return to_hiragana(kana_str, ignore_romaji=True)
 
+    def get_keys_by_okinawan(self,
+                             okinawan_word: str,
+                             references: bool = False,
+                             connotations=None) -> List[int]:
+        """沖縄語の仮名か音素表記 okinawan_word を訳に挙げているエントリーの id。
+        絞り込みは OkinawanIndex.lookup と同じです。
+        """
+        return get_okinawan_index().entry_ids(okinawan_word,
+                                              references=references,
+                                              connotations=connotations)
+
 
 class KatsuyouDictionary(Dictionary):
     """Documentation for YamatoDictionary
 
     """
+    stem = "katsuyou_jiten"
 
-    def __init__(self, raw_yamato_dict, index_to_key_dict):
+    def __init__(self, raw_katsuyou_jiten, index_to_key_dict):
         super(KatsuyouDictionary, self).__init__(raw_katsuyou_jiten,
                                                  index_to_key_dict)
 
@@ -89,6 +151,119 @@ class KatsuyouDictionary(Dictionary):
         return to_katakana(kana_str, ignore_romaji=True)
 
 
-oki_dict = OkinawagoDictionary(raw_oki_dict, raw_oki_ind_dict)
-yamato_dict = YamatogoDictionary(raw_yamato_dict, raw_yamato_ind_dict)
-katsuyou_jiten = KatsuyouDictionary(raw_katsuyou_jiten, raw_katsuyou_ind_jiten)
+class ShardedDictionary(Dictionary):
+    """見出し語の五十音の行ごとのシャードから引く辞書。
+    シャードは、その行の見出し語を初めて引いた時に読み込むので、最初の検索の時間とメモリはシャードの大きさで決まります。
+    """
+
+    def __init__(self,
+                 stem: str,
+                 shard_dir: Path = default_shard_dir,
+                 manifest: Optional[Dict] = None,
+                 verify: bool = True):
+        self.stem = stem
+        self._shard_dir = Path(shard_dir)
+        if manifest is None:
+            manifest = load_manifest(self._shard_dir)
+        self._shard_infos = {
+            info["row"]: info
+            for info in manifest["dictionaries"][stem]
+        }
+        self._verify = verify
+        self._index_to_key_dict: Dict[str, List[int]] = {}
+        self._content_dict: Dict[int, Dict] = {}
+        self._loaded_rows: Set[str] = set()
+
+    @property
+    def loaded_rows(self) -> List[str]:
+        return sorted(self._loaded_rows)
+
+    def _load_shard(self, row: str):
+        if row in self._loaded_rows or row not in self._shard_infos:
+            return
+        info = self._shard_infos[row]
+        with open(self._shard_dir / info["path"], 'rb') as raw_file:
+            encoded = raw_file.read()
+        if self._verify and hashlib.sha256(
+                encoded).hexdigest() != info["sha256"]:
+            raise ValueError(f"{info['path']} のハッシュが manifest と違います。")
+        shard = json.loads(encoded)
+        self._index_to_key_dict.update(shard["index"])
+        for entry in shard["entries"]:
+            self._content_dict[entry["id"]] = entry
+        self._loaded_rows.add(row)
+
+    @property
+    def index_words(self):
+        for row in self._shard_infos:
+            self._load_shard(row)
+        return self._index_to_key_dict.keys()
+
+    def get_keys(self, index_word: str) -> List[int]:
+        self._load_shard(row_of(index_word))
+        return self._index_to_key_dict[index_word]
+
+    def get_content(self, key: int):
+        if key not in self._content_dict:
+            for row, info in self._shard_infos.items():
+                if any(first <= key <= last
+                       for first, last in info["id_ranges"]):
+                    self._load_shard(row)
+                    break
+        return self._content_dict[key]
+
+
+class ShardedOkinawagoDictionary(ShardedDictionary, OkinawagoDictionary):
+    pass
+
+
+class ShardedYamatogoDictionary(ShardedDictionary, YamatogoDictionary):
+    pass
+
+
+class ShardedKatsuyouDictionary(ShardedDictionary, KatsuyouDictionary):
+    pass
+
+
+# モジュールの属性としての辞書は、初めて使われた時に読み込む。
+_lazy_attributes: Dict[str, Callable] = {
+    "raw_oki_dict": lambda: load_entries("okinawa_01"),
+    "raw_oki_ind_dict": lambda: load_index_table("okinawa_01"),
+    "raw_yamato_dict": lambda: load_entries("okinawa_02"),
+    "raw_yamato_ind_dict": lambda: load_index_table("okinawa_02"),
+    "raw_katsuyou_jiten": lambda: load_entries("katsuyou_jiten"),
+    "raw_katsuyou_ind_jiten": lambda: load_index_table("katsuyou_jiten"),
+    "oki_dict": lambda: OkinawagoDictionary(
+        __getattr__("raw_oki_dict"), __getattr__("raw_oki_ind_dict")),
+    "yamato_dict": lambda: YamatogoDictionary(
+        __getattr__("raw_yamato_dict"), __getattr__("raw_yamato_ind_dict")),
+    "katsuyou_jiten": lambda: KatsuyouDictionary(
+        __getattr__("raw_katsuyou_jiten"),
+        __getattr__("raw_katsuyou_ind_jiten")),
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _lazy_attributes[name]()
+    globals()[name] = value
+    return value
+
+
+@lru_cache(maxsize=None)
+def get_concordance() -> Concordance:
+    """例文のコンコーダンス。初めて使う時に concordance.json を読み込みます。"""
+    return Concordance.load(default_concordance_path)
+
+
+@lru_cache(maxsize=None)
+def get_okinawan_index() -> OkinawanIndex:
+    """日沖辞典の沖縄語の訳からの逆引き索引。初めて使う時に読み込みます。"""
+    return OkinawanIndex.load(default_okinawan_index_path)
+
+
+@lru_cache(maxsize=None)
+def get_link_table() -> LinkTable:
+    """辞書の間のエントリーの対応表。初めて使う時に links.json を読み込みます。"""
+    return LinkTable.load(default_links_path)
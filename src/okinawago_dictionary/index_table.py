@@ -0,0 +1,138 @@
+"""
+インデックス表(見出し語 -> エントリーの id のリスト)の、配列による形式(CSR)。
+JSON の dict-of-lists の代わりに、見出し語を並べ替えて、次の３つの配列で表します。
+
+    key_offsets[i]:key_offsets[i + 1]  i 番目の見出し語の UTF-8 の、key_blob の中の範囲
+    id_offsets[i]:id_offsets[i + 1]    i 番目の見出し語の id の、ids の中の範囲
+    ids                                すべての見出し語の id を続けて並べたもの
+
+ファイル({stem}_index-table.bin)は、ヘッダーの後に key_offsets, id_offsets, ids(すべて符号なし 32 ビットのリトルエンディアン)、
+key_blob の順に並べたものです。ヘッダーには、同じ表を書き出した {stem}_index-table.json の SHA-256 を入れておき、
+読む側(dictionary.load_index_table)は、それが今の JSON と違えば、古い表として使いません。
+読む時はファイルを mmap し、見出し語から位置への dict だけを作ります。id のリストは get_keys で引いた時に作ります。
+"""
+from array import array
+import hashlib
+from io import BytesIO
+import mmap
+from pathlib import Path
+import struct
+import sys
+from typing import Dict, Iterator, List, Mapping, Sequence
+
+index_table_suffix = "_index-table.bin"
+magic = b"OKIX"
+index_table_version = 2
+# magic, 版, 見出し語の数, id の数, key_blob の長さ, 元の JSON の SHA-256
+header = struct.Struct("<4sIIII32s")
+no_source = bytes(32)
+
+
+def index_table_file_name(stem: str) -> str:
+    return f"{stem}{index_table_suffix}"
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def source_digest(json_path) -> bytes:
+    """dump の source に渡す、インデックス表の JSON のファイルの SHA-256。"""
+    return hashlib.sha256(Path(json_path).read_bytes()).digest()
+
+
+def read_source_digest(path) -> bytes:
+    """CSR 形式のファイルのヘッダーにある、元の JSON の SHA-256。形式か版が違えば ValueError を送出します。"""
+    with open(path, 'rb') as fp:
+        data = fp.read(header.size)
+    if len(data) < header.size:
+        raise ValueError("CSR 形式のインデックス表ではありません。")
+    return _unpack_header(data)[-1]
+
+
+def _unpack_header(buffer):
+    tag, version, *rest = header.unpack_from(buffer)
+    if tag != magic or version != index_table_version:
+        raise ValueError("CSR 形式のインデックス表ではありません。")
+    return rest
+
+
+def dump(index2id_table: Dict[str, Sequence[int]], fp, source: bytes = no_source):
+    """index2id_table を CSR 形式で fp(バイナリ)に書き出します。source は、同じ表の JSON の source_digest です。"""
+    key_offsets = array("I", [0])
+    id_offsets = array("I", [0])
+    ids = array("I")
+    key_blob = bytearray()
+    # UTF-8 のバイト列の順は、str の順(コードポイントの順)と同じ。
+    for key in sorted(index2id_table):
+        key_blob += key.encode()
+        key_offsets.append(len(key_blob))
+        ids.extend(index2id_table[key])
+        id_offsets.append(len(ids))
+    fp.write(
+        header.pack(magic, index_table_version,
+                    len(key_offsets) - 1, len(ids), len(key_blob), source))
+    for values in [key_offsets, id_offsets, ids]:
+        fp.write(_little_endian(values))
+    fp.write(key_blob)
+
+
+class IndexTable(Mapping):
+    """CSR 形式のインデックス表。読み込んだ JSON の dict と同じように、見出し語から id のリストを引けます。
+    見出し語は UTF-8 の順に並びます。
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        n_keys, n_ids, blob_size, self.source = _unpack_header(buffer)
+        arrays = []
+        offset = header.size
+        for size in [n_keys + 1, n_keys + 1, n_ids]:
+            arrays.append(self._uint32s(buffer, offset, size))
+            offset += size * 4
+        key_offsets, self._id_offsets, self._ids = arrays
+        key_blob = bytes(memoryview(buffer)[offset:offset + blob_size])
+        # 見出し語から位置への dict。引く時に key_blob を探さなくてよいように、読み込む時に一度だけ作る。
+        self._positions: Dict[str, int] = {
+            key_blob[key_offsets[i]:key_offsets[i + 1]].decode(): i
+            for i in range(n_keys)
+        }
+
+    @staticmethod
+    def _uint32s(buffer, offset: int, size: int) -> Sequence[int]:
+        view = memoryview(buffer)[offset:offset + size * 4]
+        if sys.byteorder == "big":
+            values = array("I", view)
+            values.byteswap()
+            return memoryview(values)
+        return view.cast("I")
+
+    @classmethod
+    def load(cls, path) -> "IndexTable":
+        with open(path, 'rb') as fp:
+            return cls(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_dict(cls, index2id_table: Dict[str, Sequence[int]]) -> "IndexTable":
+        buffer = BytesIO()
+        dump(index2id_table, buffer)
+        return cls(buffer.getvalue())
+
+    def __getitem__(self, key: str) -> List[int]:
+        i = self._positions[key]
+        return self._ids[self._id_offsets[i]:self._id_offsets[i + 1]].tolist()
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        return dict(self.items())
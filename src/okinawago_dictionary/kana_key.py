@@ -0,0 +1,96 @@
+"""
+沖日辞典(okinawa_01)の見出し語の仮名を、表記の揺れをまとめた１つの形(正準形)にします。
+kanahyouki の _kana_combinations は、同じ発音に対して次のような書き方をすべて作るので、それを最初の書き方にそろえます。
+
+    声門閉鎖の母音    'ア, ァア, アァ → ’ア    (イ, ウ, エ, オも同じ。ヰ → ’イ, ヲゥ → ’ウ)
+    声門閉鎖の子音    ?ヤ, ッヤ → ʔヤ          (ユ, ヨ, ワ, メ, イェ, ウィ, ウェも同じ)
+    ヰェ → イェ, ヂ → ジ, ヅ → ズ
+
+インデックス表を作る時と、引く時(OkinawagoDictionary.normalise_kana)の両方で使うので、どの書き方で引いても同じキーになります。
+士族の発音は平民の発音と別の語形なので(例えば、sja の士族の シャ は、Sa の平民の シャ と同じ)、まとめずに別のキーとして残します。
+"""
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# １文字を１文字にする書き換え。文字数が変わらないので、文の中の位置を保ったまま使える。
+char_folds = {"ヂ": "ジ", "ヅ": "ズ", "'": "’", "?": "ʔ"}
+# translate は１回しか書き換えないので、ぢ は片仮名にしてから char_folds を当てた ジ にする。
+_translate_table: Dict[int, str] = {
+    c: char_folds.get(chr(c + 0x60), chr(c + 0x60))
+    for c in range(ord("ぁ"), ord("ゖ") + 1)
+}
+_translate_table.update({ord(k): v for k, v in char_folds.items()})
+
+_replacements = {"ヲゥ": "’ウ", "ヰェ": "イェ", "ヰ": "’イ", "ッ": "ʔ"}
+_small_first = []
+_vowel_first = []
+for small, vowel in zip("ァィゥェォ", "アイウエオ"):
+    _small_first.append((small, vowel))
+    _vowel_first.append(vowel + small)
+    _replacements[small + vowel] = _replacements[vowel + small] = "’" + vowel
+# 母音と小さい母音で１モーラになるもの。書き換えないが、その小さい母音が次の母音と組まないように先に読む。
+_vowel_digraphs = ["イェ", "ウィ", "ウェ", "ウォ"]
+_replacements.update({digraph: digraph for digraph in _vowel_digraphs})
+
+
+def _compile_variant_pattern(not_mora_start: str) -> re.Pattern:
+    """not_mora_start は、その後の小さい母音がモーラの始めではない文字の集まり。
+    どの選択肢も文字から始めると、re が書き換えのない所を速く飛ばせるので、小さい母音の前は後読みで調べます。
+    """
+    return re.compile(
+        r"ヲゥ|ヰェ|ヰ|ッ(?=[ヤユヨワメ]|[イヰ]ェ|ウィ|ウェ)|" + "|".join(_vowel_digraphs) + "|" +
+        "|".join(f"{small}(?<!{not_mora_start}{small}){vowel}" for small, vowel in _small_first) +
+        "|" + "|".join(_vowel_first))
+
+
+# 複数の文字の書き換えを、１回の走査でします。ッ は声門閉鎖の子音の前だけ。
+# ァア などの小さい母音は、モーラの始め(語の始めか、母音, ー, ン の後)にある時だけ声門閉鎖で、
+# ティイ, トゥウ, ツィイ では前の仮名と組むので書き換えない。アァ などの母音はいつもモーラの始め。
+_variant_pattern = _compile_variant_pattern("[^アイウエオーン]")
+# 書き換えた後の仮名の文字。
+folded_kana_chars = "ァ-ヺーʔ’"
+# 仮名でない文字を含む文の中では、仮名でない文字の後も語の始め。
+_text_variant_pattern = _compile_variant_pattern("[ァィゥェォカ-ヲヴ-ヺʔ’]")
+
+
+def fold_chars(kana: str) -> str:
+    """平仮名を片仮名にし、char_folds の書き換えをします。"""
+    return kana.translate(_translate_table)
+
+
+def _fold_variant(match: re.Match) -> str:
+    return _replacements[match.group(0)]
+
+
+def canonical_kana(kana: str) -> str:
+    return _variant_pattern.sub(_fold_variant, fold_chars(kana))
+
+
+def canonical_kana_with_positions(kana: str) -> Tuple[str, List[int]]:
+    """canonical_kana(kana) と、その文字の境目が kana のどの位置にあたるかのリスト(長さは正準形の長さ + 1)。
+    ヰ -> ’イ のように書き換えで文字が増えた時は、増えた文字の前の境目を書き換えた部分の始めにします。
+    文の中の語の位置を、正準形から元の文に戻すのに使います。
+    kana は仮名でない文字を含んでもよく、その文字はそのまま残し、その後を語の始めとして書き換えます。
+    """
+    folded = fold_chars(kana)
+    parts: List[str] = []
+    positions: List[int] = []
+    i = 0
+    for match in _text_variant_pattern.finditer(folded):
+        start, end = match.span()
+        replaced = _fold_variant(match)
+        parts += [folded[i:start], replaced]
+        positions.extend(range(i, start))
+        if len(replaced) == end - start:
+            positions.extend(range(start, end))
+        else:
+            positions.extend([start] * len(replaced))
+        i = end
+    parts.append(folded[i:])
+    positions.extend(range(i, len(folded) + 1))
+    return "".join(parts), positions
+
+
+def canonical_keys(kana_list: Iterable[str]) -> List[str]:
+    """kana_list の正準形を、重複を除いて元の順に返します。"""
+    return list(dict.fromkeys(canonical_kana(kana) for kana in kana_list))
@@ -0,0 +1,156 @@
+"""
+沖日辞典(okinawa_01)、日沖辞典(okinawa_02)、活用辞典(katsuyou_jiten)のエントリーの対応表。
+ビルドの時に一度だけ、正規化した音素表記と仮名で３つの辞書を突き合わせ、エントリーの id から
+他の辞書の関連するエントリーの id を引ける表を作ります。
+
+    okinawa_01 <-> okinawa_02      沖日辞典の見出しの音素表記と、日沖辞典の訳(→ の参照を除く)の音素表記
+    okinawa_01 <-> katsuyou_jiten  見出しの仮名。活用辞典の動詞の -いん, -ーん は、沖日辞典の -ユン としても突き合わせる
+    okinawa_02 <-> katsuyou_jiten  日沖辞典の訳の仮名と、活用辞典の見出しの仮名
+"""
+import json
+from pathlib import Path
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .kana_key import canonical_kana
+from .okinawan_index import iter_cited_items
+
+current_dir = Path(__file__).parent
+default_links_path = current_dir / "links.json"
+
+stems = ("okinawa_01", "okinawa_02", "katsuyou_jiten")
+
+# 音素表記の中の、形態素の境目やアクセントの記号。
+phoneme_marks = re.compile(r"[=\],\[\s-]")
+kana_marks = re.compile(r"[’'〜～\s]")
+
+
+def phoneme_key(phonemes: str) -> str:
+    return phoneme_marks.sub("", phonemes)
+
+
+def kana_keys(kana: str) -> List[str]:
+    """仮名の突き合わせに使うキー。活用辞典の動詞の終止形(-いん, -ーん)には、沖日辞典の書き方(-ユン)も加えます。"""
+    key = kana_marks.sub("", canonical_kana(kana))
+    keys = [key]
+    if key.endswith("イン") or (key.endswith("ーン") and len(key) > 2):
+        keys.append(key[:-2] + "ユン")
+    return keys
+
+
+def _join(left: Dict[str, Set[int]],
+          right: Dict[str, Set[int]]) -> Set[Tuple[int, int]]:
+    return {(left_id, right_id)
+            for key in left.keys() & right.keys() for left_id in left[key]
+            for right_id in right[key]}
+
+
+def _add_key(keys: Dict[str, Set[int]], key: str, entry_id: int):
+    keys.setdefault(key, set()).add(entry_id)
+
+
+def build_links(oki_entries: Iterable[Dict], yamato_entries: Iterable[Dict],
+                katsuyou_entries: Iterable[Dict]) -> Dict:
+    """{"links": {辞書: {id: {他の辞書: [id, ...]}}}, "stats": 突き合わせの統計} を返します。"""
+    oki_phonemes: Dict[str, Set[int]] = {}
+    oki_kana: Dict[str, Set[int]] = {}
+    n_entries = dict.fromkeys(stems, 0)
+    for entry in oki_entries:
+        n_entries["okinawa_01"] += 1
+        _add_key(oki_phonemes,
+                 phoneme_key(entry["phonetics"]["phonemes"]["simplified"]),
+                 entry["id"])
+        for index in entry["index"]:
+            _add_key(oki_kana, kana_keys(index)[0], entry["id"])
+
+    yamato_phonemes: Dict[str, Set[int]] = {}
+    yamato_kana: Dict[str, Set[int]] = {}
+    for entry in yamato_entries:
+        n_entries["okinawa_02"] += 1
+        for citation, phonetics in iter_cited_items([entry]):
+            if citation.reference:
+                continue
+            _add_key(yamato_phonemes,
+                     phoneme_key(phonetics["phonemes"]["simplified"]),
+                     entry["id"])
+            for pronunciation in phonetics["pronunciation"].values():
+                for kana in pronunciation["kana"]:
+                    _add_key(yamato_kana, kana_keys(kana)[0], entry["id"])
+
+    katsuyou_kana: Dict[str, Set[int]] = {}
+    for entry in katsuyou_entries:
+        n_entries["katsuyou_jiten"] += 1
+        for index in entry["index"]:
+            for key in kana_keys(index):
+                _add_key(katsuyou_kana, key, entry["id"])
+
+    pairs = {
+        ("okinawa_01", "okinawa_02"): _join(oki_phonemes, yamato_phonemes),
+        ("okinawa_01", "katsuyou_jiten"): _join(oki_kana, katsuyou_kana),
+        ("okinawa_02", "katsuyou_jiten"): _join(yamato_kana, katsuyou_kana),
+    }
+    links: Dict[str, Dict[int, Dict[str, List[int]]]] = {
+        stem: {}
+        for stem in stems
+    }
+    # 組を並べ替えてから加えるので、id のリストは昇順になる。
+    for (left, right), joined in pairs.items():
+        for left_id, right_id in sorted(joined):
+            links[left].setdefault(left_id, {}).setdefault(right,
+                                                           []).append(right_id)
+            links[right].setdefault(right_id, {}).setdefault(left,
+                                                             []).append(left_id)
+
+    stats = {}
+    for (left, right), joined in pairs.items():
+        stats[f"{left}-{right}"] = {
+            "pairs": len(joined),
+            "coverage": {
+                left: [len({i for i, _ in joined}), n_entries[left]],
+                right: [len({i for _, i in joined}), n_entries[right]],
+            },
+        }
+    return {"links": links, "stats": stats}
+
+
+def format_stats(stats: Dict) -> List[str]:
+    """ビルドの時に表示する統計。"対応のあるエントリー数/全エントリー数" です。"""
+    lines = []
+    for pair, stat in stats.items():
+        coverages = ", ".join(
+            f"{stem}: {linked}/{total} ({linked / max(total, 1):.1%})"
+            for stem, (linked, total) in stat["coverage"].items())
+        lines.append(f"{pair}: {stat['pairs']} pairs, {coverages}")
+    return lines
+
+
+class LinkTable():
+
+    def __init__(self, links: Dict[str, Dict[int, Dict[str, List[int]]]],
+                 stats: Dict):
+        self._links = links
+        self.stats = stats
+
+    @classmethod
+    def load(cls, path: Path = default_links_path) -> "LinkTable":
+        with open(path, 'r') as fp:
+            raw = json.load(fp)
+        return cls(
+            {
+                stem: {int(i): other
+                       for i, other in linked.items()}
+                for stem, linked in raw["links"].items()
+            }, raw["stats"])
+
+    def save(self, fp):
+        json.dump({
+            "links": self._links,
+            "stats": self.stats
+        },
+                  fp,
+                  ensure_ascii=False,
+                  separators=(",", ":"))
+
+    def linked(self, stem: str, entry_id: int) -> Dict[str, List[int]]:
+        """stem の辞書のエントリー entry_id に対応する、他の辞書のエントリーの id。"""
+        return self._links[stem].get(entry_id, {})
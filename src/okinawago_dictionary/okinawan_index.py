@@ -0,0 +1,156 @@
+"""
+日沖辞典(okinawa_02)の沖縄語の訳からの逆引き索引。
+日沖辞典のインデックス表は大和口の見出しで引くものですが、この索引は contents の base と related の
+沖縄語の項目(とその中の related の項目)の仮名と音素表記から、その項目を訳に挙げている見出しのエントリーを引きます。
+項目の reference(→ による参照)と connotation(敬語など)も記録するので、引く時にそれで絞り込めます。
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from wanakana import to_katakana
+
+current_dir = Path(__file__).parent
+default_okinawan_index_path = current_dir / "okinawa_02_okinawan-index.json"
+
+sections = ("base", "related")
+
+
+class OkinawanCitation(NamedTuple):
+    """日沖辞典のエントリー entry_id の contents の section に、沖縄語の項目が挙がっている。"""
+    entry_id: int
+    section: str
+    reference: bool
+    connotation: Optional[str]
+
+    def to_dict(self):
+        return self._asdict()
+
+
+def _iter_okinawan_items(contents: Dict) -> Iterator[Tuple[str, Dict]]:
+    items = [("base", item) for item in contents["base"]]
+    items.extend(("related", item) for group in contents["related"]
+                 for item in group)
+    for section, item in items:
+        yield section, item
+        # "(敬語)..." や "...の種類" の項目の中の related
+        for sub_item in item.get("related", []):
+            yield section, sub_item
+
+
+def item_forms(phonetics: Dict) -> List[str]:
+    """沖縄語の項目を引ける形: 音素表記(simplified と original)と、すべての階層の仮名。"""
+    forms = [
+        phonetics["phonemes"]["simplified"], phonetics["phonemes"]["original"]
+    ]
+    for pronunciation in phonetics["pronunciation"].values():
+        forms.extend(pronunciation["kana"])
+    return list(dict.fromkeys(forms))
+
+
+def iter_cited_items(
+        entries: Iterable[Dict]) -> Iterator[Tuple[OkinawanCitation, Dict]]:
+    """日沖辞典のエントリーの、発音のある沖縄語の項目ごとに (OkinawanCitation, 項目の phonetics) を返します。"""
+    for entry in entries:
+        for section, item in _iter_okinawan_items(entry["contents"]):
+            if item.get("lang") != "Okinawa" or "phonetics" not in item:
+                continue
+            yield OkinawanCitation(entry["id"], section,
+                                   item.get("reference", False),
+                                   item.get("connotation")), item["phonetics"]
+
+
+def iter_citations(
+        entries: Iterable[Dict]) -> Iterator[Tuple[str, OkinawanCitation]]:
+    for citation, phonetics in iter_cited_items(entries):
+        for form in item_forms(phonetics):
+            yield form, citation
+
+
+def normalise_form(word: str) -> str:
+    """音素表記はそのまま、仮名は片仮名にします。"""
+    return to_katakana(word, ignore_romaji=True)
+
+
+class OkinawanIndex():
+
+    def __init__(self, postings: Dict[str, List[OkinawanCitation]]):
+        self._postings = postings
+
+    @classmethod
+    def build(cls, entries: Iterable[Dict]) -> "OkinawanIndex":
+        postings: Dict[str, List[OkinawanCitation]] = {}
+        for form, citation in iter_citations(entries):
+            citations = postings.setdefault(form, [])
+            if citation not in citations:
+                citations.append(citation)
+        return cls(postings)
+
+    @classmethod
+    def load(cls,
+             path: Path = default_okinawan_index_path) -> "OkinawanIndex":
+        with open(path, 'r') as fp:
+            raw = json.load(fp)
+        return cls({
+            form: [OkinawanCitation(*citation) for citation in citations]
+            for form, citations in raw.items()
+        })
+
+    def save(self, fp):
+        json.dump(self._postings, fp, ensure_ascii=False, separators=(",", ":"))
+
+    @property
+    def forms(self):
+        return self._postings.keys()
+
+    def lookup(self,
+               word: str,
+               references: bool = False,
+               connotations: Optional[Iterable[Optional[str]]] = None
+               ) -> List[OkinawanCitation]:
+        """word を訳に挙げている日沖辞典のエントリー。
+        references なら → による参照も含めます。connotations を渡すと、connotation がその中にあるものだけを返します。
+        connotation のない項目は None で指定します。
+        """
+        citations = self._postings.get(normalise_form(word), [])
+        if connotations is not None:
+            connotations = set(connotations)
+        return [
+            citation for citation in citations
+            if (references or not citation.reference) and (
+                connotations is None or citation.connotation in connotations)
+        ]
+
+    def entry_ids(self, word: str, **kwargs) -> List[int]:
+        """lookup のエントリーの id を、重複なく返します。"""
+        return list(
+            dict.fromkeys(citation.entry_id
+                          for citation in self.lookup(word, **kwargs)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('word', help="沖縄語の仮名か音素表記。例: アーブク, ?aabuku")
+    parser.add_argument('--references',
+                        action='store_true',
+                        help="→ による参照も含める")
+    parser.add_argument('--connotation',
+                        action='append',
+                        help="この connotation の項目だけを返す。例: 敬語")
+    parser.add_argument('--index',
+                        type=Path,
+                        default=default_okinawan_index_path)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    okinawan_index = OkinawanIndex.load(args.index)
+    for citation in okinawan_index.lookup(args.word, args.references,
+                                          args.connotation):
+        print(json.dumps(citation.to_dict(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+重複を除いた、文字列表を使う辞書の形式(packed)。
+同じ沖縄語の発音(phonemes と pronunciation の組)は、見出し語、例文、～の置き換え、日沖辞典の related などに何度も現れ、
+"HEIMIN", "IPA", "kana" などのキーもすべてのエントリーで繰り返されます。
+packed 形式では、異なる発音を１つずつ発音表に、文字列を１つずつ文字列表に入れ、番号で参照します。
+
+    {"format": "packed", "version": 1,
+     "strings": [文字列, ...], "shapes": [[キーの文字列の番号, ...], ...],
+     "phonetics": [符号化した発音, ...], "entries": [符号化したエントリー, ...]}
+
+値の符号化:
+    文字列 -> 文字列表の番号(0 以上の整数)
+    真偽値と null -> そのまま
+    [-1, 要素, ...] -> リスト
+    [-2, 数] -> 整数か小数
+    [-3, 番号] -> 発音表の発音
+    [形の番号, 値, ...] -> shapes のキーの順に値を並べたオブジェクト
+
+PackedEntries は、エントリーを使う時に初めて今までと同じ dict の形に戻します。
+同じ発音は１つの dict を共有するので、戻したエントリーは書き換えないでください。
+"""
+from functools import lru_cache
+import json
+from pathlib import Path
+import subprocess
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+packed_suffix = ".packed.json"
+packed_version = 1
+# load_entries が読む順。
+file_formats = ("json", "jsonl", "packed")
+
+LIST = -1
+NUMBER = -2
+PHONETICS = -3
+phonetics_keys = ("phonemes", "pronunciation")
+
+
+def entries_file_name(stem: str, file_format: str) -> str:
+    """file_format("json", "jsonl", "packed")で書き出す辞書のファイル名。"""
+    if file_format == "packed":
+        return f"{stem}{packed_suffix}"
+    return f"{stem}.{file_format}"
+
+
+def _is_tracked(path: Path) -> bool:
+    """path が git で管理されているか。git がないか、リポジトリの外なら False。"""
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "--error-unmatch", path.name],
+            cwd=path.parent,
+            capture_output=True)
+    except OSError:
+        return False
+    return result.returncode == 0
+
+
+def remove_other_formats(directory, stem: str, file_format: str) -> List[Path]:
+    """directory にある stem の、file_format 以外の形式の辞書のファイルを消して、そのパスを返します。
+    load_entries は json を先に読むので、前に別の形式で書き出したファイルが残っていると、古いエントリーが読まれてしまうためです。
+    git で管理しているファイル(katsuyou_jiten.json など)は生成物ではないので、消さずに残します(load_entries が警告します)。
+    """
+    removed = []
+    for other in file_formats:
+        path = Path(directory) / entries_file_name(stem, other)
+        if other != file_format and path.exists() and not _is_tracked(path):
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def is_packed(path) -> bool:
+    return Path(path).name.endswith(packed_suffix)
+
+
+class _Packer():
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.shapes: List[List[int]] = []
+        self.phonetics: List[Any] = []
+        self._string_ids: Dict[str, int] = {}
+        self._shape_ids: Dict[Tuple[str, ...], int] = {}
+        self._phonetics_ids: Dict[str, int] = {}
+
+    def string(self, s: str) -> int:
+        string_id = self._string_ids.get(s)
+        if string_id is None:
+            string_id = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return string_id
+
+    def shape(self, keys: Tuple[str, ...]) -> int:
+        shape_id = self._shape_ids.get(keys)
+        if shape_id is None:
+            shape_id = self._shape_ids[keys] = len(self.shapes)
+            self.shapes.append([self.string(key) for key in keys])
+        return shape_id
+
+    def encode(self, obj: Any) -> Any:
+        if isinstance(obj, str):
+            return self.string(obj)
+        if obj is None or isinstance(obj, bool):
+            return obj
+        if isinstance(obj, (int, float)):
+            return [NUMBER, obj]
+        if isinstance(obj, list):
+            return [LIST] + [self.encode(value) for value in obj]
+        if isinstance(obj, dict):
+            if tuple(obj) == phonetics_keys:
+                return [PHONETICS, self._phonetics_id(obj)]
+            return [self.shape(tuple(obj))
+                    ] + [self.encode(value) for value in obj.values()]
+        raise TypeError(
+            f"Object of type {obj.__class__.__name__} can not be packed")
+
+    def _phonetics_id(self, phonetics: Dict) -> int:
+        key = json.dumps(phonetics, ensure_ascii=False)
+        phonetics_id = self._phonetics_ids.get(key)
+        if phonetics_id is None:
+            phonetics_id = self._phonetics_ids[key] = len(self.phonetics)
+            self.phonetics.append(
+                [self.shape(phonetics_keys)] +
+                [self.encode(value) for value in phonetics.values()])
+        return phonetics_id
+
+
+def pack(entries: Iterable[Dict]) -> Dict:
+    """json.load したのと同じ形のエントリーのリストを、packed 形式にします。"""
+    packer = _Packer()
+    encoded_entries = [packer.encode(entry) for entry in entries]
+    return {
+        "format": "packed",
+        "version": packed_version,
+        "strings": packer.strings,
+        "shapes": packer.shapes,
+        "phonetics": packer.phonetics,
+        "entries": encoded_entries,
+    }
+
+
+def dump(entries: Iterable[Dict], fp):
+    json.dump(pack(entries), fp, ensure_ascii=False, separators=(",", ":"))
+
+
+class PackedEntries(Sequence):
+    """packed 形式のエントリーの列。i 番目のエントリーは、使う時に dict に戻します。"""
+
+    def __init__(self, packed: Dict):
+        if packed.get("format") != "packed" or packed.get(
+                "version") != packed_version:
+            raise ValueError("packed 形式の辞書ではありません。")
+        self._strings = packed["strings"]
+        self._shapes = [
+            tuple(self._strings[key] for key in shape)
+            for shape in packed["shapes"]
+        ]
+        self._phonetics = packed["phonetics"]
+        self._entries = packed["entries"]
+        self.phonetics = lru_cache(maxsize=None)(self._decode_phonetics)
+
+    @classmethod
+    def load(cls, path) -> "PackedEntries":
+        with open(path, 'r') as fp:
+            return cls(json.load(fp))
+
+    def _decode_phonetics(self, phonetics_id: int) -> Dict:
+        return self.decode(self._phonetics[phonetics_id])
+
+    def decode(self, encoded: Any) -> Any:
+        if isinstance(encoded, bool) or encoded is None:
+            return encoded
+        if isinstance(encoded, int):
+            return self._strings[encoded]
+        tag = encoded[0]
+        if tag == LIST:
+            return [self.decode(value) for value in encoded[1:]]
+        if tag == NUMBER:
+            return encoded[1]
+        if tag == PHONETICS:
+            return self.phonetics(encoded[1])
+        return {
+            key: self.decode(value)
+            for key, value in zip(self._shapes[tag], encoded[1:])
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.decode(entry) for entry in self._entries[i]]
+        return self.decode(self._entries[i])
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self.decode(entry) for entry in self._entries)
+
+    def entry_id(self, i: int) -> int:
+        """i 番目のエントリーの id を、エントリー全体を戻さずに返します。"""
+        encoded = self._entries[i]
+        return self.decode(encoded[1 + self._shapes[encoded[0]].index("id")])
+
+    def content_dict(self) -> "PackedContent":
+        return PackedContent(self)
+
+
+class PackedContent(Mapping):
+    """id からエントリーへの対応。エントリーは初めて引いた時に dict に戻し、覚えておきます。"""
+
+    def __init__(self, entries: PackedEntries):
+        self._entries = entries
+        self._positions = {
+            entries.entry_id(i): i
+            for i in range(len(entries))
+        }
+        self._decoded: Dict[int, Dict] = {}
+
+    def __getitem__(self, key: int) -> Dict:
+        entry = self._decoded.get(key)
+        if entry is None:
+            entry = self._decoded[key] = self._entries[self._positions[key]]
+        return entry
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
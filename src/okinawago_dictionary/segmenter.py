@@ -0,0 +1,299 @@
+"""
+分かち書きのない沖縄語の仮名の文を、沖日辞典(okinawa_01)の見出し語で語に分けます。
+見出し語(と、あれば活用形)の仮名をトライ木に入れ、文の各位置からトライ木をたどって語の候補のラティスを作り、
+最長一致か、コストの最も低い経路(語の数が少なく、辞書にない文字が少ないもの)を選びます。
+
+見出し語も文も kana_key.canonical_kana の正準形にして引くので、ゥウガヌン, ヲゥガヌン, ッヤー, ヰー などの書き方でも引けます。
+Token の位置と surface は、書き換える前の元の文のものです。
+声門閉鎖の記号(’ と ')は、見出し語からも文からも除いて突き合わせます。
+声門閉鎖の子音(ʔ と ?)は、ʔヤー と ヤー が別の語なので除かず、仮名として突き合わせます。
+辞書にない仮名の続きと、仮名でない文字(句読点、空白など)は、entry_ids が空の Token になるので、
+Token をつなぐと元の文に戻ります。
+"""
+from itertools import chain
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .kana_key import canonical_kana, canonical_kana_with_positions, folded_kana_chars
+
+# 突き合わせで無視する文字。
+transparent_chars = "’'"
+modes = ("cost", "longest")
+# 経路のコスト。語は１つ 2、辞書にない文字は１文字 3 なので、２文字以上の語は辞書にない文字の続きより安い。
+word_cost = 2
+unknown_char_cost = 3
+# 仮名でない文字がないまま、これ以上の長さがたまったら、そこで区切って分割する。
+max_buffer_size = 4096
+
+
+kana_run_pattern = re.compile(f"[ぁ-ゖァ-ヺーʔ?{transparent_chars}]+")
+# 正準形にした文の中の、仮名でない文字の続きと、仮名の前の声門閉鎖の記号。
+non_kana_pattern = re.compile(f"[^{folded_kana_chars}]+")
+transparent_run_pattern = re.compile(f"’+(?=[{folded_kana_chars}])")
+# 文の start から end までの語(id)か、仮名でない文字の続き(None)。
+Span = Tuple[int, int, Optional[Tuple[int, ...]]]
+
+
+def is_kana(c: str) -> bool:
+    return kana_run_pattern.fullmatch(c) is not None
+
+
+class Token(NamedTuple):
+    """文の start から end までの語。entry_ids は、その語を見出し語(か活用形)とする沖日辞典のエントリーの id。"""
+    start: int
+    end: int
+    surface: str
+    entry_ids: Tuple[int, ...]
+
+    @property
+    def known(self) -> bool:
+        return bool(self.entry_ids)
+
+    def to_dict(self):
+        return {
+            "start": self.start,
+            "end": self.end,
+            "surface": self.surface,
+            "entry_ids": list(self.entry_ids),
+        }
+
+
+class KanaTrie():
+    """仮名の語から、エントリーの id への対応を持つトライ木。節は dict で、語の終わりの id は "" のキーに入れます。
+    引く文は、kana_key.canonical_kana の正準形にし、声門閉鎖の記号を除いておきます。
+    """
+
+    def __init__(self):
+        self._root: Dict = {}
+        self.max_length = 0
+
+    def add(self, word: str, entry_ids: Iterable[int]):
+        key = "".join(c for c in canonical_kana(word)
+                      if c not in transparent_chars)
+        if not key or non_kana_pattern.search(key):
+            # 仮名でない文字は文を区切るので、それを含む語は文に現れない。
+            return
+        node = self._root
+        for c in key:
+            node = node.setdefault(c, {})
+        ids = node.setdefault("", ())
+        node[""] = ids + tuple(i for i in entry_ids if i not in ids)
+        self.max_length = max(self.max_length, len(key))
+
+    def iter_prefixes(self, text: str,
+                      start: int = 0) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        """text の start から始まる語の、終わりの位置と id を短い順に返します。"""
+        node = self._root
+        for end in range(start + 1, len(text) + 1):
+            node = node.get(text[end - 1])
+            if node is None:
+                return
+            ids = node.get("")
+            if ids:
+                yield end, ids
+
+    def iter_words(self, text: str) -> Iterator[Tuple[int, int, Tuple[int, ...]]]:
+        """text の中のすべての語の始まりと終わりの位置と id を、始まりの順に(同じ始まりなら短い順に)返します。
+        すべての位置で iter_prefixes を呼ぶのと同じですが、文の長さの分だけ呼び出すと遅いので、ここでたどります。
+        """
+        root = self._root
+        n = len(text)
+        for start in range(n):
+            node = root.get(text[start])
+            end = start + 1
+            while node is not None:
+                ids = node.get("")
+                if ids:
+                    yield start, end, ids
+                if end == n:
+                    break
+                node = node.get(text[end])
+                end += 1
+
+    def iter_longest(
+            self, text: str) -> Iterator[Tuple[int, int, Tuple[int, ...]]]:
+        """text を前から見て、最も長く一致する語の始まりと終わりの位置と id を返します。語の後は、その終わりから探します。"""
+        root = self._root
+        n = len(text)
+        start = 0
+        while start < n:
+            node = root.get(text[start])
+            found = None
+            end = start + 1
+            while node is not None:
+                ids = node.get("")
+                if ids:
+                    found = end, ids
+                if end == n:
+                    break
+                node = node.get(text[end])
+                end += 1
+            if found is None:
+                start += 1
+                continue
+            yield start, found[0], found[1]
+            start = found[0]
+
+
+def _conjugation_kana(obj) -> Iterator[str]:
+    """エントリーの pos.conjugation の中の、活用形の仮名。"""
+    if isinstance(obj, dict):
+        if "pronunciation" in obj:
+            for pronunciation in obj["pronunciation"].values():
+                yield from pronunciation["kana"]
+        else:
+            for value in obj.values():
+                yield from _conjugation_kana(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _conjugation_kana(value)
+
+
+class Segmenter():
+
+    def __init__(self, trie: KanaTrie, mode: str = "cost"):
+        if mode not in modes:
+            raise ValueError(f"mode は {modes} のどれかです。")
+        self.trie = trie
+        self.mode = mode
+
+    @classmethod
+    def from_dictionary(cls,
+                        dictionary,
+                        inflections: bool = False,
+                        mode: str = "cost") -> "Segmenter":
+        """dictionary(OkinawagoDictionary)の見出し語から作ります。inflections なら、エントリーの活用形の仮名も入れます。"""
+        trie = KanaTrie()
+        entry_ids = set()
+        for index_word in dictionary.index_words:
+            ids = dictionary.get_keys(index_word)
+            trie.add(index_word, ids)
+            entry_ids.update(ids)
+        if inflections:
+            for entry_id in sorted(entry_ids):
+                pos = dictionary.get_content(entry_id)["pos"]
+                for kana in _conjugation_kana(pos.get("conjugation")):
+                    trie.add(kana, [entry_id])
+        return cls(trie, mode)
+
+    def _lowest_cost_spans(self, kana: str) -> List[Span]:
+        n = len(kana)
+        # 仮名でない文字の続きの始まりから、終わりへの対応。
+        jumps = {
+            match.start(): match.end()
+            for match in non_kana_pattern.finditer(kana)
+        }
+        # 各位置に至る最良の経路のコストと、その最後の辺。どの経路よりも高いコストで埋めておく。
+        costs = [unknown_char_cost * n + 1] * (n + 1)
+        costs[0] = 0
+        back: List[Span] = [(0, 0, ())] * (n + 1)
+        i = 0
+        # 語を始まりの順に見て、その始まりまでの辞書にない文字の辺を先にたどる。最後の (n, n, None) は番兵。
+        for start, end, ids in chain(self.trie.iter_words(kana), [(n, n, None)]):
+            while i < start:
+                jump = jumps.get(i)
+                if jump is not None:
+                    # 仮名でない文字の続きは、そのまま１つの辺。
+                    costs[jump] = costs[i]
+                    back[jump] = (i, jump, None)
+                    i = jump
+                    continue
+                unknown = costs[i] + unknown_char_cost
+                if unknown < costs[i + 1]:
+                    costs[i + 1] = unknown
+                    back[i + 1] = (i, i + 1, ())
+                i += 1
+            if ids is None:
+                break
+            known = costs[start] + word_cost
+            # コストが同じなら、後から見つかる、より後ろから始まる語を選ぶ。
+            if known <= costs[end]:
+                costs[end] = known
+                back[end] = (start, end, ids)
+        spans = []
+        j = n
+        while j > 0:
+            span = back[j]
+            if span[2] != ():
+                spans.append(span)
+            j = span[0]
+        spans.reverse()
+        return spans
+
+    def _longest_spans(self, kana: str) -> List[Span]:
+        spans: List[Span] = list(self.trie.iter_longest(kana))
+        spans.extend((match.start(), match.end(), None)
+                     for match in non_kana_pattern.finditer(kana))
+        # どちらも始まりの順に並んでいて重ならないので、sort は２つをつなぐだけ。
+        spans.sort()
+        return spans
+
+    def segment(self, text: str, offset: int = 0) -> List[Token]:
+        """text を Token に分けます。Token の位置には offset を足します。"""
+        kana, positions = canonical_kana_with_positions(text)
+        # 仮名の前の声門閉鎖の記号を除き、除いた文の位置 k から、正準形の位置 bounds[k] への対応を作る。
+        # 語の始まりは、前の文字のすぐ後にするので、除いた記号はその後の語に入る。
+        bounds: Optional[List[int]] = None
+        transparent_runs = [
+            match.span() for match in transparent_run_pattern.finditer(kana)
+        ] if "’" in kana else []
+        if transparent_runs:
+            bounds = []
+            parts = []
+            i = cut = 0
+            for start, end in transparent_runs:
+                if i < start:
+                    bounds.append(cut)
+                    bounds.extend(range(i + 1, start))
+                parts.append(kana[i:start])
+                i, cut = end, start
+            bounds.append(cut)
+            bounds.extend(range(i + 1, len(kana) + 1))
+            kana = "".join(parts) + kana[i:]
+        if self.mode == "longest":
+            spans = self._longest_spans(kana)
+        else:
+            spans = self._lowest_cost_spans(kana)
+        tokens = []
+        append = tokens.append
+        # 元の文の、Token にした所まで。その後から次の語(か仮名でない文字)までは辞書にない仮名。
+        i = 0
+        for span_start, span_end, ids in spans:
+            if bounds is not None:
+                span_start = bounds[span_start]
+                span_end = bounds[span_end]
+            start = positions[span_start]
+            end = positions[span_end]
+            if start == end:
+                # 書き換えで増えた文字(ヰ -> ’イ の ’)だけの続き。
+                continue
+            if i < start:
+                append(Token(i + offset, start + offset, text[i:start], ()))
+            append(Token(start + offset, end + offset, text[start:end], ids or ()))
+            i = end
+        if i < len(text):
+            append(Token(i + offset, len(text) + offset, text[i:], ()))
+        return tokens
+
+    def iter_tokens(self, chunks: Iterable[str]) -> Iterator[Token]:
+        """長い文章をかたまりごとに受け取り、仮名と仮名でない文字の境目で区切りながら Token を返します。
+        最後の続き(仮名か、仮名でない文字の)は、次のかたまりとつないでから分けます。
+        同じ種類の文字が max_buffer_size 文字以上続く時は、そこで区切るので、その前後は別々に分割されます。
+        """
+        buffer = ""
+        offset = 0
+        for chunk in chunks:
+            buffer += chunk
+            cut = len(buffer)
+            last_is_kana = is_kana(buffer[-1]) if buffer else False
+            while cut > 0 and is_kana(buffer[cut - 1]) == last_is_kana:
+                cut -= 1
+            if cut == 0:
+                if len(buffer) < max_buffer_size:
+                    continue
+                cut = len(buffer)
+            yield from self.segment(buffer[:cut], offset)
+            offset += cut
+            buffer = buffer[cut:]
+        if buffer:
+            yield from self.segment(buffer, offset)
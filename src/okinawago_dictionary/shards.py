@@ -0,0 +1,48 @@
+"""
+見出し語の五十音の行ごとに分けた辞書(シャード)の置き場所と、見出し語の行の求め方。
+シャードは {"index": インデックス表の一部, "entries": その見出し語のエントリー} の JSON で、
+manifest.json にシャードのハッシュ、大きさ、見出し語の範囲、エントリーの id の範囲が記録されています。
+シャードは src/sharding.py で作ります。
+"""
+import json
+from pathlib import Path
+import unicodedata
+from typing import Dict
+
+current_dir = Path(__file__).parent
+default_shard_dir = current_dir / "shards"
+manifest_name = "manifest.json"
+
+gojuuon_rows = {
+    "a": "アイウエオァィゥェォヴ",
+    "ka": "カキクケコヵヶ",
+    "sa": "サシスセソ",
+    "ta": "タチツテトッ",
+    "na": "ナニヌネノ",
+    "ha": "ハヒフヘホ",
+    "ma": "マミムメモ",
+    "ya": "ヤユヨャュョ",
+    "ra": "ラリルレロ",
+    "wa": "ワヰヱヲヮ",
+    "n": "ン",
+}
+kana2row = {kana: row for row, kanas in gojuuon_rows.items() for kana in kanas}
+other_row = "other"
+
+
+def row_of(word: str) -> str:
+    """word の最初の仮名の、五十音の行。平仮名と片仮名、濁点と半濁点は区別しません。
+    仮名の前の記号(’ や ー など)は飛ばし、仮名がなければ "other" です。
+    """
+    for c in word:
+        if "ぁ" <= c <= "ゖ":
+            c = chr(ord(c) + 0x60)
+        row = kana2row.get(unicodedata.normalize("NFD", c)[0])
+        if row:
+            return row
+    return other_row
+
+
+def load_manifest(shard_dir: Path = default_shard_dir) -> Dict:
+    with open(Path(shard_dir) / manifest_name, 'r') as fp:
+        return json.load(fp)
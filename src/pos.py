@@ -20,6 +20,11 @@ class PartOfSpeech(NamedTuple):
             "remark": self.remark
         }
 
+    def json_items(self):
+        yield "type", self.type
+        yield "conjugation", self.conjugation
+        yield "remark", self.remark
+
 
 def parse_pos_notation(pronunciation: str, pos_notation: str) -> PartOfSpeech:
     pos_notation = pos_notation.replace(" ", "")
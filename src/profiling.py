@@ -0,0 +1,144 @@
+"""
+JSON の生成の各段階(品詞の解析、発音の生成、意味のパース、書き出しなど)にかかった時間と呼び出し回数を計ります。
+計測する関数は、計測している間だけ、時間を計る関数に置き換えます。
+時間はその関数の中で呼ばれた他の段階の時間も含む、累積時間です。
+"""
+from contextlib import contextmanager
+from functools import wraps
+import heapq
+import json
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, TextIO, Tuple
+
+
+class StageStats(NamedTuple):
+    calls: int
+    seconds: float
+
+
+class SlowEntry(NamedTuple):
+    seconds: float
+    id: int
+    headword: str
+
+
+class StageProfiler():
+
+    def __init__(self, n_slowest: int = 20):
+        self.n_slowest = n_slowest
+        self._calls: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+        self._slowest: List[SlowEntry] = []
+        self._patches: List[Tuple[Any, str, Any]] = []
+        self._started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        self._calls[stage] = self._calls.get(stage, 0) + 1
+        self._seconds[stage] = self._seconds.get(stage, 0.) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, func: Callable, stage: str) -> Callable:
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def patch(self, namespace: Any, attr: str, stage: str):
+        """namespace (モジュールかクラス) の attr を、時間を計る関数に置き換えます。"""
+        original = vars(namespace)[attr]
+        if isinstance(original, classmethod):
+            replacement: Any = classmethod(self.timed(original.__func__, stage))
+        else:
+            replacement = self.timed(original, stage)
+        self._patches.append((namespace, attr, original))
+        setattr(namespace, attr, replacement)
+
+    def patch_converter(self, converter: Any, headword_keys: List[str]):
+        """converter.convert の時間を計り、遅い行を記録します。id は呼び出された順番です。"""
+        original = vars(converter)["convert"]
+        func = original.__func__
+        n_rows = [0]
+
+        @wraps(func)
+        def convert(cls, tsv_row):
+            start = time.perf_counter()
+            try:
+                return func(cls, tsv_row)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.add("convert", elapsed)
+                headword = next(
+                    (tsv_row[k] for k in headword_keys if k in tsv_row), "")
+                self._record_row(SlowEntry(elapsed, n_rows[0], headword))
+                n_rows[0] += 1
+
+        self._patches.append((converter, "convert", original))
+        setattr(converter, "convert", classmethod(convert))
+
+    def _record_row(self, entry: SlowEntry):
+        if len(self._slowest) < self.n_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def restore(self):
+        for namespace, attr, original in reversed(self._patches):
+            setattr(namespace, attr, original)
+        self._patches.clear()
+
+    @property
+    def stages(self) -> Dict[str, StageStats]:
+        return {
+            name: StageStats(self._calls[name], self._seconds[name])
+            for name in self._calls
+        }
+
+    @property
+    def slowest(self) -> List[SlowEntry]:
+        return sorted(self._slowest, reverse=True)
+
+    def report(self, **metadata) -> Dict:
+        return {
+            **metadata,
+            "total_seconds": time.perf_counter() - self._started,
+            "stages": {
+                name: {
+                    "calls": stats.calls,
+                    "seconds": stats.seconds,
+                    "us_per_call": stats.seconds / stats.calls * 1e6,
+                }
+                for name, stats in self.stages.items()
+            },
+            "slowest": [entry._asdict() for entry in self.slowest],
+        }
+
+
+def print_summary(report: Dict, fp: TextIO):
+    fp.write(f"{'stage':<24}{'calls':>10}{'seconds':>12}{'µs/call':>12}\n")
+    for name, stats in sorted(report["stages"].items(),
+                              key=lambda item: -item[1]["seconds"]):
+        fp.write(f"{name:<24}{stats['calls']:>10}{stats['seconds']:>12.3f}"
+                 f"{stats['us_per_call']:>12.1f}\n")
+    fp.write(f"{'total':<24}{'':>10}{report['total_seconds']:>12.3f}\n")
+    if report["slowest"]:
+        fp.write("\nslowest entries:\n")
+        for entry in report["slowest"]:
+            fp.write(f"{entry['seconds'] * 1e3:>10.2f} ms  "
+                     f"{entry['id']:>6}  {entry['headword']}\n")
+
+
+def write_report(report: Dict, fp: TextIO):
+    json.dump(report, fp, ensure_ascii=False, indent=4)
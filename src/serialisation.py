@@ -0,0 +1,155 @@
+"""
+WordPhonetics, PartOfSpeech などのオブジェクトを、to_dict で辞書に変換せずに直接 JSON として書き出します。
+json_items() を持つオブジェクトは、その (キー, 値) の組を JSON オブジェクトとして書き出します。
+ジェネレーターは JSON の配列として、要素ができ次第書き出します。
+indent=4 の出力は json.dump(..., ensure_ascii=False, indent=4) とバイト単位で一致します。
+"""
+from json.encoder import encode_basestring
+from types import GeneratorType
+from typing import Any, Iterable, Iterator, Optional, TextIO, Tuple
+
+# indent=None のときの区切り文字。空白を一切入れない。
+compact_separators = (",", ":")
+
+
+def _encode_scalar(obj: Any) -> str:
+    if isinstance(obj, str):
+        return encode_basestring(obj)
+    if obj is None:
+        return "null"
+    if obj is True:
+        return "true"
+    if obj is False:
+        return "false"
+    if isinstance(obj, int):
+        return int.__repr__(obj)
+    if isinstance(obj, float):
+        return float.__repr__(obj)
+    raise TypeError(
+        f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _encode_key(key: Any) -> str:
+    if isinstance(key, str):
+        return encode_basestring(key)
+    return encode_basestring(_encode_scalar(key).strip('"'))
+
+
+def iterencode(obj: Any,
+               indent: Optional[int] = 4,
+               separators: Optional[Tuple[str, str]] = None) -> Iterator[str]:
+    """obj を JSON 文字列の断片として順に返します。
+    indent が None のときは改行もインデントもしない compact な出力になります。
+    """
+    if separators is None:
+        separators = (",", ": ") if indent is not None else compact_separators
+    item_separator, key_separator = separators
+    return _iterencode(obj, 0, indent, item_separator, key_separator)
+
+
+def _iterencode(obj: Any, level: int, indent: Optional[int],
+                item_separator: str, key_separator: str) -> Iterator[str]:
+    if hasattr(obj, "json_items"):
+        yield from _iterencode_items(obj.json_items(), level, indent,
+                                     item_separator, key_separator)
+    elif isinstance(obj, dict):
+        yield from _iterencode_items(iter(obj.items()), level, indent,
+                                     item_separator, key_separator)
+    elif isinstance(obj, (list, tuple, GeneratorType)):
+        yield from _iterencode_list(obj, level, indent, item_separator,
+                                    key_separator)
+    else:
+        yield _encode_scalar(obj)
+
+
+def _iterencode_list(values: Iterable[Any], level: int,
+                     indent: Optional[int], item_separator: str,
+                     key_separator: str) -> Iterator[str]:
+    first = True
+    if indent is not None:
+        newline_indent = "\n" + " " * (indent * (level + 1))
+        separator = item_separator + newline_indent
+    else:
+        newline_indent = ""
+        separator = item_separator
+    for value in values:
+        if first:
+            yield "[" + newline_indent
+            first = False
+        else:
+            yield separator
+        yield from _iterencode(value, level + 1, indent, item_separator,
+                               key_separator)
+    if first:
+        yield "[]"
+    elif indent is not None:
+        yield "\n" + " " * (indent * level) + "]"
+    else:
+        yield "]"
+
+
+def _iterencode_items(items: Iterator[Tuple[Any, Any]], level: int,
+                      indent: Optional[int], item_separator: str,
+                      key_separator: str) -> Iterator[str]:
+    first = True
+    if indent is not None:
+        newline_indent = "\n" + " " * (indent * (level + 1))
+        separator = item_separator + newline_indent
+    else:
+        newline_indent = ""
+        separator = item_separator
+    for key, value in items:
+        if first:
+            yield "{" + newline_indent
+            first = False
+        else:
+            yield separator
+        yield _encode_key(key)
+        yield key_separator
+        yield from _iterencode(value, level + 1, indent, item_separator,
+                               key_separator)
+    if first:
+        yield "{}"
+    elif indent is not None:
+        yield "\n" + " " * (indent * level) + "}"
+    else:
+        yield "}"
+
+
+def dump(obj: Any,
+         fp: TextIO,
+         indent: Optional[int] = 4,
+         separators: Optional[Tuple[str, str]] = None):
+    for chunk in iterencode(obj, indent, separators):
+        fp.write(chunk)
+
+
+def dumps(obj: Any,
+          indent: Optional[int] = 4,
+          separators: Optional[Tuple[str, str]] = None) -> str:
+    return "".join(iterencode(obj, indent, separators))
+
+
+def dump_lines(objs: Iterable[Any],
+               fp: TextIO,
+               separators: Optional[Tuple[str, str]] = None):
+    """objs の要素を１行に１つずつ書き出します（JSONL）。"""
+    for obj in objs:
+        for chunk in iterencode(obj, None, separators):
+            fp.write(chunk)
+        fp.write("\n")
+
+
+def to_builtin(obj: Any) -> Any:
+    """json_items() を持つオブジェクトを含む値を、json.load した時と同じ dict と list に変換します。"""
+    if hasattr(obj, "json_items"):
+        return {key: to_builtin(value) for key, value in obj.json_items()}
+    if isinstance(obj, dict):
+        return {
+            key if isinstance(key, str) else _encode_key(key)[1:-1]:
+            to_builtin(value)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple, GeneratorType)):
+        return [to_builtin(value) for value in obj]
+    return obj
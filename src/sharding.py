@@ -0,0 +1,79 @@
+"""
+辞書のエントリーとインデックス表を、見出し語の五十音の行ごとのシャードに分けて書き出します。
+見出し語の行が違うインデックスから引かれるエントリーは、それぞれのシャードに入ります。
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from okinawago_dictionary.shards import manifest_name, other_row, row_of
+from utils import atomic_write
+
+
+def id_ranges(ids: Iterable[int]) -> List[List[int]]:
+    """id の集まりを、両端を含む [最初, 最後] の範囲のリストにします。"""
+    ranges: List[List[int]] = []
+    for i in sorted(ids):
+        if ranges and ranges[-1][1] + 1 == i:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ranges
+
+
+def split_into_shards(
+    entries: List[Dict], index_table: Dict[str, List[int]]
+) -> Dict[str, Tuple[Dict[str, List[int]], List[Dict]]]:
+    """行ごとに (インデックス表, エントリー) を返します。どのインデックスからも引かれないエントリーは "other" に入れます。"""
+    shard_index: Dict[str, Dict[str, List[int]]] = {}
+    for index_word, ids in index_table.items():
+        shard_index.setdefault(row_of(index_word), {})[index_word] = ids
+    shards = {}
+    referenced = set()
+    for row, table in shard_index.items():
+        ids = {i for id_list in table.values() for i in id_list}
+        referenced.update(ids)
+        shards[row] = (table, [entry for entry in entries if entry["id"] in ids])
+    orphans = [entry for entry in entries if entry["id"] not in referenced]
+    if orphans:
+        table, shard_entries = shards.setdefault(other_row, ({}, []))
+        shard_entries.extend(orphans)
+        shard_entries.sort(key=lambda entry: entry["id"])
+    return shards
+
+
+def write_shards(stem: str, entries: List[Dict],
+                 index_table: Dict[str, List[int]],
+                 shard_dir: Path) -> List[Dict]:
+    """stem のシャードを shard_dir/stem/ に書き出し、manifest に載せるシャードの情報を返します。"""
+    (shard_dir / stem).mkdir(parents=True, exist_ok=True)
+    shard_infos = []
+    for row, (table, shard_entries) in sorted(
+            split_into_shards(entries, index_table).items()):
+        encoded = json.dumps({"index": table, "entries": shard_entries},
+                             ensure_ascii=False,
+                             separators=(",", ":")).encode()
+        path = Path(stem) / f"{row}.json"
+        with atomic_write(shard_dir / path, 'wb') as fp:
+            fp.write(encoded)
+        shard_infos.append({
+            "row": row,
+            "path": path.as_posix(),
+            "sha256": hashlib.sha256(encoded).hexdigest(),
+            "size": len(encoded),
+            "keys": len(table),
+            "key_range": [min(table), max(table)] if table else None,
+            "entries": len(shard_entries),
+            "id_ranges": id_ranges(entry["id"] for entry in shard_entries),
+        })
+    return shard_infos
+
+
+def write_manifest(dictionaries: Dict[str, List[Dict]], shard_dir: Path):
+    """シャードをすべて書き出してから、最後に manifest を置き換えます。"""
+    with atomic_write(shard_dir / manifest_name) as fp:
+        json.dump({"dictionaries": dictionaries},
+                  fp,
+                  ensure_ascii=False,
+                  indent=4)
@@ -0,0 +1,160 @@
+"""
+ローマ字で書いた沖縄語の文章を、仮名か IPA に翻字します。
+大きなファイルや標準入力も、一定の大きさのかたまりごとに読み、語の途中で切らないように区切って、
+かたまりをプロセスプールで翻字し、入力の順にでき次第書き出すので、メモリは入力の大きさによりません。
+語(ローマ字、? と ')の外の文字、句読点や空白、改行などはそのまま残します。
+翻字できない語(英語など)も、そのまま残します。
+
+    python src/transliteration.py corpus.txt -o corpus.kana.txt -j 4
+    echo "waNne ?uciinaanCu." | python src/transliteration.py --to ipa
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+import re
+import sys
+from typing import Iterable, Iterator, Optional, TextIO
+
+from kanahyouki import (PhonemeError, PhoneticsBuilder, SocialClass, WordPhonetics,
+                        generate_phonetics)
+
+okinawan_word_pattern = re.compile(r"([a-zA-Z?']+)")
+output_kinds = ("kana", "ipa")
+default_chunk_size = 1 << 16
+# 語の外の文字がないまま、これ以上の長さがたまったら、語の途中でも区切る。
+max_buffer_size = 1 << 20
+
+
+def sentence_phonetics(sentence: str) -> WordPhonetics:
+    """文の中の語をそれぞれ発音にし、その間の文字とつないだ１つの WordPhonetics にします。"""
+    builder = PhoneticsBuilder()
+    for word in okinawan_word_pattern.split(sentence):
+        if word and okinawan_word_pattern.match(word):
+            word = generate_phonetics(word)
+        builder.append(word)
+    return builder.build()
+
+
+@lru_cache(maxsize=1 << 14)
+def transliterate_word(word: str,
+                       to: str = "kana",
+                       social_class: SocialClass = SocialClass.HEIMIN
+                       ) -> Optional[str]:
+    """語の仮名(最初の書き方)か IPA。social_class の発音がなければ平民の発音にし、翻字できなければ None を返します。"""
+    try:
+        pronunciations = generate_phonetics(word).pronunciations
+    except PhonemeError:
+        return None
+    pronunciation = pronunciations.get(social_class,
+                                       pronunciations[SocialClass.HEIMIN])
+    return pronunciation.kana[0] if to == "kana" else pronunciation.ipa
+
+
+def transliterate(text: str,
+                  to: str = "kana",
+                  social_class: SocialClass = SocialClass.HEIMIN) -> str:
+    parts = okinawan_word_pattern.split(text)
+    # split の結果は、奇数番目が語になる。
+    for i in range(1, len(parts), 2):
+        transliterated = transliterate_word(parts[i], to, social_class)
+        if transliterated is not None:
+            parts[i] = transliterated
+    return "".join(parts)
+
+
+def iter_chunks(fp: TextIO, chunk_size: int = default_chunk_size) -> Iterator[str]:
+    """fp をおよそ chunk_size 文字ずつ読みます。かたまりは語の外の文字で終わるように区切ります。
+    語の外の文字がないまま max_buffer_size 文字以上たまった時は、そこで区切るので、その前後の語は別々に翻字されます。
+    """
+    rest = ""
+    while True:
+        read = fp.read(chunk_size)
+        if not read:
+            break
+        text = rest + read
+        # rest はすべて語の文字なので、区切りは新しく読んだ所だけから探す。
+        end = len(text)
+        while end > len(rest) and okinawan_word_pattern.match(text[end - 1]):
+            end -= 1
+        if end == len(rest):
+            # かたまり全体が１つの語の途中。次を読んでからつなぐ。
+            if len(text) < max_buffer_size:
+                rest = text
+                continue
+            end = len(text)
+        rest = text[end:]
+        yield text[:end]
+    if rest:
+        yield rest
+
+
+def transliterate_chunks(chunks: Iterable[str],
+                         to: str = "kana",
+                         social_class: SocialClass = SocialClass.HEIMIN,
+                         jobs: int = 1) -> Iterator[str]:
+    """かたまりを翻字して、入力の順に返します。
+    jobs が 2 以上ならプロセスプールで翻字し、同時に処理するかたまりは jobs * 2 個までにします。
+    """
+    if jobs <= 1:
+        for chunk in chunks:
+            yield transliterate(chunk, to, social_class)
+        return
+    chunks = iter(chunks)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = [
+            executor.submit(transliterate, chunk, to, social_class)
+            for chunk in islice(chunks, jobs * 2)
+        ]
+        while pending:
+            yield pending.pop(0).result()
+            for chunk in islice(chunks, 1):
+                pending.append(
+                    executor.submit(transliterate, chunk, to, social_class))
+
+
+def transliterate_stream(fp_in: TextIO,
+                         fp_out: TextIO,
+                         to: str = "kana",
+                         social_class: SocialClass = SocialClass.HEIMIN,
+                         jobs: int = 1,
+                         chunk_size: int = default_chunk_size):
+    for transliterated in transliterate_chunks(iter_chunks(fp_in, chunk_size),
+                                               to, social_class, jobs):
+        fp_out.write(transliterated)
+        fp_out.flush()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input',
+                        nargs='?',
+                        type=argparse.FileType('r'),
+                        default=sys.stdin,
+                        help="翻字するファイル。省くと標準入力")
+    parser.add_argument('-o',
+                        '--output',
+                        type=argparse.FileType('w'),
+                        default=sys.stdout)
+    parser.add_argument('--to', choices=output_kinds, default="kana")
+    parser.add_argument('--social-class',
+                        choices=[c.name for c in SocialClass],
+                        default=SocialClass.HEIMIN.name,
+                        help="士族の発音がない語は、平民の発音にします")
+    parser.add_argument('-j', '--jobs', type=int, default=1)
+    parser.add_argument('--chunk-size',
+                        type=int,
+                        default=default_chunk_size,
+                        help="一度に読む文字数")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    transliterate_stream(args.input, args.output, args.to,
+                         SocialClass[args.social_class], args.jobs,
+                         args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
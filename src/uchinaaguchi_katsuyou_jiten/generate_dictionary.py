@@ -4,7 +4,9 @@ import json
 import re
 from typing import Dict, List, Sequence
 from pathlib import Path
-from utils import create_index2id_table
+from utils import atomic_write, create_index2id_table
+from okinawago_dictionary import index_table, packed
+from okinawago_dictionary.packed import entries_file_name
 
 from wanakana import to_katakana
 
@@ -88,17 +90,21 @@ def decompose_sample_sentences(contents):
 
 def parse_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--format', choices=['json', 'jsonl'], default="json")
+    parser.add_argument('--format', choices=['json', 'jsonl', 'packed'], default="json")
+    parser.add_argument('--compact', action='store_true', help="空白を入れずに書き出す")
     return parser.parse_args()
 
 
 current_dir = Path(__file__).parent
+source_path = current_dir / "dict_items.jsonl"
+target_dir = current_dir / "../okinawago_dictionary"
 
 
-def main():
-    args = parse_args()
+def build(file_format: str = "json", compact: bool = False):
+    """dict_items.jsonl から活用辞典の JSON とインデックス表を作ります。compact なら、区切りの後の空白も入れません。"""
+    separators = (",", ":") if compact else None
     items = []
-    with open(current_dir / "dict_items.jsonl", 'r') as fp:
+    with open(source_path, 'r') as fp:
         for line in fp:
             items.append(json.loads(line))
     index_pos_stats: Dict[int, Counter] = defaultdict(Counter)
@@ -177,29 +183,40 @@ def main():
         dictionary.append(item)
     # print(ch_sets[0])
     # print(ch_sets[1])
-    file_format = args.format
-    target_dir = current_dir / "../okinawago_dictionary"
     if file_format == "jsonl":
-        with open(target_dir / "katsuyou_jiten.jsonl", "w") as fp:
+        with atomic_write(target_dir / "katsuyou_jiten.jsonl") as fp:
             for dict_item in dictionary:
-                json.dump(dict_item, fp, ensure_ascii=False)
+                json.dump(dict_item, fp, ensure_ascii=False, separators=separators)
                 fp.write("\n")
     elif file_format == "json":
-        with open(target_dir / "katsuyou_jiten.json", "w") as fp:
-            json.dump(dictionary, fp, ensure_ascii=False)
-        with open(target_dir / "katsuyou_jiten_index-table.json", "w") as fp:
-            json.dump(
-                {
-                    to_katakana(k): v
-                    for k, v in create_index2id_table(dictionary).items()
-                },
-                fp,
-                ensure_ascii=False)
+        with atomic_write(target_dir / "katsuyou_jiten.json") as fp:
+            json.dump(dictionary, fp, ensure_ascii=False, separators=separators)
+    elif file_format == "packed":
+        with atomic_write(target_dir / entries_file_name("katsuyou_jiten", "packed")) as fp:
+            packed.dump(dictionary, fp)
+    packed.remove_other_formats(target_dir, "katsuyou_jiten", file_format)
+    # インデックス表は、どの形式でも JSON と CSR 形式の両方を書き出す。
+    index2id_table = {
+        to_katakana(k): v
+        for k, v in create_index2id_table(dictionary).items()
+    }
+    json_path = target_dir / "katsuyou_jiten_index-table.json"
+    with atomic_write(json_path) as fp:
+        json.dump(index2id_table, fp, ensure_ascii=False, separators=separators)
+    with atomic_write(
+            target_dir / index_table.index_table_file_name("katsuyou_jiten"),
+            'wb') as fp:
+        index_table.dump(index2id_table, fp, index_table.source_digest(json_path))
 
     # print(all(item["yamato"].count("〈") == 1 for item in dictionary))
     # print(all(item["yamato"].endswith("〉") for item in dictionary))
     # pprint(index_pos_stats)
 
 
+def main():
+    args = parse_args()
+    build(args.format, args.compact)
+
+
 if __name__ == "__main__":
     main()
@@ -1,20 +1,33 @@
-from typing import Set
-from itertools import islice
-# from collections import Counter, defaultdict
-from csv import DictWriter
-from pprint import pprint
+"""
+うちなーぐち活用辞典の PDF から、見出し語と内容の組を取り出して dict_items.jsonl に書き出します。
+
+1. ページごとの文字の抽出(遅い): ページの範囲ごとにプロセスプールで解析し、
+   ページごとの結果をチェックポイントとして保存します。途中で止まっても、保存済みのページは解析し直しません。
+2. 見出し語と内容の組み立て(速い): 保存したページをページ順に読み、組み立てた項目をでき次第書き出します。
+   見出し語の内容がページをまたいでいても、一続きの項目になります。
+
+    python pdf2jsonl.py -j 4              # 未解析のページだけ解析して、dict_items.jsonl を作り直す
+    python pdf2jsonl.py --pages 96,430-433  # 指定したページだけ解析し直す
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextContainer, LTChar
 
-path = r'./20210312Uchinaaguchi_e.pdf'
+from utils import atomic_write
+
+current_dir = Path(__file__).parent
+default_pdf_path = current_dir / "20210312Uchinaaguchi_e.pdf"
+default_output_path = current_dir / "dict_items.jsonl"
+default_checkpoint_dir = Path(".build_cache/katsuyou_pages")
 page_start = 17
 page_end = 577
 
-output_path = "extracted_text.tsv"
-
-
 FONTNAMES = ['ITLECO+STIXGeneral-Regular',
              'MAROHK+STIXMathCalligraphy-Regular',
              'SNHJEW+STIXGeneral-Bold',
@@ -24,114 +37,231 @@ FONTNAMES = ['ITLECO+STIXGeneral-Regular',
 BOLDFONTS = [FONTNAMES[-1]]
 
 
+class PageChar(NamedTuple):
+    """ページの本文の１文字。is_index は見出し語(太字)の文字かどうか。"""
+    text: str
+    is_index: bool
+    x0: int
+    height: float
+
+
 def get_char_obj(line_obj):
     # return line_obj._objs[0]._objs
     ret = [obj for line in line_obj._objs for obj in line._objs]
     return ret
 
 
-with open(output_path, 'w') as fp:
-    heading = ["Page", "Head_Coord", "Height", "Text"]
-    tsv_writer = DictWriter(fp, heading, delimiter="\t")
-    tsv_writer.writeheader()
-    # h_coord_counter = Counter()
-    # height_counter = Counter()
-    mid_pos = []
-    right_outliers = []
-    anno_set: Set = set()
-    pages = {}
-    for page_num, page_layout in enumerate(islice(extract_pages(path),
-                                                  page_start,
-                                                  page_end), page_start):
-        left_col = []
-        right_col = []
-        for h_box in islice(page_layout, 1, None):
-            if isinstance(h_box, LTTextContainer):
-                head_x_coord = round(h_box.x0)
-                height = round(h_box.height, 1)
-                line = {"Page": page_num,
-                        "Head_Coord": head_x_coord,
-                        "Height": height,
-                        "Text": h_box.get_text().replace("\n", "")}
-                # h_coord_counter.update([head_x_coord])
-                # height_counter.update([height])
-                if head_x_coord < 100:
-                    left_col.append(h_box)
-                elif 280 < head_x_coord < 300:
-                    mid_pos.append(h_box)
-                else:
-                    # 右端のページ見出し語の除去.ただし p.433 のはルビなので除去しない
-                    if 400 < head_x_coord and page_num != 433:
-                        right_outliers.append(h_box)
-                    else:
-                        right_col.append(h_box)
-        pages[page_num] = left_col + right_col
-        # for row in left_col + right_col:
-        #     tsv_writer.writerow(row)
-# print(sorted(h_coord_counter.items()))
-# print(sorted(height_counter.items()))
-# X
-# print(all(l["Text"].strip("\n").isdigit() for l in mid_pos))
-# for entry in right_outliers:
-#     print(entry)
-
-# font_stats = defaultdict(Counter)
-# font_letter_stats = defaultdict(lambda: defaultdict(set))
-
-items = []
-current_bold_text = ""
-index_x_coord = 0
-index_size = 0.
-current_contents = ""
-for page_num, page in pages.items():
-    for i, h_box in enumerate(page):
-        # if page_num == 96:
-        #     print(i, h_box)
-        #     if i == 31:
-        #         print(get_char_obj(h_box))
-        for j, char_obj in enumerate(get_char_obj(h_box)):
-            if page_num == 17 and i == 0 and j == 0:
-                index_x_coord = round(char_obj.x0)
-                index_size = round(char_obj.height, 1)
-            if isinstance(char_obj, LTChar):
-                fontname = char_obj.fontname
-                if fontname == FONTNAMES[-1] or (fontname == FONTNAMES[2] and char_obj.get_text() in ["/", "(", ")"]):
-                    if current_contents and current_bold_text:
-                        items.append({"page": page_num,
-                                      "index": current_bold_text,
-                                      "index_x_coord": index_x_coord,
-                                      "index_size": index_size,
-                                      "contents": current_contents})
-                        current_bold_text = char_obj._text
-                        index_x_coord = round(char_obj.x0)
-                        index_size = round(char_obj.height, 1)
-                        current_contents = ""
-                    elif not current_contents:
-                        current_bold_text += char_obj._text
-                    else:
-                        raise Exception(f"{current_bold_text}::{current_contents}")
+def _is_index_char(char_obj: LTChar) -> bool:
+    fontname = char_obj.fontname
+    return fontname in BOLDFONTS or (fontname == FONTNAMES[2] and
+                                     char_obj.get_text() in ["/", "(", ")"])
+
+
+def page_layout2chars(page_num: int, page_layout) -> List[PageChar]:
+    """左の段、右の段の順に、本文の文字を並べます。ページ番号と右端のページ見出し語は除きます。"""
+    left_col = []
+    right_col = []
+    for h_box in list(page_layout)[1:]:
+        if isinstance(h_box, LTTextContainer):
+            head_x_coord = round(h_box.x0)
+            if head_x_coord < 100:
+                left_col.append(h_box)
+            elif 280 < head_x_coord < 300:
+                # 段の間のページ番号
+                continue
+            # 右端のページ見出し語の除去.ただし p.433 のはルビなので除去しない
+            elif 400 < head_x_coord and page_num != 433:
+                continue
+            else:
+                right_col.append(h_box)
+    return [
+        PageChar(char_obj._text, _is_index_char(char_obj),
+                 round(char_obj.x0), round(char_obj.height, 1))
+        for h_box in left_col + right_col for char_obj in get_char_obj(h_box)
+        if isinstance(char_obj, LTChar)
+    ]
+
+
+class PageCheckpoint():
+    """ページごとの抽出結果を、１ページ１ファイルで保存します。
+    PDF かこのスクリプトが変わると、保存してあるページはすべて無効になります。
+    """
+
+    def __init__(self, directory: Path, source_hash: str):
+        self.directory = Path(directory)
+        self.source_hash = source_hash
+
+    @classmethod
+    def open(cls, directory: Path, pdf_path: Path) -> "PageCheckpoint":
+        digest = hashlib.sha256()
+        for path in [pdf_path, Path(__file__)]:
+            with open(path, 'rb') as fp:
+                digest.update(hashlib.sha256(fp.read()).digest())
+        checkpoint = cls(directory, digest.hexdigest())
+        checkpoint.directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = checkpoint.directory / "manifest.json"
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as fp:
+                if json.load(fp).get("source_hash") == checkpoint.source_hash:
+                    return checkpoint
+        for page_path in checkpoint.directory.glob("page-*.json"):
+            page_path.unlink()
+        with atomic_write(manifest_path) as fp:
+            json.dump({"source_hash": checkpoint.source_hash}, fp)
+        return checkpoint
+
+    def _page_path(self, page_num: int) -> Path:
+        return self.directory / f"page-{page_num:04d}.json"
+
+    def __contains__(self, page_num: int) -> bool:
+        return self._page_path(page_num).exists()
+
+    def load(self, page_num: int) -> List[PageChar]:
+        with open(self._page_path(page_num), 'r') as fp:
+            return [PageChar(*char) for char in json.load(fp)]
+
+    def save(self, page_num: int, chars: List[PageChar]):
+        with atomic_write(self._page_path(page_num)) as fp:
+            json.dump(chars, fp, ensure_ascii=False)
+
+
+def iter_extracted(pdf_path: Path, page_nums: List[int],
+                   checkpoint: PageCheckpoint) -> Iterator[Tuple[int, List[PageChar]]]:
+    """PDF を１回だけ開いて page_nums のページ(0 始まり)を順に解析し、１ページ終わるごとにチェックポイントに保存して返します。"""
+    for page_num, page_layout in zip(
+            sorted(page_nums), extract_pages(pdf_path,
+                                             page_numbers=set(page_nums))):
+        chars = page_layout2chars(page_num, page_layout)
+        checkpoint.save(page_num, chars)
+        yield page_num, chars
+
+
+def extract_page_range(pdf_path: Path, page_nums: List[int],
+                       checkpoint: PageCheckpoint) -> Dict[int, List[PageChar]]:
+    return dict(iter_extracted(pdf_path, page_nums, checkpoint))
+
+
+def _chunk_ranges(page_nums: List[int], chunk_size: int) -> List[List[int]]:
+    return [
+        page_nums[i:i + chunk_size]
+        for i in range(0, len(page_nums), chunk_size)
+    ]
+
+
+def iter_pages(pdf_path: Path,
+               page_nums: List[int],
+               checkpoint: PageCheckpoint,
+               redo: Set[int] = frozenset(),
+               jobs: int = 1,
+               chunk_size: int = 8) -> Iterator[List[PageChar]]:
+    """ページ順に、各ページの文字を返します。
+    チェックポイントにないページと redo のページだけを解析し、jobs が 2 以上ならプロセスプールで解析します。
+    """
+    stale = [p for p in page_nums if p in redo or p not in checkpoint]
+    if jobs <= 1 or len(stale) <= chunk_size:
+        stale_set = set(stale)
+        # stale はページ順なので、１つの解析の続きから順に取り出せる。
+        extracted = iter_extracted(pdf_path, stale, checkpoint)
+        for page_num in page_nums:
+            if page_num in stale_set:
+                yield next(extracted)[1]
+            else:
+                yield checkpoint.load(page_num)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for chunk in _chunk_ranges(stale, chunk_size):
+            future = executor.submit(extract_page_range, pdf_path, chunk,
+                                     checkpoint)
+            futures.update({page_num: future for page_num in chunk})
+        for page_num in page_nums:
+            if page_num in futures:
+                yield futures.pop(page_num).result()[page_num]
+            else:
+                yield checkpoint.load(page_num)
+
+
+def assemble_items(pages: Iterable[List[PageChar]],
+                   page_nums: Iterable[int]) -> Iterator[Dict]:
+    """太字の見出し語と、その後に続く内容を組にして、１項目ずつ返します。
+    項目の page は、その項目が終わったページです。
+    """
+    current_bold_text = ""
+    index_x_coord: Optional[int] = None
+    index_size = 0.
+    current_contents = ""
+    page_num = None
+    for page_num, chars in zip(page_nums, pages):
+        for char in chars:
+            if index_x_coord is None:
+                index_x_coord = char.x0
+                index_size = char.height
+            if char.is_index:
+                if current_contents and current_bold_text:
+                    yield {"page": page_num,
+                           "index": current_bold_text,
+                           "index_x_coord": index_x_coord,
+                           "index_size": index_size,
+                           "contents": current_contents}
+                    current_bold_text = char.text
+                    index_x_coord = char.x0
+                    index_size = char.height
+                    current_contents = ""
+                elif not current_contents:
+                    current_bold_text += char.text
                 else:
-                    current_contents += char_obj._text
-                # font_stats[char_obj.fontname].update([char_obj.adv])
-                # font_letter_stats[char_obj.fontname][char_obj.adv].add(char_obj._text)
-if current_contents and current_bold_text:
-    items.append({"page": page_num,
-                  "index": current_bold_text,
-                  "index_x_coord": index_x_coord,
-                  "index_size": index_size,
-                  "contents": current_contents})
-
-
-# print(dictionary)
-# pprint(anno_set)
-# pprint(font_stats)
-# print(font_letter_stats)
-
-with open("dict_items.jsonl", 'w') as fp:
-    for item in items:
-        json.dump(item, fp, ensure_ascii=False)
-        fp.write("\n")
-
-
-# pattern = '(' + index + ' *〈[\w（）、]+〉? *)'
-# split_contents = re.split(pattern, line)
+                    raise Exception(f"{current_bold_text}::{current_contents}")
+            else:
+                current_contents += char.text
+    if current_contents and current_bold_text:
+        yield {"page": page_num,
+               "index": current_bold_text,
+               "index_x_coord": index_x_coord,
+               "index_size": index_size,
+               "contents": current_contents}
+
+
+def parse_pages(spec: str) -> Set[int]:
+    """"96,430-433" のような指定を、ページ番号の集合にします。"""
+    pages: Set[int] = set()
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            pages.update(range(int(first), int(last) + 1))
+        elif part:
+            pages.add(int(part))
+    return pages
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pdf', type=Path, default=default_pdf_path)
+    parser.add_argument('-o', '--output', type=Path, default=default_output_path)
+    parser.add_argument('--checkpoint-dir',
+                        type=Path,
+                        default=default_checkpoint_dir,
+                        help="ページごとの抽出結果を保存するディレクトリ")
+    parser.add_argument('--start', type=int, default=page_start)
+    parser.add_argument('--end', type=int, default=page_end)
+    parser.add_argument('--pages',
+                        type=parse_pages,
+                        default=set(),
+                        help="保存してあっても解析し直すページ。例: 96,430-433")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="ページの解析に使うプロセス数")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    page_nums = list(range(args.start, args.end))
+    checkpoint = PageCheckpoint.open(args.checkpoint_dir, args.pdf)
+    pages = iter_pages(args.pdf, page_nums, checkpoint, args.pages, args.jobs)
+    with atomic_write(args.output) as fp:
+        for item in assemble_items(pages, page_nums):
+            json.dump(item, fp, ensure_ascii=False)
+            fp.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,32 @@
-from typing import Dict, List
-from collections import defaultdict, OrderedDict
+from typing import Dict, Iterable, Iterator, List, TextIO
+from collections import OrderedDict
+from contextlib import contextmanager
+import os
+from pathlib import Path
 
 
-def create_index2id_table(entry_list: List) -> OrderedDict:
-    index2id_table: Dict[str, List[str]] = defaultdict(list)
+def add_to_index2id_table(index2id_table: Dict[str, List[int]], entry: Dict):
+    word_id = entry["id"]
+    for index in entry["index"]:
+        index2id_table.setdefault(index, []).append(word_id)
+
+
+def create_index2id_table(entry_list: Iterable) -> OrderedDict:
+    index2id_table: Dict[str, List[int]] = OrderedDict()
     for entry in entry_list:
-        word_id = entry["id"]
-        indices = entry["index"]
-        for index in indices:
-            index2id_table[index] += [word_id]
-    return OrderedDict(index2id_table)
+        add_to_index2id_table(index2id_table, entry)
+    return index2id_table
+
+
+@contextmanager
+def atomic_write(path, mode: str = 'w') -> Iterator[TextIO]:
+    """path と同じディレクトリの一時ファイルに書き出し、書き終わってから path と置き換えます。"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode) as fp:
+            yield fp
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
@@ -1,47 +1,103 @@
 """
 国立国語研究所の沖縄語辞典のxlsx化されたデータを読み込んで、tsvファイルに変換します。
+xlsx は read-only モードで１行ずつ読み、読んだ行からすぐに書き出すので、ワークブック全体をメモリに載せません。
 """
 
 import argparse
 from csv import writer
 from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
 
 from openpyxl import load_workbook
 
-path_dict = {"o2y": "./resources/okinawa_01.xlsx", "y2o": "./resources/okinawa_02.xlsx"}
+from utils import atomic_write
+
+path_dict = {
+    "o2y": "./resources/okinawa_01.xlsx",
+    "y2o": "./resources/okinawa_02.xlsx",
+    "places": "./resources/okinawa_03.xlsx",
+}
 
 zen2han_dict = {chr(0xFF01 + i): chr(0x21 + i) for i in range(94)}
 zen2han_dict.update({'、': ','})
+zen2han_table = str.maketrans(zen2han_dict)
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('filename',
-                        choices=['o2y', 'y2o'],
-                        help="o2y:沖日辞典(okinawa_01.xlsx)。\ny2o: 日沖辞典(okinawa_02.xlsx)")
+                        choices=['o2y', 'y2o', 'places'],
+                        help="o2y:沖日辞典(okinawa_01.xlsx)。\ny2o: 日沖辞典(okinawa_02.xlsx)。\n"
+                        "places: 行政区域別一覧と琉球列島主要島名一覧(okinawa_03.xlsx)。シートごとに書き出します。")
     return parser.parse_args()
 
 
+def cells2values(row: Tuple) -> List:
+    """xlsx形式の行を文字列の行に変換します。見出しの列(2列目)の全角英数記号は半角にします。"""
+    new_row = list(row)
+    if len(new_row) > 1 and isinstance(new_row[1], str):
+        new_row[1] = new_row[1].translate(zen2han_table)
+    return new_row
+
+
+def iter_rows(xlsx_path, sheet_index: int = 0) -> Iterator[List]:
+    """sheet_index 番目のシートの行を、見出しの行も含めて１行ずつ返します。"""
+    workbook = load_workbook(xlsx_path, read_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_index]
+        for row in sheet.iter_rows(values_only=True):
+            yield cells2values(row)
+    finally:
+        workbook.close()
+
+
+def iter_dict_rows(xlsx_path,
+                   sheet_index: int = 0) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """(行番号, 行) の組を返します。行は TSV を DictReader で読んだ時と同じ、見出しの行をキーとする文字列の辞書です。"""
+    rows = iter_rows(xlsx_path, sheet_index)
+    header = ["" if key is None else str(key) for key in next(rows)]
+    for line_num, row in enumerate(rows, start=2):
+        yield line_num, {
+            key: "" if value is None else str(value)
+            for key, value in zip(header, row)
+        }
+
+
+def sheet_count(xlsx_path) -> int:
+    workbook = load_workbook(xlsx_path, read_only=True)
+    try:
+        return len(workbook.worksheets)
+    finally:
+        workbook.close()
+
+
+def xlsx2tsv(xlsx_path, tsv_path, sheet_index: int = 0):
+    """xlsx_path の sheet_index 番目のシートを tsv_path に書き出します。既にあるファイルは上書きしません。"""
+    if Path(tsv_path).exists():
+        raise Exception(f"{tsv_path}は既に存在します。上書きできません。")
+    with atomic_write(tsv_path) as tsv_file:
+        tsv_writer = writer(tsv_file, delimiter="\t")
+        for row in iter_rows(xlsx_path, sheet_index):
+            tsv_writer.writerow(row)
+
+
+def tsv_paths(xlsx_path) -> List[str]:
+    """xlsx の各シートの書き出し先。シートが複数あれば、_1, _2, ... を付けます。"""
+    xlsx_path = str(xlsx_path)
+    n_sheets = sheet_count(xlsx_path)
+    if n_sheets == 1:
+        return [xlsx_path.replace(".xlsx", ".tsv")]
+    return [
+        xlsx_path.replace(".xlsx", f"_{i + 1}.tsv") for i in range(n_sheets)
+    ]
+
+
 def main():
     args = parse_args()
     target_filename = path_dict[args.filename]
     print(target_filename)
-    workbook = load_workbook(target_filename)
-
-    def cells2values(row):
-        """xlsx形式の行を文字列の行に変換します。"""
-        new_row = [e.value for e in row]
-        new_row[1] = new_row[1].translate(str.maketrans(zen2han_dict))
-        return new_row
-
-    rows = [cells2values(row) for row in list(workbook.worksheets[0].rows)]
-    new_filename = target_filename.replace(".xlsx", ".tsv")
-    if Path(new_filename).exists():
-        raise Exception(f"{new_filename}は既に存在します。上書きできません。")
-    with open(new_filename, 'w') as tsv_file:
-        tsv_writer = writer(tsv_file, delimiter="\t")
-        for row in rows:
-            tsv_writer.writerow(row)
+    for sheet_index, tsv_path in enumerate(tsv_paths(target_filename)):
+        xlsx2tsv(target_filename, tsv_path, sheet_index)
 
 
 if __name__ == '__main__':
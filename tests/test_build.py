@@ -0,0 +1,25 @@
+from src.build import Target, build_waves, get_targets
+
+
+def test_target_is_up_to_date(tmp_path):
+    source = tmp_path / "source.tsv"
+    output = tmp_path / "output.json"
+    source.write_text("a\tb\n")
+    target = Target("test", [source], [output], lambda: None)
+    options = {"format": "json", "compact": False}
+    stamps = {"test": target.stamp(options)}
+    assert not target.is_up_to_date(stamps, options)
+
+    output.write_text("[]")
+    assert target.is_up_to_date(stamps, options)
+    assert not target.is_up_to_date(stamps, {**options, "compact": True})
+
+    source.write_text("a\tc\n")
+    assert not target.is_up_to_date(stamps, options)
+
+
+def test_build_waves():
+    targets = get_targets()
+    assert build_waves(["concordance"], targets) == [["o2y", "katsuyou"],
+                                                     ["concordance"]]
+    assert build_waves(["y2o", "o2y"], targets) == [["o2y", "y2o"]]
@@ -0,0 +1,56 @@
+from src.okinawago_dictionary.concordance import (Concordance,
+                                                  iter_katsuyou_sentences,
+                                                  iter_oki_dict_sentences)
+
+oki_entries = [{
+    "id": 7,
+    "meaning": [[
+        {"yamato": "雨。"},
+        {"okinawago": {"phonemes": {"simplified": "?ami nu hujuN."}}},
+        {"yamato": "雨が降る。"},
+        {"okinawago": {"phonemes": {"simplified": "?ami nu hujuN hujuN."}}},
+    ]],
+}]
+katsuyou_entries = [{
+    "id": 0,
+    "sample_sentences": [{"okinawa": "っやー ふぃさとぅ あーいみ？。",
+                          "yamato": "あなたの足と合うか。"}],
+}]
+
+
+def _concordance():
+    return Concordance.build(
+        list(iter_oki_dict_sentences(oki_entries)) +
+        list(iter_katsuyou_sentences(katsuyou_entries)))
+
+
+def test_sentence_pairs():
+    concordance = _concordance()
+    assert [(s.source, s.entry_id, s.yamato) for s in concordance.sentences] == [
+        ("okinawa_01", 7, "雨が降る。"),
+        ("okinawa_01", 7, ""),
+        ("katsuyou_jiten", 0, "あなたの足と合うか。"),
+    ]
+
+
+def test_search_offsets_and_kwic():
+    concordance = _concordance()
+    hits = concordance.search("～nu hujuN")
+    assert [(h.sentence.yamato, h.start, h.end) for h in hits] == [
+        ("雨が降る。", 5, 13), ("", 5, 13)
+    ]
+    assert hits[0].kwic(width=5) == ("?ami ", "nu hujuN", ".")
+    assert len(concordance.search("hujuN", side="okinawa")) == 3
+    assert concordance.search("hujuN", side="yamato") == []
+    hit, = concordance.search("ふぃさとぅ あーいみ")
+    assert hit.to_dict()["id"] == 0 and hit.side == "okinawa"
+    assert [h.side for h in concordance.search("足")] == ["yamato"]
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "concordance.json"
+    with open(path, 'w') as fp:
+        _concordance().save(fp)
+    loaded = Concordance.load(path)
+    assert loaded.sentences == _concordance().sentences
+    assert len(loaded.search("nu hujuN")) == 2
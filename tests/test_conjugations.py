@@ -0,0 +1,30 @@
+from src.conjugations import (Paradigm, _irregular_phonetics, expand_paradigm,
+                              get_conjugations, irregular_verb_conjs)
+from src.pos import get_pos
+
+
+def _round_trip(conjugation):
+    paradigm = conjugation.paradigm()
+    assert Paradigm.from_dict(paradigm.to_dict()) == paradigm
+    assert expand_paradigm(paradigm.to_dict()) == conjugation.to_dict()
+    return paradigm
+
+
+def test_regular_paradigm():
+    paradigm = _round_trip(get_conjugations("?aga=cuN", ["=kaN", "=ci"]))
+    assert paradigm.to_dict() == {
+        "class": "regular",
+        "stems": {"語幹": "?aga", "基本": "?agak", "連用": "?agac", "音便": "?agac"},
+    }
+
+
+def test_stem_only_paradigm():
+    paradigm = _round_trip(get_conjugations("?aa=juN", ["=raN"]))
+    assert paradigm.conj_class == "stem_only"
+
+
+def test_irregular_paradigm_is_memoised():
+    conjugation = get_pos("他･不規則", "sjuN").conjugation
+    assert conjugation == irregular_verb_conjs["sjuN"]
+    assert _round_trip(conjugation).to_dict() == {"class": "irregular", "verb": "sjuN"}
+    assert _irregular_phonetics("sjuN") is _irregular_phonetics("sjuN")
@@ -1,4 +1,17 @@
-from src.generate_base_json import Oki2YamatoConverter, split_sentence
+import click
+import pytest
+
+from src import generate_base_json
+from src.generate_base_json import (
+    Oki2YamatoConverter,
+    split_sentence,
+    load_n_convert,
+    load_n_convert_incremental,
+    ConversionError,
+    MeaningToken,
+    existing_entries_path,
+)
+from src.conversion_cache import ConversionCache
 
 okinawan_in_sentence_pattern = Oki2YamatoConverter.okinawan_in_sentence_pattern
 example_sentences_pattern = Oki2YamatoConverter.example_sentences_pattern
@@ -37,6 +50,27 @@ def test_split3():
                           sentence_in) == sentence_out
 
 
+def test_meaning_lexer():
+    sentence_in = "雨。'ami ともいう。〔?i~i~〕～nu hujuN.雨が降る。"
+    tokens = list(Oki2YamatoConverter.meaning_lexer.tokenize(sentence_in))
+    assert tokens == [
+        MeaningToken("yamato", "雨。'ami ともいう。〔?i~i~〕"),
+        MeaningToken("okinawan", "'ami "),
+        MeaningToken("ipa", "?i~i~"),
+        MeaningToken("example", "～nu hujuN."),
+        MeaningToken("yamato", "雨が降る。"),
+    ]
+
+    # （）の中の例文は区切らずに、大和口の文の一部とする。
+    tokens = list(Oki2YamatoConverter.meaning_lexer.tokenize("酒（saki nuN.）を飲む。ami hujuN.雨。"))
+    assert tokens == [
+        MeaningToken("yamato", "酒（saki nuN.）を飲む。"),
+        MeaningToken("okinawan", "saki nuN"),
+        MeaningToken("example", "ami hujuN."),
+        MeaningToken("yamato", "雨。"),
+    ]
+
+
 def test_okinawan_search1():
     sentence_in = "[大主]?azi[按司]の家来の中の頭役。"
     detected = ["?azi"]
@@ -47,3 +81,55 @@ def test_okinawan_search2():
     sentence_in = "この紙を燃やす彼岸の行事は'Ncabi,kabi?aNziiなどという。"
     detected = ["'Ncabi", "kabi?aNzii"]
     assert okinawan_in_sentence_pattern.findall(sentence_in) == detected
+
+
+class _FailingConverter():
+
+    @classmethod
+    def convert(cls, tsv_row):
+        if tsv_row["見出し語"] == "bad":
+            raise ValueError("broken row")
+        return {"headword": tsv_row["見出し語"]}
+
+
+def test_load_n_convert_reports_row(tmp_path):
+    source = tmp_path / "base.tsv"
+    source.write_text("見出し語\tメモ\n?ami\t\"2\n行\"\nbad\t\n")
+    _FailingConverter.source = str(source)
+    with pytest.raises(ConversionError) as exc_info:
+        load_n_convert(_FailingConverter)
+    assert exc_info.value.row_id == 1
+    assert exc_info.value.line_num == 4
+    assert "bad" in str(exc_info.value)
+
+
+def test_load_n_convert_incremental(tmp_path):
+    source = tmp_path / "base.tsv"
+    source.write_text("見出し語\n?ami\nhuju\n")
+    _FailingConverter.source = str(source)
+    cache_path = tmp_path / "cache.jsonl"
+
+    cache = ConversionCache.load(cache_path, "code")
+    entries, reused, rebuilt = load_n_convert_incremental(_FailingConverter, cache)
+    assert (reused, rebuilt) == (0, 2)
+    assert list(entries) == load_n_convert(_FailingConverter)
+    cache.save()
+
+    source.write_text("見出し語\n?ami\nnacu\nhuju\n")
+    cache = ConversionCache.load(cache_path, "code")
+    entries, reused, rebuilt = load_n_convert_incremental(_FailingConverter, cache)
+    assert (reused, rebuilt) == (2, 1)
+    assert list(entries) == load_n_convert(_FailingConverter)
+
+    cache = ConversionCache.load(cache_path, "changed code")
+    assert load_n_convert_incremental(_FailingConverter, cache)[1:] == (0, 3)
+
+
+def test_existing_entries_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_base_json, "target_dir", tmp_path)
+    with pytest.raises(click.ClickException):
+        existing_entries_path("o2y")
+    (tmp_path / "okinawa_01.packed.json").write_text("{}")
+    assert existing_entries_path("o2y").name == "okinawa_01.packed.json"
+    (tmp_path / "okinawa_01.jsonl").write_text("")
+    assert existing_entries_path("o2y").name == "okinawa_01.jsonl"
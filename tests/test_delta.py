@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from src.delta import PatchError, apply_patch, apply_sequence, diff_sequence, make_patch
+from src.okinawago_dictionary import packed
+from src.okinawago_dictionary.index_table import IndexTable, dump
+
+
+def _write_build(directory, entries, index_table, indent=4):
+    directory.mkdir()
+    with open(directory / "okinawa_01.json", 'w') as fp:
+        json.dump(entries, fp, ensure_ascii=False, indent=indent)
+    with open(directory / "katsuyou_jiten_index-table.json", 'w') as fp:
+        json.dump(index_table, fp, ensure_ascii=False)
+
+
+def test_sequence_edits():
+    old = [0, 1, 2, 3, 4, 5]
+    new = [0, 2, 3, 9, 4, 5, 6]
+    assert apply_sequence(old, diff_sequence(old, new)) == new
+
+
+def test_make_and_apply_patch(tmp_path):
+    old_entries = [{"id": i, "text": f"{i}"} for i in range(100)]
+    new_entries = [dict(e) for e in old_entries if e["id"] != 50]
+    new_entries[3]["text"] = "あいう"
+    new_entries.append({"id": 100, "text": "新"})
+    _write_build(tmp_path / "old", old_entries, {"アー": [0], "イー": [1]})
+    _write_build(tmp_path / "new", new_entries, {"イー": [1, 2], "ウー": [3], "アー": [0]})
+
+    patch = make_patch(tmp_path / "old", tmp_path / "new")
+    delta = patch["files"]["okinawa_01.json"]["delta"]
+    assert [e["id"] for e in delta["added"]] == [100]
+    assert [e["id"] for e in delta["changed"]] == [3]
+    assert delta["removed"] == [50]
+
+    apply_patch(tmp_path / "old", patch, tmp_path / "out")
+    for name in ["okinawa_01.json", "katsuyou_jiten_index-table.json"]:
+        assert (tmp_path / "out" / name).read_bytes() == (tmp_path / "new" / name).read_bytes()
+
+    with open(tmp_path / "old" / "okinawa_01.json", 'a') as fp:
+        fp.write("\n")
+    with pytest.raises(PatchError):
+        apply_patch(tmp_path / "old", patch, tmp_path / "out2")
+
+
+def test_packed_entries_patch(tmp_path):
+    phonetics = {"phonemes": "?aa", "pronunciation": {"HEIMIN": {"kana": ["アー"]}}}
+    old_entries = [{"id": i, "index": phonetics, "text": f"{i}"} for i in range(20)]
+    new_entries = [dict(e) for e in old_entries if e["id"] != 5]
+    new_entries[0]["text"] = "あいう"
+    new_entries.append({"id": 20, "index": phonetics, "text": "新", "extra": 1.5})
+    for name, entries in [("old", old_entries), ("new", new_entries)]:
+        (tmp_path / name).mkdir()
+        with open(tmp_path / name / "okinawa_01.packed.json", 'w') as fp:
+            packed.dump(entries, fp)
+
+    patch = make_patch(tmp_path / "old", tmp_path / "new")
+    delta = patch["files"]["okinawa_01.packed.json"]["delta"]
+    assert [e["id"] for e in delta["added"]] == [20]
+    assert [e["id"] for e in delta["changed"]] == [0]
+    assert delta["removed"] == [5]
+
+    apply_patch(tmp_path / "old", patch, tmp_path / "out")
+    name = "okinawa_01.packed.json"
+    assert (tmp_path / "out" / name).read_bytes() == (tmp_path / "new" / name).read_bytes()
+
+
+def test_index_table_bin_is_rebuilt(tmp_path):
+    entries = [{"id": i} for i in range(3)]
+    _write_build(tmp_path / "old", entries, {"アー": [0], "イー": [1]})
+    _write_build(tmp_path / "new", entries, {"アー": [0, 2], "ウー": [1]})
+    with open(tmp_path / "old" / "katsuyou_jiten_index-table.bin", 'wb') as fp:
+        dump({"アー": [0], "イー": [1]}, fp)
+
+    patch = make_patch(tmp_path / "old", tmp_path / "new")
+    apply_patch(tmp_path / "old", patch, tmp_path / "old")
+    table = IndexTable.load(tmp_path / "old" / "katsuyou_jiten_index-table.bin")
+    assert table.to_dict() == {"アー": [0, 2], "ウー": [1]}
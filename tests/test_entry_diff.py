@@ -0,0 +1,48 @@
+import io
+
+from src.entry_diff import diff_entries, diff_values, print_report
+
+
+def test_diff_values():
+    old = {"a": 1, "b": [1, 2], "c": {"d": "x"}}
+    new = {"a": 1, "b": [1], "c": {"d": "y"}, "e": None}
+    assert list(diff_values(old, new)) == [
+        {"path": "b/1", "old": 2},
+        {"path": "c/d", "old": "x", "new": "y"},
+        {"path": "e", "new": None},
+    ]
+
+
+def test_diff_values_none_and_absent():
+    # None の値を加えたのと、None にしたのと、消したのは、それぞれ区別できる。
+    assert list(diff_values({"a": 1, "b": None}, {"a": None, "c": None})) == [
+        {"path": "a", "old": 1, "new": None},
+        {"path": "b", "old": None},
+        {"path": "c", "new": None},
+    ]
+    report = diff_entries([{"id": 0, "index": ["アー"]}], [{"id": 0, "index": ["アー"], "pos": None}])
+    fp = io.StringIO()
+    print_report(report, fp)
+    assert "    pos: (なし) -> null\n" in fp.getvalue()
+
+
+def test_diff_entries():
+    old = [
+        {"id": 0, "index": ["アー"], "remarks": ""},
+        {"id": 1, "index": ["アミ"], "remarks": ""},
+        {"id": 2, "index": ["アブク"], "remarks": ""},
+    ]
+    new = [
+        {"id": 0, "index": ["アー"], "remarks": ""},
+        {"id": 1, "index": ["アミ"], "remarks": "雨。"},
+        {"id": 3, "index": ["アカ"], "remarks": ""},
+    ]
+    report = diff_entries(old, new)
+    assert report["summary"] == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1}
+    assert report["added"] == [{"id": 3, "label": "アカ"}]
+    assert report["removed"] == [{"id": 2, "label": "アブク"}]
+    assert report["changed"] == [{
+        "id": 1,
+        "label": "アミ",
+        "changes": [{"path": "remarks", "old": "", "new": "雨。"}],
+    }]
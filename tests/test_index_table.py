@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from src.okinawago_dictionary import dictionary
+from src.okinawago_dictionary.dictionary import OkinawagoDictionary
+from src.okinawago_dictionary.index_table import IndexTable, dump, source_digest
+
+index2id_table = {
+    "ヤー": [3],
+    "アー": [0, 1],
+    "’ンジャン": [4, 1],
+    "カー": [],
+    "a": [2],
+}
+
+
+def test_load(tmp_path):
+    path = tmp_path / "okinawa_01_index-table.bin"
+    with open(path, 'wb') as fp:
+        dump(index2id_table, fp)
+    table = IndexTable.load(path)
+    assert list(table) == sorted(index2id_table)
+    assert len(table) == 5
+    assert table.to_dict() == index2id_table
+    assert table["’ンジャン"] == [4, 1]
+    assert "カー" in table and "イー" not in table and 1 not in table
+    with pytest.raises(KeyError):
+        table["イー"]
+
+
+def test_dictionary_get_keys():
+    oki_dict = OkinawagoDictionary([{"id": i} for i in range(5)],
+                                   IndexTable.from_dict(index2id_table))
+    assert [oki_dict.get_content(i) for i in oki_dict.get_keys("アー")
+            ] == [{"id": 0}, {"id": 1}]
+    # JSON の表と同じく、id のリストを返す。
+    assert oki_dict.get_keys("’ンジャン") == [4, 1]
+    assert json.dumps(oki_dict.get_keys("アー")) == "[0, 1]"
+    assert set(oki_dict.index_words) == set(index2id_table)
+
+
+def test_empty():
+    table = IndexTable.from_dict({})
+    assert len(table) == 0 and "アー" not in table
+
+
+def test_stale_bin_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(dictionary, "current_dir", tmp_path)
+    csr_path = tmp_path / "okinawa_01_index-table.bin"
+    json_path = tmp_path / "okinawa_01_index-table.json"
+    with open(json_path, 'w') as fp:
+        json.dump({"アー": [0]}, fp, ensure_ascii=False)
+    with open(csr_path, 'wb') as fp:
+        dump({"アー": [0]}, fp, source_digest(json_path))
+    assert isinstance(dictionary.load_index_table("okinawa_01"), IndexTable)
+    # JSON を書き直しただけなら、.bin は古くても新しくても使える(git checkout で時刻だけが変わる)。
+    os.utime(csr_path, ns=(0, 0))
+    assert isinstance(dictionary.load_index_table("okinawa_01"), IndexTable)
+    # JSON の中身が変われば、.bin は古いので JSON を読む。
+    with open(json_path, 'w') as fp:
+        json.dump(index2id_table, fp, ensure_ascii=False)
+    with pytest.warns(UserWarning):
+        assert dictionary.load_index_table("okinawa_01") == index2id_table
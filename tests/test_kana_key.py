@@ -0,0 +1,51 @@
+import pytest
+
+from src.kanahyouki import SocialClass, generate_phonetics, roman_to_kana_n_ipa
+from src.okinawago_dictionary.kana_key import (canonical_kana, canonical_kana_with_positions,
+                                               canonical_keys)
+
+
+@pytest.mark.parametrize("mora", sorted(roman_to_kana_n_ipa))
+def test_mora_variants_fold(mora):
+    for variants in roman_to_kana_n_ipa[mora]["kana"].values():
+        assert len({canonical_kana(kana) for kana in variants}) == 1
+
+
+@pytest.mark.parametrize("phonemes, keys", [
+    ("?aa", ["アー"]),
+    ("'uganuN", ["’ウガヌン"]),
+    ("?wiikiga", ["ʔウィーキガ"]),
+    ("?aCiZii", ["アチジー", "アツィズィー"]),
+])
+def test_word_keys(phonemes, keys):
+    pronunciations = generate_phonetics(phonemes).pronunciations
+    kana = [
+        kana for social_class in SocialClass
+        if social_class in pronunciations
+        for kana in pronunciations[social_class].kana
+    ]
+    assert canonical_keys(kana) == keys
+
+
+def test_canonical_kana():
+    for variant in ["’ウガヌン", "'うがぬん", "ゥウガヌン", "ウゥガヌン", "ヲゥガヌン"]:
+        assert canonical_kana(variant) == "’ウガヌン"
+    assert canonical_kana("ッヤー") == canonical_kana("?ヤー") == "ʔヤー"
+    assert canonical_kana("ヰェー") == "イェー"
+    assert canonical_kana("いぢ") == canonical_kana("イヂ") == "イジ"
+    # 小さい母音が前の仮名と組むもの(ファ)は、声門閉鎖ではない。
+    assert canonical_kana("ファー") == "ファー"
+    assert canonical_kana("ファイ") == "ファイ"
+    # 語の中の ティイ, トゥウ, ツィイ の小さい母音は、前の仮名と組む。
+    assert canonical_kana("ウティイリ") == "ウティイリ"
+    assert canonical_kana("ウトゥウチュン") == "ウトゥウチュン"
+    assert canonical_kana("ジツィイン") == "ジツィイン"
+    # 母音, ー, ン の後ならモーラの始めなので、声門閉鎖。
+    assert canonical_kana("アィイ") == canonical_kana("アイィ") == "ア’イ"
+    assert canonical_kana("ンゥウ") == "ン’ウ"
+    assert canonical_kana("ーゥウ") == "ー’ウ"
+
+
+def test_canonical_kana_with_positions():
+    assert canonical_kana_with_positions("ゥウヰー") == ("’ウ’イー", [0, 1, 2, 2, 3, 4])
+    assert canonical_kana_with_positions("アー") == ("アー", [0, 1, 2])
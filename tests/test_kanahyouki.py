@@ -10,7 +10,17 @@ from src.kanahyouki import (
     _check_semi_vowels,
     _check_vowel,
     _check_ending,
+    generate_phonetics,
+    join_phonetics,
+    PhonemeSymols,
+    Pronunciation,
+    SocialClass,
+    WordPhonetics,
+    kana2phonemes,
+    default_phoneme_limit,
+    split_into_moras,
 )
+from csv import DictReader
 
 import pytest
 
@@ -78,3 +88,55 @@ def test_check_glottal_stop():
     ]
     for in_strings, out_strings in targets:
         assert _check_glottal_stop(list(in_strings)) == out_strings
+
+
+def _fold_phonetics(items):
+    joined = WordPhonetics(PhonemeSymols("", ""),
+                           {SocialClass.HEIMIN: Pronunciation("", [""])})
+    for item in items:
+        if not isinstance(item, WordPhonetics):
+            item = WordPhonetics(PhonemeSymols(item, item),
+                                 {SocialClass.HEIMIN: Pronunciation(item, [item])})
+        joined += item
+    return joined
+
+
+def test_join_phonetics_same_as_fold():
+    targets = [
+        [],
+        ["nu", " ", "hujuN"],
+        ["?ami", " ", "nu", " ", "hujuN", "."],
+        ["Si", " ", "?ami", ", ", "tuzi"],
+        ["?ami", " ", "sjuuri", " ", "ziN", " ", "Zaa"],
+    ]
+    for words in targets:
+        items = [
+            generate_phonetics(w) if w.strip(" ,.") else w for w in words
+        ]
+        assert join_phonetics(items) == _fold_phonetics(items)
+
+
+def test_kana2phonemes_longest_match_first():
+    assert kana2phonemes("ッメ") == ["?me", "Qme"]
+    assert kana2phonemes("あみ") == ["?ami", "ami"]
+    assert kana2phonemes("フンー") == ["hNN"]
+    assert kana2phonemes("") == []
+    assert kana2phonemes("ヵ") == []
+
+
+def test_kana2phonemes_long_ambiguous_input():
+    # 候補は長さに対して指数的に増えるので、既定では上限までしか返さない。
+    candidates = kana2phonemes("ア" * 40)
+    assert len(candidates) == default_phoneme_limit
+    assert candidates[0] == "?a" * 40
+    assert len(kana2phonemes("ア" * 12, limit=None)) == 2 ** 12
+
+
+def test_kana2phonemes_round_trip_all_headwords():
+    with open("resources/base_lists/okinawa_01.tsv", "r") as base_file:
+        headwords = [row["見出し語"] for row in DictReader(base_file, delimiter="\t")]
+    for headword in headwords:
+        phonemes = headword if headword == "hNN" else "".join(split_into_moras(headword))
+        for pronunciation in generate_phonetics(headword).pronunciations.values():
+            for kana in pronunciation.kana:
+                assert phonemes in kana2phonemes(kana), (headword, kana)
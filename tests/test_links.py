@@ -0,0 +1,41 @@
+from src.okinawago_dictionary.links import LinkTable, build_links, kana_keys, phoneme_key
+
+
+def phonetics(simplified, kana):
+    return {"phonemes": {"simplified": simplified, "original": simplified},
+            "pronunciation": {"HEIMIN": {"IPA": "", "kana": [kana]}}}
+
+
+oki_entries = [
+    {"id": 131, "index": ["アガユン"], "phonetics": phonetics("?aga=juN", "アガユン")},
+    {"id": 200, "index": ["アーブク"], "phonetics": phonetics("?aabuku", "アーブク")},
+]
+yamato_entries = [
+    {"id": 86, "index": ["あがる"], "contents": {"base": [
+        {"reference": False, "lang": "Okinawa", "phonetics": phonetics("?agajuN", "アガユン")}],
+        "related": []}},
+    {"id": 427, "index": ["あわ"], "contents": {"base": [
+        {"reference": True, "lang": "Okinawa", "phonetics": phonetics("?aabuku", "アーブク")}],
+        "related": []}},
+]
+katsuyou_entries = [{"id": 7, "index": ["あがいん"]}, {"id": 8, "index": ["あか"]}]
+
+
+def test_keys():
+    assert phoneme_key("?aga=juN") == phoneme_key("?aga]juN") == "?agajuN"
+    assert kana_keys("あがいん") == ["アガイン", "アガユン"]
+    assert kana_keys("’ンジャン") == ["ンジャン"]
+
+
+def test_build_links(tmp_path):
+    built = build_links(oki_entries, yamato_entries, katsuyou_entries)
+    with open(tmp_path / "links.json", 'w') as fp:
+        LinkTable(built["links"], built["stats"]).save(fp)
+    link_table = LinkTable.load(tmp_path / "links.json")
+    assert link_table.linked("okinawa_01", 131) == {"okinawa_02": [86], "katsuyou_jiten": [7]}
+    assert link_table.linked("katsuyou_jiten", 7) == {"okinawa_01": [131], "okinawa_02": [86]}
+    # → による参照は対応に含めない。
+    assert link_table.linked("okinawa_01", 200) == {}
+    assert link_table.linked("katsuyou_jiten", 8) == {}
+    assert link_table.stats["okinawa_01-okinawa_02"] == {
+        "pairs": 1, "coverage": {"okinawa_01": [1, 2], "okinawa_02": [1, 2]}}
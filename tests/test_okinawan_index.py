@@ -0,0 +1,47 @@
+from src.okinawago_dictionary.okinawan_index import OkinawanCitation, OkinawanIndex
+
+
+def phonetics(simplified, *kanas):
+    return {"phonemes": {"simplified": simplified, "original": simplified},
+            "pronunciation": {"HEIMIN": {"IPA": "", "kana": list(kanas)}}}
+
+
+def oki_item(simplified, kana, reference=False, **kwargs):
+    return dict({"reference": reference, "lang": "Okinawa",
+                 "phonetics": phonetics(simplified, kana)}, **kwargs)
+
+
+entries = [
+    {"id": 15, "index": ["あいする"],
+     "contents": {"base": [oki_item("kanasjaN", "カナサン", reference=True)], "related": []}},
+    {"id": 30, "index": ["あいらしい"],
+     "contents": {"base": [oki_item("kanasjaN", "カナサン")],
+                  "related": [[{"reference": False, "lang": "Yamato", "kana": "～子"},
+                               oki_item("kanasjaN", "カナサン")]]}},
+    {"id": 33, "index": ["あう"],
+     "contents": {"base": [oki_item("'uganuN", "’ウガヌン", connotation="敬語"),
+                           dict(oki_item("?icajuN", "イチャユン"),
+                                related=[{"lang": "Okinawa", "connotation": "敬語",
+                                          "phonetics": phonetics("?wiicee", "ウィーチェー")}])],
+                  "related": []}},
+]
+
+
+def test_lookup():
+    okinawan_index = OkinawanIndex.build(entries)
+    assert okinawan_index.lookup("kanasjaN") == [
+        OkinawanCitation(30, "base", False, None),
+        OkinawanCitation(30, "related", False, None),
+    ]
+    assert okinawan_index.entry_ids("かなさん", references=True) == [15, 30]
+    assert okinawan_index.entry_ids("ウィーチェー") == [33]
+
+
+def test_connotations(tmp_path):
+    with open(tmp_path / "index.json", 'w') as fp:
+        OkinawanIndex.build(entries).save(fp)
+    okinawan_index = OkinawanIndex.load(tmp_path / "index.json")
+    assert okinawan_index.entry_ids("’ウガヌン", connotations=["敬語"]) == [33]
+    assert okinawan_index.entry_ids("’ウガヌン", connotations=[None]) == []
+    assert okinawan_index.entry_ids("イチャユン", connotations=[None]) == [33]
+    assert okinawan_index.lookup("ミー") == []
@@ -0,0 +1,67 @@
+import json
+import subprocess
+
+import pytest
+
+from src.okinawago_dictionary import dictionary
+from src.okinawago_dictionary.dictionary import OkinawagoDictionary
+from src.okinawago_dictionary.packed import PackedEntries, dump, pack, remove_other_formats
+
+phonetics = {
+    "phonemes": {"simplified": "?aabuku", "original": "ʔaabuku"},
+    "pronunciation": {"HEIMIN": {"IPA": "ʔaːbuku", "kana": ["アーブク"]}},
+}
+entries = [
+    {"id": 5, "page": 99, "reference": False, "pos": None, "phonetics": phonetics,
+     "index": ["アーブク"], "meaning": [[{"okinawago": phonetics}, {"yamato": "泡。"}]]},
+    {"id": 7, "page": 99, "reference": True, "pos": {"type": "名"}, "phonetics": phonetics,
+     "index": [], "meaning": [], "score": 0.5},
+]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "okinawa_01.packed.json"
+    with open(path, 'w') as fp:
+        dump(entries, fp)
+    packed_entries = PackedEntries.load(path)
+    assert len(packed_entries) == 2
+    assert list(packed_entries) == entries
+    assert packed_entries[1] == entries[1]
+    assert [packed_entries.entry_id(i) for i in range(2)] == [5, 7]
+
+
+def test_deduplication():
+    packed = pack(entries)
+    assert len(packed["phonetics"]) == 1
+    assert len(packed["strings"]) == len(set(packed["strings"]))
+    assert packed["strings"].count("HEIMIN") == 1
+
+
+def test_dictionary_rehydrates_on_demand():
+    packed_entries = PackedEntries(json.loads(json.dumps(pack(entries))))
+    oki_dict = OkinawagoDictionary(packed_entries, {"アーブク": [5]})
+    assert packed_entries.phonetics.cache_info().currsize == 0
+    assert oki_dict.get_content(oki_dict.get_keys("アーブク")[0]) == entries[0]
+    assert oki_dict.get_content(5) is oki_dict.get_content(5)
+
+
+def test_remove_other_formats(tmp_path, monkeypatch):
+    for name in ["okinawa_01.json", "okinawa_01.jsonl", "okinawa_01.packed.json", "okinawa_02.json"]:
+        (tmp_path / name).write_text("[]")
+    monkeypatch.setattr(dictionary, "current_dir", tmp_path)
+    # 古い形式のファイルが残っていると、json が先に読まれるので警告する。
+    with pytest.warns(UserWarning, match="okinawa_01.jsonl"):
+        dictionary.load_entries("okinawa_01")
+    removed = remove_other_formats(tmp_path, "okinawa_01", "jsonl")
+    assert sorted(path.name for path in removed) == ["okinawa_01.json", "okinawa_01.packed.json"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["okinawa_01.jsonl", "okinawa_02.json"]
+
+
+def test_remove_other_formats_keeps_tracked_files(tmp_path):
+    for name in ["katsuyou_jiten.json", "katsuyou_jiten.packed.json"]:
+        (tmp_path / name).write_text("[]")
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "katsuyou_jiten.json"], cwd=tmp_path, check=True)
+    removed = remove_other_formats(tmp_path, "katsuyou_jiten", "jsonl")
+    assert [path.name for path in removed] == ["katsuyou_jiten.packed.json"]
+    assert (tmp_path / "katsuyou_jiten.json").exists()
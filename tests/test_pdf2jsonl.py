@@ -0,0 +1,47 @@
+from src.uchinaaguchi_katsuyou_jiten import pdf2jsonl
+from src.uchinaaguchi_katsuyou_jiten.pdf2jsonl import (PageChar,
+                                                       PageCheckpoint,
+                                                       assemble_items,
+                                                       iter_pages,
+                                                       parse_pages)
+
+
+def _chars(text, is_index, x0=72, height=14.3):
+    return [PageChar(c, is_index, x0, height) for c in text]
+
+
+def test_assemble_items_across_pages():
+    pages = [
+        _chars("あーいん", True) + _chars("〈合う〉", False),
+        _chars("【例】", False) + _chars("あがいん", True, x0=300) +
+        _chars("〈上がる〉", False),
+    ]
+    items = list(assemble_items(pages, [17, 18]))
+    assert items == [
+        {"page": 18, "index": "あーいん", "index_x_coord": 72,
+         "index_size": 14.3, "contents": "〈合う〉【例】"},
+        {"page": 18, "index": "あがいん", "index_x_coord": 300,
+         "index_size": 14.3, "contents": "〈上がる〉"},
+    ]
+
+
+def test_parse_pages():
+    assert parse_pages("96,430-433") == {96, 430, 431, 432, 433}
+
+
+def test_iter_pages_opens_pdf_once(tmp_path, monkeypatch):
+    opened = []
+
+    def fake_extract_pages(pdf_path, page_numbers):
+        opened.append(sorted(page_numbers))
+        return iter(sorted(page_numbers))
+
+    monkeypatch.setattr(pdf2jsonl, "extract_pages", fake_extract_pages)
+    monkeypatch.setattr(pdf2jsonl, "page_layout2chars",
+                        lambda page_num, layout: _chars(str(page_num), False))
+    checkpoint = PageCheckpoint(tmp_path, "hash")
+    checkpoint.save(18, _chars("saved", False))
+    pages = list(iter_pages(tmp_path / "a.pdf", [17, 18, 19, 20], checkpoint))
+    assert ["".join(c.text for c in chars) for chars in pages] == ["17", "saved", "19", "20"]
+    assert opened == [[17, 19, 20]]
+    assert 19 in checkpoint
@@ -0,0 +1,33 @@
+import sys
+
+from src.profiling import StageProfiler
+
+
+def _slow_square(x):
+    return x * x
+
+
+class _Converter():
+
+    @classmethod
+    def convert(cls, tsv_row):
+        return {"square": _slow_square(int(tsv_row["見出し"]))}
+
+
+def test_stage_profiler_patch_and_restore():
+    profiler = StageProfiler(n_slowest=2)
+    this_module = sys.modules[__name__]
+    original = this_module._slow_square
+    profiler.patch(this_module, "_slow_square", "square")
+    profiler.patch_converter(_Converter, ["見出し語", "見出し"])
+    for i in range(3):
+        assert _Converter.convert({"見出し": str(i)}) == {"square": i * i}
+    profiler.restore()
+    assert this_module._slow_square is original
+    assert not hasattr(_Converter.convert, "__wrapped__")
+
+    report = profiler.report(rows=3)
+    assert report["stages"]["square"]["calls"] == 3
+    assert report["stages"]["convert"]["calls"] == 3
+    assert len(report["slowest"]) == 2
+    assert {e["headword"] for e in report["slowest"]} <= {"0", "1", "2"}
@@ -0,0 +1,105 @@
+from src.okinawago_dictionary.segmenter import KanaTrie, Segmenter, Token
+
+
+class FakeDictionary():
+    index_words = {"アー": [1], "ヌタチュン": [2], "ヌ": [3], "タチュン": [4], "’ウガヌン": [5], "?ヤー": [6], "’イー": [7]}
+    contents = {
+        1: {"pos": {"conjugation": None}},
+        2: {"pos": {"conjugation": None}},
+        3: {"pos": {"conjugation": None}},
+        4: {"pos": {"conjugation": {"基本派生形": [
+            {"pronunciation": {"HEIMIN": {"IPA": "", "kana": ["タタン"]}}}]}}},
+        5: {"pos": {"conjugation": None}},
+        6: {"pos": {"conjugation": None}},
+        7: {"pos": {"conjugation": None}},
+    }
+
+    def get_keys(self, word):
+        return self.index_words[word]
+
+    def get_content(self, entry_id):
+        return self.contents[entry_id]
+
+
+def surfaces(tokens):
+    return [(token.surface, token.entry_ids) for token in tokens]
+
+
+def test_segment_modes():
+    text = "アーヌタチュン。"
+    cost = Segmenter.from_dictionary(FakeDictionary())
+    assert surfaces(cost.segment(text)) == [
+        ("アー", (1,)), ("ヌタチュン", (2,)), ("。", ())]
+    longest = Segmenter.from_dictionary(FakeDictionary(), mode="longest")
+    assert surfaces(longest.segment(text)) == surfaces(cost.segment(text))
+    # 平仮名も引け、位置は元の文のまま。
+    assert cost.segment("あーぬたちゅん", offset=10)[1] == Token(12, 17, "ぬたちゅん", (2,))
+
+
+def test_unknown_and_inflections():
+    segmenter = Segmenter.from_dictionary(FakeDictionary())
+    # 辞書にない仮名の続きは、１つの Token にまとまる。
+    assert surfaces(segmenter.segment("ヌタタンアー")) == [
+        ("ヌ", (3,)), ("タタン", ()), ("アー", (1,))]
+    with_inflections = Segmenter.from_dictionary(FakeDictionary(), inflections=True)
+    assert surfaces(with_inflections.segment("ヌタタン")) == [("ヌ", (3,)), ("タタン", (4,))]
+    # 声門閉鎖の記号は、あってもなくても引ける。
+    assert surfaces(segmenter.segment("ウガヌン’ウガヌン")) == [
+        ("ウガヌン", (5,)), ("’ウガヌン", (5,))]
+
+
+def test_cost_prefers_fewer_words():
+    trie = KanaTrie()
+    for word, entry_id in [("アブ", 1), ("アブク", 2), ("クシ", 3), ("シ", 4)]:
+        trie.add(word, [entry_id])
+    assert surfaces(Segmenter(trie, "longest").segment("アブクシ")) == [
+        ("アブク", (2,)), ("シ", (4,))]
+    # 語の数が同じなら、より後ろから始まる語で終わる経路を選ぶ。
+    assert surfaces(Segmenter(trie, "cost").segment("アブクシ")) == [
+        ("アブク", (2,)), ("シ", (4,))]
+    trie.add("クシカ", [5])
+    assert surfaces(Segmenter(trie, "longest").segment("アブクシカ")) == [
+        ("アブク", (2,)), ("シ", (4,)), ("カ", ())]
+    assert surfaces(Segmenter(trie, "cost").segment("アブクシカ")) == [
+        ("アブ", (1,)), ("クシカ", (5,))]
+
+
+def test_trie_walks():
+    trie = KanaTrie()
+    for word, entry_id in [("アブ", 1), ("アブク", 2), ("クシ", 3), ("シ", 4), ("’アー", 5), ("ア・ブ", 6)]:
+        trie.add(word, [entry_id])
+    assert list(trie.iter_prefixes("アブクシ")) == [(2, (1,)), (3, (2,))]
+    assert list(trie.iter_prefixes("アブクシ", 2)) == [(4, (3,))]
+    assert list(trie.iter_prefixes("アブクシ", 1)) == []
+    # 声門閉鎖の記号は見出し語から除くので、アー で引く。仮名でない文字を含む語は入らない。
+    assert list(trie.iter_prefixes("アー")) == [(2, (5,))]
+    assert list(trie.iter_prefixes("ア・ブ")) == []
+    assert list(trie.iter_words("アブクシ")) == [
+        (0, 2, (1,)), (0, 3, (2,)), (2, 4, (3,)), (3, 4, (4,))]
+    assert list(trie.iter_longest("アブクシカ")) == [(0, 3, (2,)), (3, 4, (4,))]
+
+
+def test_glottal_consonant():
+    segmenter = Segmenter.from_dictionary(FakeDictionary())
+    assert surfaces(segmenter.segment("ʔヤー?ヤー、ヤー")) == [
+        ("ʔヤー", (6,)), ("?ヤー", (6,)), ("、", ()), ("ヤー", ())]
+
+
+def test_spelling_variants():
+    segmenter = Segmenter.from_dictionary(FakeDictionary())
+    for variant in ["ゥウガヌン", "ウゥガヌン", "ヲゥガヌン", "'ウガヌン", "ゥうがぬん"]:
+        assert surfaces(segmenter.segment(variant + "アー")) == [
+            (variant, (5,)), ("アー", (1,))]
+    assert surfaces(segmenter.segment("ッヤーッやー")) == [("ッヤー", (6,)), ("ッやー", (6,))]
+    # ヰ は ’イ の２文字になるが、Token の位置は元の文のまま。
+    assert segmenter.segment("アーヰーアー") == [
+        Token(0, 2, "アー", (1,)), Token(2, 4, "ヰー", (7,)), Token(4, 6, "アー", (1,))]
+
+
+def test_iter_tokens():
+    segmenter = Segmenter.from_dictionary(FakeDictionary())
+    text = "アーヌタチュン。 ヌタチュン、アー\n" * 50
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    tokens = list(segmenter.iter_tokens(chunks))
+    assert tokens == segmenter.segment(text)
+    assert "".join(token.surface for token in tokens) == text
@@ -0,0 +1,21 @@
+import json
+
+from src.kanahyouki import generate_phonetics
+from src.serialisation import dumps, to_builtin
+
+
+def test_dumps_same_as_json_dump():
+    entry = {
+        "id": 0,
+        "phonetics": generate_phonetics("?ami"),
+        "index": [],
+        "meaning": [{"yamato": "雨。", "okinawago": [generate_phonetics("Si")]}],
+        "remarks": {},
+        "accent": None,
+    }
+    builtin = to_builtin(entry)
+    assert builtin["phonetics"] == generate_phonetics("?ami").to_dict()
+    assert dumps(entry) == json.dumps(builtin, ensure_ascii=False, indent=4)
+    assert dumps(entry, indent=None) == json.dumps(builtin,
+                                                   ensure_ascii=False,
+                                                   separators=(",", ":"))
@@ -0,0 +1,50 @@
+import pytest
+
+from src.okinawago_dictionary.dictionary import ShardedOkinawagoDictionary
+from src.okinawago_dictionary.shards import load_manifest, row_of
+from src.sharding import id_ranges, split_into_shards, write_manifest, write_shards
+
+entries = [{"id": i, "text": str(i)} for i in range(6)]
+index_table = {
+    "アー": [0, 1],
+    "ガジャン": [2],
+    "カー": [3],
+    "’ンジャン": [4, 1],
+}
+
+
+def test_row_of():
+    assert row_of("ガジャン") == row_of("かー") == "ka"
+    assert row_of("’ンジャン") == "n"
+    assert row_of("ぱーぱー") == "ha"
+    assert row_of("?") == "other"
+
+
+def test_id_ranges():
+    assert id_ranges([5, 1, 2, 3, 7]) == [[1, 3], [5, 5], [7, 7]]
+
+
+def test_split_into_shards():
+    shards = split_into_shards(entries, index_table)
+    assert {row: [e["id"] for e in shard[1]] for row, shard in shards.items()} == {
+        "a": [0, 1], "ka": [2, 3], "n": [1, 4], "other": [5]
+    }
+
+
+def test_sharded_dictionary(tmp_path):
+    write_manifest({"okinawa_01": write_shards("okinawa_01", entries, index_table, tmp_path)},
+                   tmp_path)
+    manifest = load_manifest(tmp_path)
+    assert [info["row"] for info in manifest["dictionaries"]["okinawa_01"]
+            ] == ["a", "ka", "n", "other"]
+
+    dictionary = ShardedOkinawagoDictionary("okinawa_01", tmp_path)
+    assert dictionary.get_keys("カー") == [3]
+    assert dictionary.loaded_rows == ["ka"]
+    assert dictionary.get_content(5)["text"] == "5"
+    assert dictionary.loaded_rows == ["ka", "other"]
+    assert sorted(dictionary.index_words) == sorted(index_table)
+
+    (tmp_path / "okinawa_01" / "a.json").write_text('{"index":{},"entries":[]}')
+    with pytest.raises(ValueError):
+        ShardedOkinawagoDictionary("okinawa_01", tmp_path).get_keys("アー")
@@ -0,0 +1,38 @@
+import io
+
+from src import transliteration
+from src.transliteration import SocialClass, iter_chunks, transliterate, transliterate_stream
+
+text = "?aa nutacuN.\nsjuN, hello!\n"
+
+
+def test_transliterate():
+    assert transliterate(text) == "アー ヌタチュン.\nスン, hello!\n"
+    assert transliterate("sjuN", social_class=SocialClass.SHIZOKU) == "シュン"
+    assert transliterate("?aa", social_class=SocialClass.SHIZOKU) == "アー"
+    assert transliterate("?aa sjuN", to="ipa") == "ʔaː suɴ"
+
+
+def test_chunks_do_not_split_words():
+    chunks = list(iter_chunks(io.StringIO(text * 3), chunk_size=5))
+    assert "".join(chunks) == text * 3
+    assert all(not chunk[-1].isalpha() for chunk in chunks[:-1])
+
+
+def test_long_word_is_cut(monkeypatch):
+    monkeypatch.setattr(transliteration, "max_buffer_size", 12)
+    long_text = "a" * 30 + " ?aa"
+    chunks = list(iter_chunks(io.StringIO(long_text), chunk_size=5))
+    assert "".join(chunks) == long_text
+    assert max(len(chunk) for chunk in chunks) < 12 + 5
+
+
+def test_untransliterable_words_are_kept():
+    assert transliterate("hello ?ar sjuN") == "hello ?ar スン"
+
+
+def test_stream():
+    for jobs in [1, 2]:
+        out = io.StringIO()
+        transliterate_stream(io.StringIO(text * 50), out, jobs=jobs, chunk_size=16)
+        assert out.getvalue() == transliterate(text) * 50
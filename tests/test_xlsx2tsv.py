@@ -0,0 +1,21 @@
+from csv import DictReader
+
+from src.xlsx2tsv import cells2values, iter_dict_rows, path_dict, tsv_paths, xlsx2tsv
+
+
+def test_cells2values_translates_headword_only():
+    assert cells2values(("１", "ＡＢ、ｃ", "ＡＢ")) == ["１", "AB,c", "ＡＢ"]
+    assert cells2values(("１", None)) == ["１", None]
+
+
+def test_iter_dict_rows_matches_tsv(tmp_path):
+    xlsx_path = path_dict["places"]
+    assert [p.rsplit("/", 1)[1] for p in tsv_paths(xlsx_path)
+            ] == ["okinawa_03_1.tsv", "okinawa_03_2.tsv"]
+    tsv_path = tmp_path / "places.tsv"
+    xlsx2tsv(xlsx_path, tsv_path, sheet_index=1)
+    with open(tsv_path, 'r') as fp:
+        tsv_rows = list(DictReader(fp, delimiter='\t'))
+    xlsx_rows = list(iter_dict_rows(xlsx_path, sheet_index=1))
+    assert [row for _, row in xlsx_rows] == tsv_rows
+    assert xlsx_rows[0][0] == 2